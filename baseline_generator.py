@@ -1,68 +1,10 @@
-import os
-import hashlib
-import time
 import sys
 from PySide6.QtWidgets import (QApplication, QWidget, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, QPushButton,
                                QFileDialog, QMessageBox, QProgressBar)
 from PySide6.QtCore import Qt, QThread, Signal
-
-def get_file_hash(file_path, algorithm='sha256'):
-    """Compute the hash of a file using the specified algorithm."""
-    hash_algo = hashlib.new(algorithm)
-    with open(file_path, 'rb') as f:
-        for chunk in iter(lambda: f.read(4096), b""):
-            hash_algo.update(chunk)
-    return hash_algo.hexdigest()
-
-def format_size(size):
-    """Format the file size in a human-readable format."""
-    original_size = size
-    for unit in ['B', 'KB', 'MB', 'GB', 'TB']:
-        if size < 1024:
-            return f"{size:.2f} {unit} ({original_size} B)"
-        size /= 1024
-
-def get_file_dates(file_path):
-    """Get the creation and modification dates of a file."""
-    file_stats = os.stat(file_path)
-    creation_time = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(file_stats.st_ctime))
-    modification_time = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(file_stats.st_mtime))
-    return creation_time, modification_time
-
-def generate_baseline(directory):
-    report = []
-
-    for root, dirs, files in os.walk(directory):
-        subdir_count = len(dirs)
-        file_count = len(files)
-
-        folder_info = f"Folder: {root}\nNumber of subdirectories: {subdir_count}\nNumber of files: {file_count}\n"
-        report.append(folder_info)
-
-        report.append("Files:\n")
-        for file in files:
-            file_path = os.path.join(root, file)
-            file_size = os.path.getsize(file_path)
-            file_hash = get_file_hash(file_path)
-            creation_time, modification_time = get_file_dates(file_path)
-            file_info = (f"  Name: {file}\n  Size: {format_size(file_size)}\n  Hash: {file_hash}\n"
-                         f"  Date Created: {creation_time}\n  Date Modified: {modification_time}\n")
-            report.append(file_info)
-
-        if subdir_count > 0:
-            report.append("Subdirectories:\n")
-            for subdir in dirs:
-                subdir_path = os.path.join(root, subdir)
-                subdir_info = f"  Name: {subdir}\n  Path: {subdir_path}\n"
-                report.append(subdir_info)
-
-        report.append("\n")
-
-    return ''.join(report)
-
-def save_report(report, output_path):
-    with open(output_path, 'w') as f:
-        f.write(report)
+from scanner import generate_baseline, iter_records, save_report
+from baseline_store import save_baseline, STORE_EXTENSION
+from scan_cache import shared_digest_cache
 
 class BaselineWorker(QThread):
     progress = Signal(int)
@@ -74,8 +16,10 @@ class BaselineWorker(QThread):
         self.output_path = output_path
 
     def run(self):
-        baseline_report = generate_baseline(self.directory)
-        save_report(baseline_report, self.output_path)
+        # Stores also keep block digests for quick checks; text reports have nowhere to put them
+        blocks = self.output_path.endswith(STORE_EXTENSION)
+        save_baseline(iter_records(self.directory, blocks=blocks, digest_cache=shared_digest_cache()),
+                      self.output_path, self.directory)
         self.finished.emit(self.output_path)
 
 class BaselineGeneratorApp(QWidget):
@@ -133,7 +77,8 @@ class BaselineGeneratorApp(QWidget):
             self.dir_input.setText(folder_selected)
 
     def browse_output_file(self):
-        file_selected, _ = QFileDialog.getSaveFileName(self, "Save Report", "", "Text Files (*.txt);;All Files (*)")
+        file_selected, _ = QFileDialog.getSaveFileName(self, "Save Report", "",
+                                                       "Baseline Store (*.db);;Text Files (*.txt);;All Files (*)")
         if file_selected:
             self.output_input.setText(file_selected)
 
@@ -0,0 +1,300 @@
+import os
+import sys
+import time
+import sqlite3
+from collections import namedtuple
+from scanner import FolderRecord, FileRecord, render_text, parse_text, write_report
+from hash_engine import DEFAULT_ALGORITHM, BLOCK_DIGEST_MIN_SIZE
+from comparison import collect_folder_and_file_hashes
+from merkle import MerkleBuilder, compute_folder_digest
+from path_filter import NO_RULES, rules_to_json, rules_from_json
+
+STORE_EXTENSION = '.db'
+SQLITE_MAGIC = b'SQLite format 3\x00'
+BATCH_SIZE = 10000
+
+FolderRow = namedtuple('FolderRow', 'id path digest tree_files tree_folders')
+# What tier 0 (size, timestamps) and tier 1 (block digests) quick checks compare a file against
+FileEntry = namedtuple('FileEntry', 'size ctime_ns mtime_ns digest blocks')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS folders (id INTEGER PRIMARY KEY, path TEXT NOT NULL UNIQUE, file_count INTEGER,
+                                    digest BLOB, tree_files INTEGER, tree_folders INTEGER);
+CREATE TABLE IF NOT EXISTS subdirs (folder INTEGER NOT NULL, name TEXT NOT NULL);
+CREATE INDEX IF NOT EXISTS subdirs_folder ON subdirs (folder);
+CREATE TABLE IF NOT EXISTS files (id INTEGER PRIMARY KEY, folder INTEGER NOT NULL, name TEXT NOT NULL,
+                                  size INTEGER, digest BLOB, ctime_ns INTEGER, mtime_ns INTEGER,
+                                  extra_digests TEXT, block_size INTEGER, block_digests BLOB,
+                                  UNIQUE (folder, name));
+"""
+
+# A range on the unique path index instead of LIKE, so subtree lookups stay indexed
+SUBTREE_CLAUSE = "(path = ? OR (path >= ? AND path < ?))"
+
+def subtree_params(path):
+    """The parameters of SUBTREE_CLAUSE for the subtree at `path`."""
+    prefix = path.rstrip(os.sep) + os.sep
+    return path, prefix, prefix[:-1] + chr(ord(os.sep) + 1)
+
+def _file_row(folder_id, record):
+    # Extra digests are rare (compliance tasks only), so they stay as "algorithm=hex;..." text
+    extra = ';'.join(f"{algorithm}={digest}" for algorithm, digest in record.extra_digests.items()) \
+        if record.extra_digests else None
+    block_size, block_digests = record.blocks or (None, None)
+    return (folder_id, record.name, record.size, bytes.fromhex(record.digest), record.ctime_ns, record.mtime_ns, extra,
+            block_size, block_digests)
+
+def _parse_extra(extra):
+    return dict(item.split('=', 1) for item in extra.split(';')) if extra else None
+
+def _blocks(block_size, block_digests):
+    return (block_size, block_digests) if block_digests is not None else None
+
+def is_baseline_store(path):
+    """True when `path` is a SQLite baseline store rather than a text report."""
+    with open(path, 'rb') as f:
+        return f.read(len(SQLITE_MAGIC)) == SQLITE_MAGIC
+
+class BaselineStore:
+    """Compact SQLite baseline: folders and files are rows, digests are raw bytes, paths are indexed."""
+
+    def __init__(self, path):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(files)")}
+        if columns:
+            for column, kind in (('extra_digests', 'TEXT'), ('block_size', 'INTEGER'), ('block_digests', 'BLOB')):
+                if column not in columns:
+                    self.conn.execute(f"ALTER TABLE files ADD COLUMN {column} {kind}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        self.conn.close()
+
+    def write(self, records, directory=None, algorithms=(DEFAULT_ALGORITHM,), filter_rules=None):
+        """Replace the store's contents with a record stream, via a temporary file moved into place."""
+        temporary = self.path + '.tmp'
+        if os.path.exists(temporary):
+            os.remove(temporary)
+        live, self.conn = self.conn, sqlite3.connect(temporary)
+        try:
+            self.conn.executescript(SCHEMA)
+            self.conn.executemany("INSERT INTO meta VALUES (?, ?)", [
+                ('directory', directory or ''),
+                ('algorithm', algorithms[0]),
+                ('extra_algorithms', ','.join(algorithms[1:])),
+                ('filter', rules_to_json(filter_rules) if filter_rules and filter_rules != NO_RULES else ''),
+                ('created', time.strftime('%Y-%m-%d %H:%M:%S', time.localtime())),
+            ])
+            self._insert(records)
+            self.conn.commit()
+        except BaseException:
+            self.conn.close()
+            self.conn = live
+            os.remove(temporary)
+            raise
+        self.conn.close()
+        # Windows can't replace a file that is still open
+        live.close()
+        os.replace(temporary, self.path)
+        self.conn = sqlite3.connect(self.path)
+
+    def _insert(self, records):
+        conn = self.conn
+        merkle = MerkleBuilder()
+        folder_id = None
+        batch = []
+        for record in records:
+            if isinstance(record, FolderRecord):
+                folder_id = conn.execute("INSERT INTO folders (path, file_count) VALUES (?, ?)",
+                                         (record.path, record.file_count)).lastrowid
+                conn.executemany("INSERT INTO subdirs VALUES (?, ?)", [(folder_id, name) for name in record.subdirs])
+                self._set_digests(merkle.add(record, folder_id))
+            else:
+                merkle.add(record)
+                batch.append(_file_row(folder_id, record))
+                if len(batch) >= BATCH_SIZE:
+                    self._flush_files(batch)
+        self._flush_files(batch)
+        self._set_digests(merkle.finish())
+
+    def insert_subtree(self, records):
+        """Add a folder that is not in the store yet, with everything below it (uncommitted)."""
+        self._insert(records)
+
+    def delete_subtree(self, path):
+        """Remove a folder and everything below it (uncommitted)."""
+        folder_ids = [(folder_id,) for folder_id, in self.conn.execute(
+            "SELECT id FROM folders WHERE " + SUBTREE_CLAUSE, subtree_params(path))]
+        self.conn.executemany("DELETE FROM files WHERE folder = ?", folder_ids)
+        self.conn.executemany("DELETE FROM subdirs WHERE folder = ?", folder_ids)
+        self.conn.executemany("DELETE FROM folders WHERE id = ?", folder_ids)
+
+    def replace_folder(self, folder, record, file_records):
+        """Overwrite one folder's listing and files in place; its digest must be refreshed afterwards."""
+        self.conn.execute("UPDATE folders SET file_count = ? WHERE id = ?", (record.file_count, folder.id))
+        self.conn.execute("DELETE FROM subdirs WHERE folder = ?", (folder.id,))
+        self.conn.executemany("INSERT INTO subdirs VALUES (?, ?)", [(folder.id, name) for name in record.subdirs])
+        self.conn.execute("DELETE FROM files WHERE folder = ?", (folder.id,))
+        self._flush_files([_file_row(folder.id, file) for file in file_records])
+
+    def refresh_digest(self, folder):
+        """Recompute one folder's Merkle digest and subtree counts from its rows and its children's."""
+        children = self.child_folders(folder).items()
+        digest = compute_folder_digest(self.folder_files(folder.id, folder.path),
+                                       [(name, child.digest) for name, child in children])
+        tree_files = self.conn.execute("SELECT COUNT(*) FROM files WHERE folder = ?", (folder.id,)).fetchone()[0]
+        tree_files += sum(child.tree_files for _, child in children)
+        tree_folders = 1 + sum(child.tree_folders for _, child in children)
+        self.conn.execute("UPDATE folders SET digest = ?, tree_files = ?, tree_folders = ? WHERE id = ?",
+                          (digest, tree_files, tree_folders, folder.id))
+
+    def folder_row(self, path):
+        row = self.conn.execute("SELECT id, path, digest, tree_files, tree_folders FROM folders WHERE path = ?",
+                                (path,)).fetchone()
+        return FolderRow(*row) if row else None
+
+    def commit(self):
+        self.conn.commit()
+
+    def _set_digests(self, completed):
+        self.conn.executemany("UPDATE folders SET digest = ?, tree_files = ?, tree_folders = ? WHERE id = ?",
+                              [(folder.digest, folder.tree_files, folder.tree_folders, folder.tag)
+                               for folder in completed])
+
+    def _flush_files(self, batch):
+        self.conn.executemany("INSERT INTO files (folder, name, size, digest, ctime_ns, mtime_ns, extra_digests,"
+                              " block_size, block_digests) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", batch)
+        batch.clear()
+
+    def meta(self, key):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def iter_records(self):
+        """Yield the stored baseline back as a record stream, in the original walk order."""
+        return self._iter_folders("SELECT id, path, file_count FROM folders ORDER BY id")
+
+    def iter_subtree(self, path):
+        """Yield the records of one folder and everything below it, in the original walk order."""
+        return self._iter_folders("SELECT id, path, file_count FROM folders WHERE " + SUBTREE_CLAUSE + " ORDER BY id",
+                                  subtree_params(path))
+
+    def _iter_folders(self, query, params=()):
+        folders = self.conn.cursor()
+        for folder_id, path, file_count in folders.execute(query, params):
+            subdirs = [name for name, in self.conn.execute(
+                "SELECT name FROM subdirs WHERE folder = ? ORDER BY rowid", (folder_id,))]
+            yield FolderRecord(path, subdirs, file_count)
+            yield from self.folder_files(folder_id, path)
+
+    def folder_files(self, folder_id, path):
+        """The FileRecords directly inside one folder, in stored order."""
+        return [FileRecord(os.path.join(path, name), name, size, digest.hex(), ctime_ns, mtime_ns, _parse_extra(extra),
+                           _blocks(block_size, block_digests))
+                for name, size, digest, ctime_ns, mtime_ns, extra, block_size, block_digests in self.conn.execute(
+                    "SELECT name, size, digest, ctime_ns, mtime_ns, extra_digests, block_size, block_digests"
+                    " FROM files WHERE folder = ? ORDER BY id", (folder_id,))]
+
+    def file_entry(self, folder_path, name):
+        """The stored FileEntry of one file, or None when the baseline doesn't have it."""
+        row = self.conn.execute(
+            "SELECT files.size, files.ctime_ns, files.mtime_ns, files.digest, files.block_size, files.block_digests"
+            " FROM files JOIN folders ON folders.id = files.folder WHERE folders.path = ? AND files.name = ?",
+            (folder_path, name)).fetchone()
+        if row is None:
+            return None
+        size, ctime_ns, mtime_ns, digest, block_size, block_digests = row
+        return FileEntry(size, ctime_ns, mtime_ns, digest.hex(), _blocks(block_size, block_digests))
+
+    def has_block_digests(self):
+        """True when every file large enough for a tier 1 quick check has block digests to sample."""
+        return self.conn.execute("SELECT 1 FROM files WHERE size >= ? AND block_digests IS NULL LIMIT 1",
+                                 (BLOCK_DIGEST_MIN_SIZE,)).fetchone() is None
+
+    def has_merkle(self):
+        """Stores written before directory digests existed lack them and must be diffed as streams."""
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(folders)")}
+        if 'digest' not in columns:
+            return False
+        return self.conn.execute("SELECT 1 FROM folders WHERE digest IS NULL LIMIT 1").fetchone() is None
+
+    def root(self):
+        row = self.conn.execute("SELECT id, path, digest, tree_files, tree_folders FROM folders"
+                                " ORDER BY id LIMIT 1").fetchone()
+        return FolderRow(*row) if row else None
+
+    def child_folders(self, folder):
+        """FolderRows of the walked subdirectories of `folder`, keyed by name."""
+        children = {}
+        for name, in self.conn.execute("SELECT name FROM subdirs WHERE folder = ?", (folder.id,)):
+            row = self.folder_row(os.path.join(folder.path, name))
+            if row:
+                children[name] = row
+        return children
+
+    def folders_and_hashes(self):
+        """Same result as comparison.extract_folder_and_file_hashes, straight from the index."""
+        folder_names = {path for path, in self.conn.execute("SELECT path FROM folders")}
+        file_hashes = {}
+        for path, name, digest in self.conn.execute(
+                "SELECT folders.path, files.name, files.digest FROM files"
+                " JOIN folders ON folders.id = files.folder ORDER BY files.id"):
+            file_hashes[digest.hex()] = os.path.join(path, name)
+        return folder_names, file_hashes
+
+def save_baseline(records, output_path, directory=None, algorithms=(DEFAULT_ALGORITHM,), filter_rules=None):
+    """Stream a record stream into a baseline store or, for non-.db paths, a text report."""
+    if output_path.endswith(STORE_EXTENSION):
+        with BaselineStore(output_path) as store:
+            store.write(records, directory, algorithms, filter_rules)
+    else:
+        write_report(render_text(records), output_path)
+
+def iter_baseline_records(baseline_file):
+    """Yield the records of a saved baseline, whichever format it is in."""
+    if is_baseline_store(baseline_file):
+        with BaselineStore(baseline_file) as store:
+            yield from store.iter_records()
+    else:
+        with open(baseline_file, 'r') as f:
+            yield from parse_text(f)
+
+def baseline_algorithms(baseline_file):
+    """The algorithms a saved baseline was hashed with; text reports don't record them and are sha256."""
+    if not is_baseline_store(baseline_file):
+        return (DEFAULT_ALGORITHM,)
+    with BaselineStore(baseline_file) as store:
+        primary = store.meta('algorithm') or DEFAULT_ALGORITHM
+        extra = store.meta('extra_algorithms')
+    return (primary,) + tuple(extra.split(',') if extra else ())
+
+def baseline_filter_rules(baseline_file):
+    """The FilterRules a baseline store was scanned with; text reports don't record any."""
+    if not is_baseline_store(baseline_file):
+        return NO_RULES
+    with BaselineStore(baseline_file) as store:
+        return rules_from_json(store.meta('filter'))
+
+def load_baseline(baseline_file):
+    """Load (folder_names, file_hashes) from either a baseline store or a text report."""
+    if is_baseline_store(baseline_file):
+        with BaselineStore(baseline_file) as store:
+            return store.folders_and_hashes()
+    return collect_folder_and_file_hashes(iter_baseline_records(baseline_file))
+
+def export_text_report(store_path, output_path):
+    """Render a baseline store as the classic human-readable text report."""
+    with BaselineStore(store_path) as store:
+        write_report(render_text(store.iter_records()), output_path)
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        sys.exit("usage: python baseline_store.py <baseline.db> <report.txt>")
+    export_text_report(sys.argv[1], sys.argv[2])
@@ -0,0 +1,300 @@
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import platform
+import tempfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from scanner import iter_records, render_text, parse_text, write_report
+from hash_engine import HashingEngine
+from walker import walk
+from baseline_store import BaselineStore, save_baseline, iter_baseline_records
+from comparison import extract_folder_and_file_hashes, compare_baselines
+from diff_engine import diff_records, diff_stores
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+class TreeSpec:
+    """Shape of a synthetic directory tree; the same spec and seed always produce the same tree."""
+
+    def __init__(self, depth=3, fanout=4, files_per_dir=20, median_size=16 << 10, size_sigma=1.5,
+                 max_size=64 << 20, duplicate_ratio=0.1, churn=0.05, seed=1):
+        self.depth = depth
+        self.fanout = fanout
+        self.files_per_dir = files_per_dir
+        self.median_size = median_size
+        self.size_sigma = size_sigma
+        self.max_size = max_size
+        self.duplicate_ratio = duplicate_ratio
+        self.churn = churn
+        self.seed = seed
+
+    def as_dict(self):
+        return dict(vars(self))
+
+def _file_size(rng, spec):
+    # File sizes on real systems are roughly log-normal: many small files, a long tail of big ones
+    return min(spec.max_size, int(rng.lognormvariate(0, spec.size_sigma) * spec.median_size))
+
+def generate_tree(root, spec):
+    """Create the synthetic tree described by `spec` under `root`; returns the list of file paths."""
+    rng = random.Random(spec.seed)
+    paths = []
+    contents = []
+    folders = [(root, 0)]
+    while folders:
+        folder, level = folders.pop()
+        os.makedirs(folder, exist_ok=True)
+        for i in range(spec.files_per_dir):
+            path = os.path.join(folder, f"file_{i:04d}.bin")
+            if contents and rng.random() < spec.duplicate_ratio:
+                data = rng.choice(contents)
+            else:
+                data = rng.randbytes(_file_size(rng, spec))
+                if len(data) <= 256 << 10 and len(contents) < 1000:
+                    contents.append(data)
+            with open(path, 'wb') as f:
+                f.write(data)
+            paths.append(path)
+        if level < spec.depth:
+            folders.extend((os.path.join(folder, f"dir_{i:03d}"), level + 1) for i in range(spec.fanout))
+    return paths
+
+def apply_churn(paths, spec):
+    """Modify, delete and add files (a third of `spec.churn` each), reproducibly; returns the count touched."""
+    rng = random.Random(spec.seed + 1)
+    count = int(len(paths) * spec.churn / 3)
+    victims = rng.sample(paths, min(len(paths), count * 2))
+    for path in victims[:count]:
+        size = os.path.getsize(path)
+        with open(path, 'wb') as f:
+            f.write(rng.randbytes(size))
+    for path in victims[count:]:
+        os.remove(path)
+    for i in range(count):
+        folder = os.path.dirname(rng.choice(paths))
+        with open(os.path.join(folder, f"added_{i:04d}.bin"), 'wb') as f:
+            f.write(rng.randbytes(_file_size(rng, spec)))
+    return count * 3
+
+def _tree_size(directory):
+    files = size = 0
+    for root, _, names in os.walk(directory):
+        for name in names:
+            files += 1
+            size += os.path.getsize(os.path.join(root, name))
+    return files, size
+
+def _peak_rss():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+# Each phase gets its inputs ready untimed, then returns (timed callable, files, bytes processed)
+
+def _phase_walk(paths, workers):
+    def run():
+        for _ in walk(paths['tree'], workers=workers):
+            pass
+    return run, *_tree_size(paths['tree'])
+
+def _phase_hash(paths, workers):
+    file_paths = [os.path.join(root, name) for root, _, names in os.walk(paths['tree']) for name in names]
+    def run():
+        with HashingEngine(workers) as engine:
+            for _ in engine.imap(file_paths):
+                pass
+    return run, *_tree_size(paths['tree'])
+
+def _phase_scan(paths, workers):
+    def run():
+        write_report(render_text(iter_records(paths['tree'], workers)), paths['scratch'] + '.txt')
+    return run, *_tree_size(paths['tree'])
+
+def _phase_serialize_text(paths, workers):
+    records = list(iter_baseline_records(paths['baseline_db']))
+    def run():
+        write_report(render_text(records), paths['scratch'] + '.txt')
+    return run, len(records), os.path.getsize(paths['baseline_txt'])
+
+def _phase_serialize_store(paths, workers):
+    records = list(iter_baseline_records(paths['baseline_db']))
+    def run():
+        save_baseline(records, paths['scratch'] + '.db', paths['tree'])
+    return run, len(records), os.path.getsize(paths['baseline_db'])
+
+def _phase_parse_text(paths, workers):
+    def run():
+        with open(paths['baseline_txt'], 'r') as f:
+            for _ in parse_text(f):
+                pass
+    return run, _record_count(paths), os.path.getsize(paths['baseline_txt'])
+
+def _phase_parse_store(paths, workers):
+    def run():
+        for _ in iter_baseline_records(paths['baseline_db']):
+            pass
+    return run, _record_count(paths), os.path.getsize(paths['baseline_db'])
+
+def _phase_parse_legacy(paths, workers):
+    with open(paths['baseline_txt'], 'r') as f:
+        text = f.read()
+    def run():
+        extract_folder_and_file_hashes(text)
+    return run, _record_count(paths), len(text)
+
+def _phase_diff(paths, workers):
+    original = list(iter_baseline_records(paths['baseline_db']))
+    current = list(iter_baseline_records(paths['current_db']))
+    def run():
+        diff_records(iter(original), iter(current))
+    return run, len(original) + len(current), 0
+
+def _phase_diff_stores(paths, workers):
+    def run():
+        with BaselineStore(paths['baseline_db']) as original, BaselineStore(paths['current_db']) as current:
+            diff_stores(original, current)
+    return run, _record_count(paths), os.path.getsize(paths['baseline_db']) + os.path.getsize(paths['current_db'])
+
+def _phase_diff_legacy(paths, workers):
+    with open(paths['baseline_txt'], 'r') as f:
+        original = f.read()
+    with open(paths['current_txt'], 'r') as f:
+        current = f.read()
+    def run():
+        compare_baselines(original, current)
+    return run, _record_count(paths), len(original) + len(current)
+
+def _record_count(paths):
+    with BaselineStore(paths['baseline_db']) as store:
+        return store.conn.execute("SELECT (SELECT COUNT(*) FROM folders) + (SELECT COUNT(*) FROM files)").fetchone()[0]
+
+PHASES = {
+    'walk': _phase_walk,
+    'hash': _phase_hash,
+    'scan': _phase_scan,
+    'serialize_text': _phase_serialize_text,
+    'serialize_store': _phase_serialize_store,
+    'parse_text': _phase_parse_text,
+    'parse_store': _phase_parse_store,
+    'parse_legacy': _phase_parse_legacy,
+    'diff': _phase_diff,
+    'diff_stores': _phase_diff_stores,
+    'diff_legacy': _phase_diff_legacy,
+}
+
+def _run_phase(name, paths, workers, repeat):
+    """Run one phase in the current (fresh) process; the best of `repeat` runs counts."""
+    run, files, size = PHASES[name](paths, workers)
+    seconds = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - start
+        seconds = elapsed if seconds is None else min(seconds, elapsed)
+    return {
+        'phase': name,
+        'seconds': seconds,
+        'files': files,
+        'bytes': size,
+        'files_per_s': files / seconds if seconds else None,
+        'mb_per_s': size / (1 << 20) / seconds if seconds and size else None,
+        'peak_rss_bytes': _peak_rss(),
+    }
+
+def run_benchmarks(workdir, spec, phases=None, workers=None, repeat=1, log=print):
+    """Build the synthetic tree and its baselines in `workdir`, then time each phase in a fresh process."""
+    paths = {
+        'tree': os.path.join(workdir, 'tree'),
+        'baseline_db': os.path.join(workdir, 'baseline.db'),
+        'baseline_txt': os.path.join(workdir, 'baseline.txt'),
+        'current_db': os.path.join(workdir, 'current.db'),
+        'current_txt': os.path.join(workdir, 'current.txt'),
+        'scratch': os.path.join(workdir, 'scratch'),
+    }
+    log(f"Generating tree in {paths['tree']}")
+    tree_paths = generate_tree(paths['tree'], spec)
+    save_baseline(iter_records(paths['tree'], workers), paths['baseline_db'], paths['tree'])
+    with BaselineStore(paths['baseline_db']) as store:
+        write_report(render_text(store.iter_records()), paths['baseline_txt'])
+    files, size = _tree_size(paths['tree'])
+
+    results = []
+    # Walk/hash/scan see the tree as baselined; the current scan the diff phases need comes after churn
+    churned = False
+    for name in phases or PHASES:
+        if name.startswith('diff') and not churned:
+            apply_churn(tree_paths, spec)
+            save_baseline(iter_records(paths['tree'], workers), paths['current_db'], paths['tree'])
+            with BaselineStore(paths['current_db']) as store:
+                write_report(render_text(store.iter_records()), paths['current_txt'])
+            churned = True
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as executor:
+            result = executor.submit(_run_phase, name, paths, workers, repeat).result()
+        log(f"{name:16} {result['seconds']:9.3f} s")
+        results.append(result)
+
+    return {
+        'label': None,
+        'created': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime()),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'workers': workers,
+        'repeat': repeat,
+        'tree': dict(spec.as_dict(), files=files, bytes=size),
+        'phases': results,
+    }
+
+def compare_results(old, new):
+    """Yield one line per phase present in both runs, with the new/old time ratio."""
+    old_phases = {result['phase']: result for result in old['phases']}
+    for result in new['phases']:
+        previous = old_phases.get(result['phase'])
+        if previous and previous['seconds']:
+            yield (f"{result['phase']:16} {previous['seconds']:9.3f} s -> {result['seconds']:9.3f} s"
+                   f"  x{result['seconds'] / previous['seconds']:.2f}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark FIM scanning, serialization, parsing and diffing "
+                                                 "on a synthetic directory tree.")
+    parser.add_argument('--output', default='benchmark.json', help="machine-readable results file (JSON)")
+    parser.add_argument('--label', help="name for this run, e.g. a version or commit")
+    parser.add_argument('--workdir', help="empty directory to build the tree in (default: a temporary one, removed afterwards)")
+    parser.add_argument('--phases', nargs='+', choices=list(PHASES), help="phases to run (default: all)")
+    parser.add_argument('--workers', type=int, help="hashing workers (default: automatic)")
+    parser.add_argument('--repeat', type=int, default=1, help="runs per phase; the fastest counts")
+    parser.add_argument('--compare', metavar='OLD_JSON', help="print time ratios against an earlier results file")
+    defaults = TreeSpec()
+    for option, value in defaults.as_dict().items():
+        parser.add_argument('--' + option.replace('_', '-'), type=type(value), default=value)
+    args = parser.parse_args(argv)
+
+    spec = TreeSpec(**{option: getattr(args, option) for option in defaults.as_dict()})
+    workdir = args.workdir or tempfile.mkdtemp(prefix='fim-bench-')
+    try:
+        results = run_benchmarks(workdir, spec, args.phases, args.workers, args.repeat)
+    finally:
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+    results['label'] = args.label
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            for line in compare_results(json.load(f), results):
+                print(line)
+
+if __name__ == "__main__":
+    main()
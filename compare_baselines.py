@@ -1,129 +1,11 @@
-import os
-import hashlib
-import time
 from PySide6.QtWidgets import (QApplication, QWidget, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, QPushButton,
                                QFileDialog, QMessageBox, QProgressBar, QTabWidget, QMainWindow, QDialog)
 from PySide6.QtCore import Qt, QThread, Signal
-
-def get_file_hash(file_path, algorithm='sha256'):
-    """Compute the hash of a file using the specified algorithm."""
-    hash_algo = hashlib.new(algorithm)
-    with open(file_path, 'rb') as f:
-        for chunk in iter(lambda: f.read(4096), b""):
-            hash_algo.update(chunk)
-    return hash_algo.hexdigest()
-
-def format_size(size):
-    """Format the file size in a human-readable format."""
-    original_size = size
-    for unit in ['B', 'KB', 'MB', 'GB', 'TB']:
-        if size < 1024:
-            return f"{size:.2f} {unit} ({original_size} B)"
-        size /= 1024
-
-def get_file_dates(file_path):
-    """Get the creation and modification dates of a file."""
-    file_stats = os.stat(file_path)
-    creation_time = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(file_stats.st_ctime))
-    modification_time = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(file_stats.st_mtime))
-    return creation_time, modification_time
-
-def generate_baseline(directory):
-    report = []
-
-    for root, dirs, files in os.walk(directory):
-        subdir_count = len(dirs)
-        file_count = len(files)
-
-        folder_info = f"Folder: {root}\nNumber of subdirectories: {subdir_count}\nNumber of files: {file_count}\n"
-        report.append(folder_info)
-
-        report.append("Files:\n")
-        for file in files:
-            file_path = os.path.join(root, file)
-            file_size = os.path.getsize(file_path)
-            file_hash = get_file_hash(file_path)
-            creation_time, modification_time = get_file_dates(file_path)
-            file_info = (f"  Name: {file}\n  Path: {file_path}\n  Size: {format_size(file_size)}\n  Hash: {file_hash}\n"
-                         f"  Date Created: {creation_time}\n  Date Modified: {modification_time}\n")
-            report.append(file_info)
-
-        if subdir_count > 0:
-            report.append("Subdirectories:\n")
-            for subdir in dirs:
-                subdir_path = os.path.join(root, subdir)
-                subdir_info = f"  Name: {subdir}\n  Path: {subdir_path}\n"
-                report.append(subdir_info)
-
-        report.append("\n")
-
-    return ''.join(report)
-
-def save_report(report, output_path):
-    with open(output_path, 'w') as f:
-        f.write(report)
-
-def extract_folder_and_file_hashes(baseline):
-    folder_names = set()
-    file_hashes = {}
-    lines = baseline.splitlines()
-    
-    current_folder = ""
-    file_path = ""  # Initialize file_path to an empty string
-    for line in lines:
-        if line.startswith("Folder: "):
-            current_folder = line[8:]
-            folder_names.add(current_folder)
-        elif line.startswith("  Name: "):
-            file_name = line[8:]
-        elif line.startswith("  Path: "):
-            file_path = line[8:]
-        elif line.startswith("  Hash: "):
-            file_hash = line[8:]
-            file_hashes[file_hash] = file_path
-    
-    return folder_names, file_hashes
-
-def compare_baselines(original_baseline, generated_baseline):
-    """Compare two baselines and generate a comparison report."""
-    original_folders, original_hashes = extract_folder_and_file_hashes(original_baseline)
-    generated_folders, generated_hashes = extract_folder_and_file_hashes(generated_baseline)
-
-    matched_folders = original_folders.intersection(generated_folders)
-    unmatched_folders = generated_folders - original_folders
-
-    matched_hashes = original_hashes.keys() & generated_hashes.keys()
-    unmatched_hashes = generated_hashes.keys() - original_hashes.keys()
-
-    total_files = len(matched_hashes) + len(unmatched_hashes)
-    total_folders = len(matched_folders) + len(unmatched_folders)
-    total_items = total_files + total_folders
-    matched_items = len(matched_hashes) + len(matched_folders)
-
-    if total_items > 0:
-        matching_percentage = round((matched_items / total_items) * 100)
-    else:
-        matching_percentage = 100
-
-    comparison_time = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime())
-
-    report = []
-    report.append(f"Comparison time: {comparison_time}")
-    report.append(f"No of files matched: {len(matched_hashes)}")
-    report.append(f"No of files not matched: {len(unmatched_hashes)}")
-    report.append(f"Matching percentage: {matching_percentage}%")
-
-    if unmatched_hashes:
-        report.append("\nAdded or modified files:")
-        for hash in unmatched_hashes:
-            report.append(f"  Path: {generated_hashes[hash]}\n  Hash: {hash}")
-
-    if unmatched_folders:
-        report.append("\nAdded or modified directories:")
-        for folder in unmatched_folders:
-            report.append(f"  Folder: {folder}")
-
-    return '\n'.join(report)
+from scanner import generate_baseline, iter_records, write_report
+from baseline_store import baseline_algorithms, baseline_filter_rules
+from diff_engine import sorted_baseline_records, diff_records, iter_diff_report
+from path_filter import compile_filter
+from scan_cache import shared_digest_cache
 
 class ComparisonWorker(QThread):
     progress = Signal(int)
@@ -136,12 +18,14 @@ class ComparisonWorker(QThread):
         self.output_path = output_path
 
     def run(self):
-        with open(self.baseline_file, 'r') as f:
-            original_baseline = f.read()
-
-        generated_baseline = generate_baseline(self.directory)
-        comparison_report = compare_baselines(original_baseline, generated_baseline)
-        save_report(comparison_report, self.output_path)
+        # Only the primary digest is compared, so any extra compliance digests are not recomputed
+        algorithms = baseline_algorithms(self.baseline_file)[:1]
+        path_filter = compile_filter(self.directory, baseline_filter_rules(self.baseline_file))
+        # The diff spills to disk past spill.SPILL_THRESHOLD records, and its report is streamed out
+        result = diff_records(sorted_baseline_records(self.baseline_file),
+                              iter_records(self.directory, algorithms=algorithms, digest_cache=shared_digest_cache(),
+                                           path_filter=path_filter))
+        write_report(iter_diff_report(result), self.output_path)
         self.finished.emit(self.output_path)
 
 class ComparisonWindow(QDialog):
@@ -206,7 +90,8 @@ class ComparisonWindow(QDialog):
         self.setLayout(layout)
 
     def browse_baseline_file(self):
-        file_selected, _ = QFileDialog.getOpenFileName(self, "Select Baseline File", "", "Text Files (*.txt);;All Files (*)")
+        file_selected, _ = QFileDialog.getOpenFileName(self, "Select Baseline File", "",
+                                                       "Baseline Store (*.db);;Text Files (*.txt);;All Files (*)")
         if file_selected:
             self.baseline_file_input.setText(file_selected)
 
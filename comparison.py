@@ -0,0 +1,83 @@
+import time
+from scanner import FolderRecord
+
+def extract_folder_and_file_hashes(baseline):
+    folder_names = set()
+    file_hashes = {}
+    lines = baseline.splitlines()
+    
+    current_folder = ""
+    file_name = ""
+    file_path = ""
+    
+    for line in lines:
+        if line.startswith("Folder: "):
+            current_folder = line[8:]
+            folder_names.add(current_folder)
+        elif line.startswith("  Name: "):
+            file_name = line[8:]
+        elif line.startswith("  Path: "):
+            file_path = line[8:]
+        elif line.startswith("  Hash: "):
+            file_hash = line[8:]
+            if file_path:  # Ensure file_path is not empty
+                file_hashes[file_hash] = file_path
+    
+    return folder_names, file_hashes
+
+def collect_folder_and_file_hashes(records):
+    """Build the same (folder_names, file_hashes) pair from a scan record stream, without a text round-trip."""
+    folder_names = set()
+    file_hashes = {}
+    for record in records:
+        if isinstance(record, FolderRecord):
+            folder_names.add(record.path)
+        else:
+            file_hashes[record.digest] = record.path
+    return folder_names, file_hashes
+
+def compare_folder_and_file_hashes(original, generated):
+    """Compare two (folder_names, file_hashes) pairs and generate a comparison report."""
+    original_folders, original_hashes = original
+    generated_folders, generated_hashes = generated
+
+    matched_folders = original_folders.intersection(generated_folders)
+    unmatched_folders = generated_folders - original_folders
+
+    matched_hashes = original_hashes.keys() & generated_hashes.keys()
+    unmatched_hashes = generated_hashes.keys() - original_hashes.keys()
+
+    total_files = len(matched_hashes) + len(unmatched_hashes)
+    total_folders = len(matched_folders) + len(unmatched_folders)
+    total_items = total_files + total_folders
+    matched_items = len(matched_hashes) + len(matched_folders)
+
+    if total_items > 0:
+        matching_percentage = round((matched_items / total_items) * 100)
+    else:
+        matching_percentage = 100
+
+    comparison_time = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime())
+
+    report = []
+    report.append(f"Comparison time: {comparison_time}")
+    report.append(f"No of files matched: {len(matched_hashes)}")
+    report.append(f"No of files not matched: {len(unmatched_hashes)}")
+    report.append(f"Matching percentage: {matching_percentage}%")
+
+    if unmatched_hashes:
+        report.append("\nAdded or modified files:")
+        for hash in unmatched_hashes:
+            report.append(f"  Path: {generated_hashes[hash]}\n  Hash: {hash}")
+
+    if unmatched_folders:
+        report.append("\nAdded or modified directories:")
+        for folder in unmatched_folders:
+            report.append(f"  Folder: {folder}")
+
+    return '\n'.join(report)
+
+def compare_baselines(original_baseline, generated_baseline):
+    """Compare two baselines and generate a comparison report."""
+    return compare_folder_and_file_hashes(extract_folder_and_file_hashes(original_baseline),
+                                          extract_folder_and_file_hashes(generated_baseline))
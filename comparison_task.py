@@ -0,0 +1,154 @@
+import os
+from scanner import iter_records
+from scan_cache import RescanCache
+from baseline_store import BaselineStore, is_baseline_store, baseline_algorithms, baseline_filter_rules
+from diff_engine import sorted_baseline_records, diff_records, diff_stores, iter_diff_report
+from rescan import refresh_store
+from quick_check import QuickCheck, FULL_HASH_EVERY
+from scan_metrics import ScanMetrics, write_prometheus, profiled
+from scheduler import RecurringSchedule, device_of
+from log_rotation import LogRotator
+from path_filter import compile_filter
+from spill import SPILL_THRESHOLD
+
+FULL_SWEEP_EVERY = 10
+
+class ComparisonTask:
+    """Recurring integrity checks of one directory; a scheduler.MonitoringScheduler decides when each runs."""
+
+    def __init__(self, baseline_file, directory, output_path, regular_interval, random_checks, workers=None,
+                 cache_file=None, paranoid_every=0, dirty_set=None, full_sweep_every=FULL_SWEEP_EVERY,
+                 algorithms=None, quick_samples=0, full_hash_every=FULL_HASH_EVERY, metrics_file=None,
+                 throttle=None, walk_workers=None, log_rotation=None, digest_cache=None, filter_rules=None,
+                 spill_threshold=SPILL_THRESHOLD, on_check_finished=None, on_metrics_updated=None):
+        self.baseline_file = baseline_file
+        self.directory = os.path.abspath(directory)
+        self.output_path = output_path
+        # The report log is appended to on every check, so it is rotated like the event log
+        self.log_rotator = LogRotator(output_path, log_rotation)
+        self.regular_interval = regular_interval
+        self.random_checks = random_checks
+        self.schedule = RecurringSchedule(regular_interval, random_checks)
+        self.device = device_of(directory)
+        self.workers = workers
+        self.cache = RescanCache(cache_file, paranoid_every) if cache_file else None
+        self.digest_cache = digest_cache
+        self.dirty_set = dirty_set
+        self.full_sweep_every = full_sweep_every
+        self.algorithms = algorithms
+        self.quick_samples = quick_samples
+        self.full_hash_every = full_hash_every
+        self.uses_merkle = False
+        self.supports_quick_check = False
+        self.quick_check = None
+        self.last_result = None  # DiffResult of the latest check, for whoever is told it finished
+        self.metrics = ScanMetrics()
+        self.metrics_file = metrics_file
+        self.profile_request = None
+        self.throttle = throttle
+        self.walk_workers = walk_workers
+        # None means whatever rules the baseline was scanned with
+        self.filter_rules = filter_rules
+        self.path_filter = None
+        self.spill_threshold = spill_threshold
+        self.on_check_finished = on_check_finished
+        self.on_metrics_updated = on_metrics_updated
+        self._checks = 0
+        self._prepared = False
+
+    def prepare(self):
+        # Scans must hash with whatever the baseline was hashed with
+        self.algorithms = tuple(self.algorithms or baseline_algorithms(self.baseline_file))
+        if self.cache is not None:
+            self.cache.algorithm = self.algorithms[0]
+        if self.filter_rules is None:
+            self.filter_rules = baseline_filter_rules(self.baseline_file)
+        self.path_filter = compile_filter(self.directory, self.filter_rules)
+        if is_baseline_store(self.baseline_file):
+            with BaselineStore(self.baseline_file) as store:
+                self.uses_merkle = store.has_merkle()
+                # Block digests came after directory digests, so only Merkle stores can have them
+                self.supports_quick_check = self.uses_merkle and store.has_block_digests()
+        self._prepared = True
+
+    def run_check(self, cancelled=None):
+        """One scheduled check; raises ScanCancelled soon after the `cancelled` event is set."""
+        if not self._prepared:
+            self.prepare()
+        profile_request, self.profile_request = self.profile_request, None
+        if profile_request is not None:
+            with profiled(*profile_request):
+                self._check_and_report(cancelled)
+        else:
+            self._check_and_report(cancelled)
+        if self.on_check_finished is not None:
+            self.on_check_finished(self.output_path)
+
+    def _check_and_report(self, cancelled):
+        """Compare, append the report, then publish the check's metrics."""
+        self.metrics.begin_check()
+        result = self.last_result = self.check(cancelled)
+        with self.metrics.timer('report'):
+            with open(self.output_path, 'a') as f:
+                if self.quick_check is not None:
+                    f.write(self.quick_check.summary() + '\n')
+                f.writelines(iter_diff_report(result))
+                f.write('\n\n')
+                size = f.tell()
+            if self.log_rotator.due(size):
+                self.log_rotator.rotate()
+        self.metrics.finish_check()
+        snapshot = self.metrics.snapshot()
+        if self.metrics_file:
+            write_prometheus(snapshot, self.directory, self.metrics_file)
+        if self.on_metrics_updated is not None:
+            self.on_metrics_updated(self.directory, snapshot)
+
+    def profile_next_check(self, output_path, memory=False):
+        """Run the next check under cProfile (and tracemalloc with `memory`); see scan_metrics.profiled."""
+        self.profile_request = (output_path, memory)
+
+    def check(self, cancelled=None):
+        self._checks += 1
+        self.quick_check = None
+        dirty_paths, dirty_subtrees, full = self.dirty_set.drain() if self.dirty_set is not None else (None, None, True)
+        if self.uses_merkle:
+            # Keep the latest scan as a store too, so the diff can skip every subtree whose digest is unchanged
+            latest_file = os.path.splitext(self.baseline_file)[0] + '_latest.db'
+            sweep_due = self.full_sweep_every and self._checks % self.full_sweep_every == 0
+            full = full or sweep_due or not os.path.exists(latest_file)
+            try:
+                with BaselineStore(self.baseline_file) as original, BaselineStore(latest_file) as current:
+                    if full:
+                        algorithms = self.algorithms
+                        if self._quick_check_due():
+                            # Sampling can only confirm primary digests, so extra ones wait for a full-hash check
+                            self.quick_check = QuickCheck(original, self.quick_samples)
+                            algorithms = algorithms[:1]
+                        records = iter_records(self.directory, self.workers, cache=self.cache, algorithms=algorithms,
+                                               quick_check=self.quick_check, metrics=self.metrics, cancel=cancelled,
+                                               throttle=self.throttle, walk_workers=self.walk_workers,
+                                               digest_cache=self.digest_cache, path_filter=self.path_filter)
+                        current.write(records, self.directory, algorithms, self.filter_rules)
+                    else:
+                        # Only what the event handler saw change since the last check is re-hashed
+                        refresh_store(current, self.directory, dirty_paths, self.workers, self.algorithms, self.metrics,
+                                      cancelled, self.throttle, self.digest_cache, self.path_filter, dirty_subtrees)
+                    with self.metrics.timer('diff'):
+                        return diff_stores(original, current, self.spill_threshold)
+            except BaseException:
+                # The dirty paths were drained, so the next check must rebuild the latest store in full
+                if os.path.exists(latest_file):
+                    os.remove(latest_file)
+                raise
+        return diff_records(sorted_baseline_records(self.baseline_file, self.spill_threshold),
+                            iter_records(self.directory, self.workers, cache=self.cache, algorithms=self.algorithms[:1],
+                                         metrics=self.metrics, cancel=cancelled, throttle=self.throttle,
+                                         walk_workers=self.walk_workers, digest_cache=self.digest_cache,
+                                         path_filter=self.path_filter), self.spill_threshold)
+
+    def _quick_check_due(self):
+        """Quick checks run unless disabled or unsupported; every `full_hash_every`th check hashes everything."""
+        if not self.quick_samples or not self.supports_quick_check:
+            return False
+        return not (self.full_hash_every and self._checks % self.full_hash_every == 0)
@@ -0,0 +1,55 @@
+import os
+import sys
+
+HOME_VARIABLE = 'FIM_HOME'
+
+def default_data_dir():
+    """Where FIM keeps its baselines, logs and metrics on this OS, unless FIM_HOME says otherwise."""
+    if sys.platform == 'win32':
+        return os.path.join(os.environ.get('PROGRAMDATA', 'C:\\ProgramData'), 'FIM')
+    if sys.platform == 'darwin':
+        return os.path.expanduser('~/Library/Application Support/FIM')
+    if hasattr(os, 'geteuid') and os.geteuid() == 0:
+        return '/var/lib/fim'
+    return os.path.join(os.environ.get('XDG_DATA_HOME') or os.path.expanduser('~/.local/share'), 'fim')
+
+class DataPaths:
+    """Locations of the per-directory files FIM keeps under one data directory."""
+
+    def __init__(self, root=None):
+        self.root = root or os.environ.get(HOME_VARIABLE) or default_data_dir()
+        self.event_logs = os.path.join(self.root, "Events Logs")
+        self.comparison_logs = os.path.join(self.root, "Baselines Comparison Reports")
+        self.baselines = os.path.join(self.root, "Baselines")
+        self.metrics = os.path.join(self.root, "Metrics")
+
+    def ensure(self):
+        for path in (self.event_logs, self.comparison_logs, self.baselines, self.metrics):
+            os.makedirs(path, exist_ok=True)
+        return self
+
+    def baseline_file(self, directory):
+        return os.path.join(self.baselines, f"{os.path.basename(directory)}_baseline.db")
+
+    def cache_file(self, directory):
+        return os.path.join(self.baselines, f"{os.path.basename(directory)}_scan_cache.db")
+
+    def digest_cache_file(self):
+        # One for every directory, so content reachable from several of them is hashed once
+        return os.path.join(self.baselines, "digest_cache.db")
+
+    def event_log_file(self, directory):
+        return os.path.join(self.event_logs, f"{os.path.basename(directory)}_event_log.txt")
+
+    def event_store_file(self, directory):
+        return os.path.join(self.event_logs, f"{os.path.basename(directory)}_events.db")
+
+    def comparison_log_file(self, directory):
+        return os.path.join(self.comparison_logs, f"{os.path.basename(directory)}_comparison_log.txt")
+
+    def metrics_file(self, directory):
+        # One Prometheus text file per task, ready for a node_exporter textfile collector
+        return os.path.join(self.metrics, f"{os.path.basename(directory)}.prom")
+
+    def profile_path(self, directory):
+        return os.path.join(self.metrics, f"{os.path.basename(directory)}_profile")
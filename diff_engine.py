@@ -0,0 +1,272 @@
+import os
+import time
+import sqlite3
+from scanner import FolderRecord
+from baseline_store import iter_baseline_records
+from spill import SpillList, external_sort, SPILL_THRESHOLD
+
+ADDED = 'Added'
+DELETED = 'Deleted'
+MODIFIED = 'Modified'
+METADATA_CHANGED = 'Metadata changed'
+MOVED = 'Moved or renamed'
+
+class DiffResult:
+    """Outcome of a path-keyed diff. Only changed entries are kept; matches are just counted."""
+
+    def __init__(self, spill_threshold=SPILL_THRESHOLD):
+        self.matched_files = 0
+        self.matched_folders = 0
+        self.files = {kind: SpillList(spill_threshold) for kind in (ADDED, DELETED, MODIFIED, METADATA_CHANGED, MOVED)}
+        self.folders = {kind: SpillList(spill_threshold) for kind in (ADDED, DELETED)}
+
+    @property
+    def changed_files(self):
+        return sum(len(entries) for entries in self.files.values())
+
+    @property
+    def unchanged(self):
+        return not self.changed_files and not self.folders[ADDED] and not self.folders[DELETED]
+
+def _keyed(records):
+    """Pair each record with its sorted-walk key, relative to the stream's root folder."""
+    root = None
+    folder_key = ()
+    for record in records:
+        if isinstance(record, FolderRecord):
+            if root is None:
+                root = record.path
+            relative = os.path.relpath(record.path, root)
+            parts = () if relative == os.curdir else relative.split(os.sep)
+            folder_key = tuple((1, part) for part in parts)
+            yield folder_key, record
+        else:
+            yield folder_key + ((0, record.name),), record
+
+def is_sorted(records):
+    previous = None
+    for key, _ in _keyed(records):
+        if previous is not None and key < previous:
+            return False
+        previous = key
+    return True
+
+def sort_records(records, spill_threshold=SPILL_THRESHOLD):
+    """Reorder a record stream into sorted-walk order, in memory up to `spill_threshold` records, else on disk."""
+    return (record for _, record in external_sort(_keyed(records), lambda item: item[0], spill_threshold))
+
+def sorted_baseline_records(baseline_file, spill_threshold=SPILL_THRESHOLD):
+    """Stream a saved baseline in sorted-walk order, sorting only baselines written in another order."""
+    if is_sorted(iter_baseline_records(baseline_file)):
+        return iter_baseline_records(baseline_file)
+    return sort_records(iter_baseline_records(baseline_file), spill_threshold)
+
+def _same_metadata(old, new):
+    # Text baselines only keep whole seconds, so compare timestamps at that resolution
+    return (old.size == new.size and old.mtime_ns // 1_000_000_000 == new.mtime_ns // 1_000_000_000
+            and old.ctime_ns // 1_000_000_000 == new.ctime_ns // 1_000_000_000)
+
+def _classify(result, old, new):
+    if old.digest != new.digest:
+        result.files[MODIFIED].append((new.path, new.digest))
+    elif not _same_metadata(old, new):
+        result.files[METADATA_CHANGED].append((new.path, new.digest))
+    else:
+        result.matched_files += 1
+
+_HELD_SCHEMA = """
+CREATE TABLE deleted (seq INTEGER PRIMARY KEY, digest TEXT, path TEXT NOT NULL);
+CREATE INDEX deleted_digest ON deleted (digest, seq);
+CREATE TABLE digests (digest TEXT PRIMARY KEY, first INTEGER NOT NULL);  -- unreadable files' None digest is ''
+CREATE TABLE added (seq INTEGER PRIMARY KEY, digest TEXT, path TEXT NOT NULL);
+"""
+
+class _HeldFiles:
+    """Deleted and added files held back until a diff ends, so a digest that moved is paired up."""
+
+    def __init__(self, limit=SPILL_THRESHOLD):
+        self.limit = limit
+        self.deleted = {}  # digest -> [old paths], in the order first seen
+        self.added = []
+        self.count = 0
+        self.db = None
+
+    def delete(self, record):
+        if self.db is not None:
+            self._insert_deleted(record.digest, [record.path])
+            return
+        self.deleted.setdefault(record.digest, []).append(record.path)
+        self._held()
+
+    def add(self, record):
+        if self.db is not None:
+            self.db.execute("INSERT INTO added (digest, path) VALUES (?, ?)", (record.digest, record.path))
+            return
+        self.added.append(record)
+        self._held()
+
+    def _held(self):
+        self.count += 1
+        if self.count > self.limit:
+            self._spill()
+
+    def _spill(self):
+        # An empty name is a private on-disk database that SQLite deletes when it is closed
+        self.db = sqlite3.connect('')
+        self.db.execute("PRAGMA journal_mode=OFF")
+        self.db.execute("PRAGMA synchronous=OFF")
+        self.db.executescript(_HELD_SCHEMA)
+        for digest, paths in self.deleted.items():
+            self._insert_deleted(digest, paths)
+        self.db.executemany("INSERT INTO added (digest, path) VALUES (?, ?)",
+                            ((record.digest, record.path) for record in self.added))
+        self.deleted = {}
+        self.added = []
+
+    def _insert_deleted(self, digest, paths):
+        self.db.executemany("INSERT INTO deleted (digest, path) VALUES (?, ?)", ((digest, path) for path in paths))
+        self.db.execute("INSERT OR IGNORE INTO digests SELECT coalesce(?, ''), max(seq) FROM deleted", (digest,))
+
+    def pair_into(self, result):
+        """Report each added file whose digest was deleted elsewhere as a move, the rest as added and deleted."""
+        if self.db is None:
+            for record in self.added:
+                old_paths = self.deleted.get(record.digest)
+                if old_paths:
+                    result.files[MOVED].append((f"{old_paths.pop()} -> {record.path}", record.digest))
+                else:
+                    result.files[ADDED].append((record.path, record.digest))
+            for digest, old_paths in self.deleted.items():
+                result.files[DELETED].extend((path, digest) for path in old_paths)
+            return
+        # Same pairing and order as in memory: the latest deletion of a digest pairs with its next addition
+        db = self.db
+        for digest, path in db.execute("SELECT digest, path FROM added ORDER BY seq"):
+            old = db.execute("SELECT seq, path FROM deleted WHERE digest IS ? ORDER BY seq DESC LIMIT 1",
+                             (digest,)).fetchone()
+            if old is not None:
+                db.execute("DELETE FROM deleted WHERE seq = ?", (old[0],))
+                result.files[MOVED].append((f"{old[1]} -> {path}", digest))
+            else:
+                result.files[ADDED].append((path, digest))
+        for path, digest in db.execute("SELECT deleted.path, deleted.digest FROM deleted"
+                                       " JOIN digests ON digests.digest = coalesce(deleted.digest, '')"
+                                       " ORDER BY digests.first, deleted.seq"):
+            result.files[DELETED].append((path, digest))
+        db.close()
+        self.db = None
+
+def _record_deleted(result, held, record):
+    if isinstance(record, FolderRecord):
+        result.folders[DELETED].append(record.path)
+    else:
+        held.delete(record)
+
+def _record_added(result, held, record):
+    if isinstance(record, FolderRecord):
+        result.folders[ADDED].append(record.path)
+    else:
+        held.add(record)
+
+def diff_records(original, generated, spill_threshold=SPILL_THRESHOLD):
+    """Sort-merge join two record streams in sorted-walk order on path and classify every difference."""
+    result = DiffResult(spill_threshold)
+    held = _HeldFiles(spill_threshold)
+    original_items = _keyed(original)
+    generated_items = _keyed(generated)
+    old_key, old = next(original_items, (None, None))
+    new_key, new = next(generated_items, (None, None))
+
+    while old is not None or new is not None:
+        if new is None or (old is not None and old_key < new_key):
+            _record_deleted(result, held, old)
+            old_key, old = next(original_items, (None, None))
+        elif old is None or new_key < old_key:
+            _record_added(result, held, new)
+            new_key, new = next(generated_items, (None, None))
+        else:
+            if isinstance(new, FolderRecord):
+                result.matched_folders += 1
+            else:
+                _classify(result, old, new)
+            old_key, old = next(original_items, (None, None))
+            new_key, new = next(generated_items, (None, None))
+
+    held.pair_into(result)
+    return result
+
+def _diff_folders(original, current, old, new, result, held):
+    if old.digest == new.digest:
+        # Identical Merkle digests: the whole subtree matches and is never read
+        result.matched_files += old.tree_files
+        result.matched_folders += old.tree_folders
+        return
+    result.matched_folders += 1
+
+    old_files = {record.name: record for record in original.folder_files(old.id, old.path)}
+    for record in current.folder_files(new.id, new.path):
+        previous = old_files.pop(record.name, None)
+        if previous is None:
+            held.add(record)
+        else:
+            _classify(result, previous, record)
+    for record in old_files.values():
+        held.delete(record)
+
+    old_children = original.child_folders(old)
+    new_children = current.child_folders(new)
+    for name in sorted(old_children.keys() | new_children.keys()):
+        if name not in new_children:
+            for record in original.iter_subtree(old_children[name].path):
+                _record_deleted(result, held, record)
+        elif name not in old_children:
+            for record in current.iter_subtree(new_children[name].path):
+                _record_added(result, held, record)
+        else:
+            _diff_folders(original, current, old_children[name], new_children[name], result, held)
+
+def diff_stores(original, current, spill_threshold=SPILL_THRESHOLD):
+    """Diff two BaselineStores by descending only into folders whose Merkle digests differ."""
+    result = DiffResult(spill_threshold)
+    held = _HeldFiles(spill_threshold)
+    old_root = original.root()
+    new_root = current.root()
+    if old_root is None or new_root is None:
+        return diff_records(original.iter_records(), current.iter_records(), spill_threshold)
+    _diff_folders(original, current, old_root, new_root, result, held)
+    held.pair_into(result)
+    return result
+
+def iter_diff_report(result):
+    """Yield the comparison report of a DiffResult in chunks, so a spilled result is never held as one string."""
+    changed_folders = len(result.folders[ADDED]) + len(result.folders[DELETED])
+    total_items = result.matched_files + result.matched_folders + result.changed_files + changed_folders
+    matched_items = result.matched_files + result.matched_folders
+
+    if total_items > 0:
+        matching_percentage = round((matched_items / total_items) * 100)
+    else:
+        matching_percentage = 100
+
+    comparison_time = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime())
+
+    yield f"Comparison time: {comparison_time}"
+    yield f"\nNo of files matched: {result.matched_files}"
+    yield f"\nNo of files not matched: {result.changed_files}"
+    yield f"\nMatching percentage: {matching_percentage}%"
+
+    for kind, entries in result.files.items():
+        if entries:
+            yield f"\n\n{kind} files:"
+            for path, digest in entries:
+                yield f"\n  Path: {path}\n  Hash: {digest}"
+
+    for kind, folders in result.folders.items():
+        if folders:
+            yield f"\n\n{kind} directories:"
+            for folder in folders:
+                yield f"\n  Folder: {folder}"
+
+def render_diff_report(result):
+    """Format a DiffResult in the style of the comparison log."""
+    return ''.join(iter_diff_report(result))
@@ -0,0 +1,257 @@
+import os
+import time
+import queue
+import getpass
+import logging
+import threading
+
+MAX_QUEUE = 100000
+# Past the high watermark events are collapsed into dirty-subtree markers, until the queue is back at the low one
+HIGH_WATERMARK = 0.8
+LOW_WATERMARK = 0.2
+MAX_MARKERS = 1000
+STORM_RELEASE_SECONDS = 60  # during a long storm, the subtrees collected so far are handed over this often
+SUBTREE_DIRTY = "Subtree Dirty"
+DEBOUNCE_SECONDS = 1.0
+BATCH_SIZE = 1000
+FLUSH_INTERVAL = 0.2
+PRUNE_INTERVAL = 3600
+
+# Bursts of these on one path (editors, log writers, builds) collapse into a single log line
+COALESCED_EVENTS = ("File Modified", "Directory Modified")
+
+_STOP = object()
+
+def collapse_paths(paths, root, limit):
+    """Replace paths by their ancestors below `root` so at most `limit` remain; None if only the root would do."""
+    if len(paths) <= limit:
+        return set(paths)
+    if root is None or root in paths:
+        return None
+    prefix = root.rstrip(os.sep) + os.sep
+    components = [path[len(prefix):].split(os.sep) for path in paths if path.startswith(prefix)]
+    collapsed = set(paths)
+    depth = max((len(parts) for parts in components), default=0)
+    while len(collapsed) > limit:
+        depth -= 1
+        if depth <= 0:
+            return None
+        collapsed = {prefix + os.sep.join(parts[:depth]) for parts in components}
+    return collapsed
+
+def current_user():
+    """The login name, looked up once; os.getlogin() fails without a controlling terminal."""
+    try:
+        return os.getlogin()
+    except OSError:
+        return getpass.getuser()
+
+class BufferedFileHandler(logging.FileHandler):
+    """FileHandler that leaves flushing to the caller, so a whole batch of records costs one flush."""
+
+    def __init__(self, filename, rotator=None, **kwargs):
+        super().__init__(filename, **kwargs)
+        self.rotator = rotator
+
+    def flush(self):
+        super().flush()
+        if self.rotator is None or self.stream is None:
+            return
+        self.acquire()
+        try:
+            if self.rotator.due(self.stream.tell()):
+                self.stream.close()
+                self.stream = None
+                # The next emit() opens a fresh log; if the rename failed, it simply reopens this one
+                self.rotator.rotate()
+        finally:
+            self.release()
+
+    def emit(self, record):
+        if self.stream is None:
+            self.stream = self._open()
+        try:
+            self.stream.write(self.format(record) + self.terminator)
+        except Exception:
+            self.handleError(record)
+
+class EventPipeline:
+    """Asynchronous, coalescing event log writer for one monitored directory."""
+
+    def __init__(self, logger, max_queue=MAX_QUEUE, debounce=DEBOUNCE_SECONDS, batch_size=BATCH_SIZE,
+                 flush_interval=FLUSH_INTERVAL, store_path=None, retention=None, root=None, on_overflow=None):
+        self.logger = logger
+        self.store_path = store_path
+        self.retention = retention
+        self.root = root
+        self.on_overflow = on_overflow
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.high_watermark = int(max_queue * HIGH_WATERMARK)
+        self.low_watermark = int(max_queue * LOW_WATERMARK)
+        self.overflowing = False
+        self.overflows = 0
+        self.collapsed = 0
+        self._storm_started = self._last_collapsed = 0
+        self._markers = set()
+        self._markers_lock = threading.Lock()
+        self.debounce = debounce
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.user = current_user()
+        self.submitted = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.written = 0
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="fim-event-writer", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Write out everything still queued or held for coalescing, then stop the writer thread."""
+        if self._thread is not None:
+            self.queue.put(_STOP)
+            self._thread.join()
+            self._thread = None
+
+    def submit(self, event_type, src_path, dest_path=None):
+        """True if the event was queued on its own, False if it was collapsed into a dirty-subtree marker."""
+        if self.overflowing or self.queue.qsize() >= self.high_watermark:
+            self._collapse(event_type, src_path, dest_path)
+            return False
+        try:
+            self.queue.put_nowait((time.time(), event_type, src_path, dest_path))
+        except queue.Full:
+            # Only if other threads filled the queue past the high watermark meanwhile; the event is collapsed, not lost
+            self._collapse(event_type, src_path, dest_path)
+            return False
+        self.submitted += 1
+        return True
+
+    def _collapse(self, event_type, src_path, dest_path):
+        with self._markers_lock:
+            self._last_collapsed = time.time()
+            if not self.overflowing:
+                self.overflowing = True
+                self.overflows += 1
+                self._storm_started = self._last_collapsed
+            self.collapsed += 1
+            # A file event is covered by a rescan of its folder, a folder event by one of itself
+            is_folder = event_type.startswith("Directory")
+            self._markers.update(path if is_folder else os.path.dirname(path) for path in (src_path, dest_path) if path)
+            if self.root is not None and len(self._markers) > MAX_MARKERS:
+                # A quarter of the limit, so collapsing again isn't needed on the very next event
+                markers = collapse_paths(self._markers, self.root, MAX_MARKERS // 4)
+                self._markers = markers if markers is not None else {self.root}
+
+    def _release_markers(self, stopping):
+        """Dirty-subtree events for a storm that has passed (or for one cut short by stopping)."""
+        now = time.time()
+        with self._markers_lock:
+            if not self.overflowing:
+                return []
+            if now - self._storm_started >= STORM_RELEASE_SECONDS:
+                # Still collapsing, but rescans of what has been collected so far shouldn't wait any longer
+                self._storm_started = now
+            elif not stopping and (self.queue.qsize() > self.low_watermark or now - self._last_collapsed < self.debounce):
+                return []
+            else:
+                self.overflowing = False
+            markers, self._markers = sorted(self._markers), set()
+        if not markers:
+            return []
+        if self.on_overflow is not None:
+            self.on_overflow(markers)
+        return [(now, SUBTREE_DIRTY, marker, None) for marker in markers]
+
+    def stats(self):
+        return {
+            'submitted': self.submitted,
+            'written': self.written,
+            'coalesced': self.coalesced,
+            'dropped': self.dropped,
+            'queued': self.queue.qsize(),
+            'overflowing': self.overflowing,
+            'overflows': self.overflows,
+            'collapsed': self.collapsed,
+        }
+
+    def _take(self):
+        """Block briefly for one item, then take whatever else is already waiting, up to a batch."""
+        try:
+            items = [self.queue.get(timeout=self.flush_interval)]
+        except queue.Empty:
+            return []
+        while len(items) < self.batch_size:
+            try:
+                items.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return items
+
+    def _run(self):
+        # An sqlite3 connection belongs to the thread that opened it, so the writer opens its own
+        store = None
+        if self.store_path:
+            from event_store import EventStore
+            store = EventStore(self.store_path)
+        try:
+            self._drain(store)
+        finally:
+            if store is not None:
+                store.close()
+
+    def _drain(self, store):
+        held = {}  # src_path -> first modify event still inside its debounce window, oldest first
+        next_prune = time.time()
+        stopping = False
+        while not stopping:
+            batch = []
+            for item in self._take():
+                if item is _STOP:
+                    stopping = True
+                    continue
+                src_path = item[2]
+                if item[1] in COALESCED_EVENTS:
+                    if src_path in held:
+                        self.coalesced += 1
+                    else:
+                        held[src_path] = item
+                    continue
+                # Anything else on a held path releases the held modify first, to keep per-path order
+                if src_path in held:
+                    batch.append(held.pop(src_path))
+                batch.append(item)
+
+            now = time.time()
+            while held:
+                src_path, item = next(iter(held.items()))
+                if not stopping and now - item[0] < self.debounce:
+                    break
+                batch.append(held.pop(src_path))
+            batch += self._release_markers(stopping)
+
+            if batch:
+                self._write(batch, store)
+            if store is not None and self.retention and now >= next_prune:
+                store.delete_before(now - self.retention)
+                next_prune = now + PRUNE_INTERVAL
+
+    def _write(self, batch, store=None):
+        for created, event_type, src_path, dest_path in batch:
+            if dest_path:
+                message = f"{event_type} - {src_path} -> {dest_path}"
+            else:
+                message = f"{event_type} - {src_path}"
+            record = self.logger.makeRecord(self.logger.name, logging.INFO, __file__, 0, message, None, None,
+                                            extra={'user': self.user})
+            record.created = created
+            record.msecs = (created - int(created)) * 1000
+            self.logger.handle(record)
+        for handler in self.logger.handlers:
+            handler.flush()
+        if store is not None:
+            store.add(batch, self.user)
+        self.written += len(batch)
@@ -0,0 +1,122 @@
+import re
+import time
+import sqlite3
+from collections import namedtuple
+from baseline_store import SUBTREE_CLAUSE, subtree_params
+
+EVENT_TYPES = ("File Created", "File Deleted", "File Modified", "File Moved",
+               "Directory Created", "Directory Deleted", "Directory Modified", "Directory Moved", "Subtree Dirty")
+QUERY_LIMIT = 1000
+
+Event = namedtuple('Event', 'time type path dest user')
+
+# Event types and user names repeat on every row, so they are stored once and referenced by id;
+# paths stay inline because prefix queries need them in the index
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS event_types (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE);
+CREATE TABLE IF NOT EXISTS users (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE);
+CREATE TABLE IF NOT EXISTS events (id INTEGER PRIMARY KEY, time REAL NOT NULL, type INTEGER NOT NULL,
+                                   path TEXT NOT NULL, dest TEXT, user INTEGER);
+CREATE INDEX IF NOT EXISTS events_time ON events (time);
+CREATE INDEX IF NOT EXISTS events_path ON events (path, time);
+CREATE INDEX IF NOT EXISTS events_type ON events (type, time);
+"""
+
+class EventStore:
+    """Structured, indexed event log of one monitored directory, in SQLite."""
+
+    def __init__(self, path):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self._ids = {'event_types': {}, 'users': {}}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        self.conn.close()
+
+    def _id(self, table, name):
+        ids = self._ids[table]
+        if name not in ids:
+            self.conn.execute(f"INSERT OR IGNORE INTO {table} (name) VALUES (?)", (name,))
+            ids[name] = self.conn.execute(f"SELECT id FROM {table} WHERE name = ?", (name,)).fetchone()[0]
+        return ids[name]
+
+    def add(self, events, user=None):
+        """Store (time, type, path, dest path or None) events in one transaction."""
+        user_id = self._id('users', user) if user else None
+        with self.conn:
+            self.conn.executemany("INSERT INTO events (time, type, path, dest, user) VALUES (?, ?, ?, ?, ?)",
+                                  [(created, self._id('event_types', event_type), src_path, dest_path, user_id)
+                                   for created, event_type, src_path, dest_path in events])
+
+    def _where(self, under, event_types, since, until):
+        clauses = []
+        params = []
+        if under:
+            clauses.append(SUBTREE_CLAUSE)
+            params.extend(subtree_params(under))
+        if event_types:
+            type_ids = [row[0] for row in self.conn.execute(
+                f"SELECT id FROM event_types WHERE name IN ({','.join('?' * len(event_types))})", list(event_types))]
+            clauses.append(f"type IN ({','.join('?' * len(type_ids))})" if type_ids else "0")
+            params.extend(type_ids)
+        if since is not None:
+            clauses.append("time >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("time < ?")
+            params.append(until)
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+    def query(self, under=None, event_types=None, since=None, until=None, limit=QUERY_LIMIT, newest_first=True):
+        """Up to `limit` Events under `under`, of the given types, in [since, until), newest first by default."""
+        where, params = self._where(under, event_types, since, until)
+        sql = ("SELECT events.time, event_types.name, events.path, events.dest, users.name FROM events"
+               " JOIN event_types ON event_types.id = events.type LEFT JOIN users ON users.id = events.user"
+               f"{where} ORDER BY events.time {'DESC' if newest_first else 'ASC'}")
+        if limit is not None:
+            sql += f" LIMIT {int(limit)}"
+        return [Event(*row) for row in self.conn.execute(sql, params)]
+
+    def count(self, under=None, event_types=None, since=None, until=None):
+        where, params = self._where(under, event_types, since, until)
+        return self.conn.execute(f"SELECT COUNT(*) FROM events{where}", params).fetchone()[0]
+
+    def delete_before(self, before):
+        """Drop events older than `before` (seconds since the epoch); returns how many went."""
+        with self.conn:
+            return self.conn.execute("DELETE FROM events WHERE time < ?", (before,)).rowcount
+
+    def optimize(self):
+        # Refreshes the planner's statistics, so it keeps choosing the right index as the table grows
+        self.conn.execute("PRAGMA optimize")
+
+def format_event(event):
+    """An Event as a line in the style of the text event log."""
+    when = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(event.time))
+    target = f"{event.path} -> {event.dest}" if event.dest else event.path
+    return f"[{when}] - {event.user or ''} - {event.type} - {target}"
+
+_RELATIVE_TIME = re.compile(r'^(\d+(?:\.\d+)?)([smhd])$')
+_UNIT_SECONDS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+_TIME_FORMATS = ('%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M', '%Y-%m-%dT%H:%M:%S', '%Y-%m-%dT%H:%M', '%Y-%m-%d')
+
+def parse_time(text, now=None):
+    """Seconds since the epoch for a local 'YYYY-MM-DD[ HH:MM[:SS]]' time or an age such as '90m', '2h' or '7d'."""
+    match = _RELATIVE_TIME.match(text.strip())
+    if match:
+        return (time.time() if now is None else now) - float(match.group(1)) * _UNIT_SECONDS[match.group(2)]
+    for time_format in _TIME_FORMATS:
+        try:
+            return time.mktime(time.strptime(text.strip(), time_format))
+        except ValueError:
+            continue
+    raise ValueError(f"unrecognised time: {text!r}")
@@ -0,0 +1,455 @@
+"""Headless FIM: scan, compare and watch directories from the command line or as a daemon."""
+import os
+import sys
+import time
+import argparse
+
+def _directory(value):
+    if not os.path.isdir(value):
+        raise argparse.ArgumentTypeError(f"not a directory: {value}")
+    return os.path.abspath(value)
+
+def _add_scan_options(parser):
+    parser.add_argument('--workers', type=int, help="hashing workers (default: automatic)")
+    parser.add_argument('--walk-workers', type=int, help="threads listing folders ahead of the scan; "
+                                                         "helps on network filesystems (default: none)")
+    parser.add_argument('--max-read-rate', type=int, metavar='MB_PER_S', help="read bandwidth limit")
+    parser.add_argument('--max-files-rate', type=int, metavar='FILES_PER_S', help="file rate limit")
+    parser.add_argument('--drop-cache', action='store_true', help="evict hashed files from the page cache, "
+                                                                  "even pages other programs are using")
+    parser.add_argument('--no-digest-cache', action='store_true', help="hash every file instead of reusing digests "
+                                                                       "of unchanged files from earlier scans")
+    rules = parser.add_argument_group("filters", "Glob patterns without a '/' match names at any depth, ones with "
+                                                 "a '/' match paths relative to the directory. A baseline store keeps "
+                                                 "its filters, and checks against it reuse them.")
+    rules.add_argument('--exclude', action='append', metavar='GLOB', help="leave out matching files and folders")
+    rules.add_argument('--include', action='append', metavar='GLOB', help="only scan matching files")
+    rules.add_argument('--exclude-regex', action='append', metavar='REGEX',
+                       help="leave out files and folders whose relative path matches")
+    rules.add_argument('--include-regex', action='append', metavar='REGEX',
+                       help="only scan files whose relative path matches")
+    rules.add_argument('--extensions', metavar='EXT,EXT', help="only scan files with these extensions")
+    rules.add_argument('--exclude-extensions', metavar='EXT,EXT', help="leave out files with these extensions")
+    rules.add_argument('--max-file-size', type=float, metavar='MB', help="leave out larger files")
+    rules.add_argument('--one-file-system', action='store_true', help="don't descend into other mounted filesystems")
+
+def _filter_rules(args):
+    """FilterRules from the filter options, or None when none were given."""
+    import re
+    from path_filter import FilterRules, NO_RULES, split_list
+    rules = FilterRules(tuple(args.exclude or ()), tuple(args.include or ()), tuple(args.exclude_regex or ()),
+                        tuple(args.include_regex or ()), split_list(args.extensions), split_list(args.exclude_extensions),
+                        int(args.max_file_size * (1 << 20)) if args.max_file_size is not None else None,
+                        args.one_file_system)
+    if rules == NO_RULES:
+        return None
+    for regex in rules.exclude_regex + rules.include_regex:
+        try:
+            re.compile(regex)
+        except re.error as error:
+            sys.exit(f"fim {args.command}: bad regex {regex!r}: {error}")
+    return rules
+
+def _add_fleet_token(parser):
+    # From the environment by default, so the secret stays out of process listings
+    parser.add_argument('--token', default=os.environ.get('FIM_FLEET_TOKEN'),
+                        help="shared secret agents present to the collector (default: $FIM_FLEET_TOKEN)")
+
+def _digest_cache(args, paths):
+    if args.no_digest_cache:
+        return None
+    from scan_cache import shared_digest_cache
+    return shared_digest_cache(paths.ensure().digest_cache_file())
+
+def _throttle(args, parent=None):
+    from throttle import Throttle
+    return Throttle(args.max_read_rate, args.max_files_rate, parent=parent, drop_cache=args.drop_cache)
+
+def _algorithms(args):
+    algorithms = (args.algorithm,)
+    for extra in args.extra_algorithm or ():
+        if extra not in algorithms:
+            algorithms += (extra,)
+    return algorithms
+
+def _rotation(args):
+    from log_rotation import RotationPolicy, DEFAULT_POLICY
+    return RotationPolicy(args.log_max_mb << 20 if args.log_max_mb else DEFAULT_POLICY.max_bytes,
+                          args.log_max_age_days * 86400 if args.log_max_age_days else DEFAULT_POLICY.max_age,
+                          DEFAULT_POLICY.keep if args.log_keep is None else args.log_keep,
+                          args.log_retention_days * 86400 if args.log_retention_days else DEFAULT_POLICY.retention)
+
+def create_baseline(directory, baseline_file, algorithms, workers=None, cache_file=None, throttle=None,
+                    follow_symlinks=False, walk_workers=None, digest_cache=None, filter_rules=None):
+    """Scan `directory` into `baseline_file` (a store for .db paths, else a text report)."""
+    from scanner import iter_records
+    from baseline_store import save_baseline, STORE_EXTENSION
+    from scan_cache import RescanCache
+    from path_filter import compile_filter
+    # Seeding the rescan cache lets the first scheduled check skip every file unchanged since now
+    cache = RescanCache(cache_file, algorithm=algorithms[0]) if cache_file else None
+    blocks = baseline_file.endswith(STORE_EXTENSION)
+    records = iter_records(directory, workers, cache=cache, algorithms=algorithms, blocks=blocks, throttle=throttle,
+                           follow_symlinks=follow_symlinks, walk_workers=walk_workers, digest_cache=digest_cache,
+                           path_filter=compile_filter(directory, filter_rules))
+    save_baseline(records, baseline_file, directory, algorithms, filter_rules)
+
+def command_scan(args, paths):
+    output = args.output or paths.ensure().baseline_file(args.directory)
+    # Only a baseline in the data directory is the one `fim watch` checks against, so only it seeds the cache
+    cache_file = None if args.output else paths.cache_file(args.directory)
+    create_baseline(args.directory, output, _algorithms(args), args.workers, cache_file, _throttle(args),
+                    args.follow_symlinks, args.walk_workers, _digest_cache(args, paths), _filter_rules(args))
+    print(f"Baseline of {args.directory} saved to {output}")
+    return 0
+
+def command_compare(args, paths):
+    from scanner import iter_records, write_report
+    from baseline_store import baseline_algorithms, baseline_filter_rules
+    from diff_engine import sorted_baseline_records, diff_records, iter_diff_report
+    from path_filter import compile_filter
+    baseline_file = args.baseline or paths.baseline_file(args.directory)
+    if not os.path.exists(baseline_file):
+        sys.exit(f"fim compare: no baseline at {baseline_file}; create one with `fim scan`")
+    # Only the primary digest is compared, so any extra compliance digests are not recomputed
+    algorithms = baseline_algorithms(baseline_file)[:1]
+    # Without filter options the baseline's own apply, so what it left out isn't reported as deleted
+    rules = _filter_rules(args) or baseline_filter_rules(baseline_file)
+    result = diff_records(sorted_baseline_records(baseline_file, args.spill_threshold),
+                          iter_records(args.directory, args.workers, algorithms=algorithms, throttle=_throttle(args),
+                                       follow_symlinks=args.follow_symlinks, walk_workers=args.walk_workers,
+                                       digest_cache=_digest_cache(args, paths),
+                                       path_filter=compile_filter(args.directory, rules)),
+                          args.spill_threshold)
+    if args.output:
+        write_report(iter_diff_report(result), args.output)
+    else:
+        sys.stdout.writelines(iter_diff_report(result))
+        sys.stdout.write('\n')
+    # Like diff(1): 0 when nothing changed, 1 when something did, so scripts and cron can act on it
+    return 0 if result.unchanged else 1
+
+def command_watch(args, paths):
+    import logging
+    from throttle import Throttle
+    from scheduler import MonitoringScheduler
+    from comparison_task import ComparisonTask
+    from baseline_store import baseline_filter_rules
+    from path_filter import compile_filter
+
+    logging.basicConfig(level=logging.INFO, format='[%(asctime)s] %(levelname)s %(message)s',
+                        datefmt='%Y-%m-%d %H:%M:%S')
+    log = logging.getLogger('fim')
+    paths.ensure()
+    algorithms = _algorithms(args)
+    rotation = _rotation(args)
+    digest_cache = _digest_cache(args, paths)
+    filter_rules = _filter_rules(args)
+    global_throttle = Throttle(args.global_read_rate)
+    scheduler = MonitoringScheduler(args.max_concurrent)
+    event_monitor = None
+    if not args.no_events:
+        try:
+            from monitoring import DirectoryMonitor
+        except ImportError as error:
+            sys.exit(f"fim watch: file events need the watchdog package ({error}); --no-events runs without them")
+        # An event storm's collapsed subtrees are rescanned right away rather than at the next routine check
+        event_monitor = DirectoryMonitor(rotation=rotation, max_watches=args.max_watches, on_overflow=scheduler.run_now)
+    agent = None
+    if args.collector:
+        from fleet import FleetAgent
+        agent = FleetAgent(args.collector, args.host_name, args.token)
+
+    for directory in args.directories:
+        throttle = _throttle(args, global_throttle)
+        baseline_file = paths.baseline_file(directory)
+        if args.rebaseline or not os.path.exists(baseline_file):
+            log.info("Creating baseline of %s", directory)
+            create_baseline(directory, baseline_file, algorithms, args.workers, paths.cache_file(directory), throttle,
+                            walk_workers=args.walk_workers, digest_cache=digest_cache, filter_rules=filter_rules)
+        rules = baseline_filter_rules(baseline_file)
+        if filter_rules is not None and filter_rules != rules:
+            # Checking with other filters than the baseline's would report what they change as added or deleted
+            sys.exit(f"fim watch: the filter options differ from those of the baseline of {directory}; "
+                     f"add --rebaseline to rescan it with them")
+        path_filter = compile_filter(directory, rules)
+        if agent is not None:
+            agent.sync_baseline(directory, baseline_file)
+        dirty_set = None
+        if event_monitor is not None:
+            event_store = None if args.no_event_store else paths.event_store_file(directory)
+            event_monitor.start_monitoring(directory, paths.event_log_file(directory), event_store, path_filter)
+            dirty_set = event_monitor.get_dirty_set(directory)
+            stats = event_monitor.watch_stats(directory)
+            if stats['watch_budget'] is not None:
+                log.info("Watching %s with %d of %d budgeted inotify watches; %d folders polled", directory,
+                         stats['watches'], stats['watch_budget'], stats['polled_subtrees'] + stats['polled_folders'])
+        task = ComparisonTask(baseline_file, directory, paths.comparison_log_file(directory), args.interval,
+                              args.random_checks, args.workers, paths.cache_file(directory), args.paranoid_every,
+                              dirty_set, quick_samples=args.quick_samples, full_hash_every=args.full_hash_every,
+                              metrics_file=paths.metrics_file(directory), throttle=throttle,
+                              walk_workers=args.walk_workers, log_rotation=rotation, digest_cache=digest_cache,
+                              filter_rules=rules, spill_threshold=args.spill_threshold)
+        task.on_check_finished = lambda output_path, task=task: _check_finished(log, agent, task, output_path)
+        scheduler.add_task(task)
+        log.info("Monitoring %s", directory)
+
+    stop = _stop_on_signals()
+    scheduler.start()
+    # A timed wait keeps the main thread responsive to signals on every platform
+    while not stop.wait(1):
+        pass
+    log.info("Stopping")
+    scheduler.shutdown()
+    if event_monitor is not None:
+        event_monitor.stop_all()
+    if agent is not None:
+        agent.stop()
+    return 0
+
+def _check_finished(log, agent, task, output_path):
+    log.info("Finished integrity check of %s; report in %s", task.directory, output_path)
+    if agent is not None:
+        # In fleet mode the collector hears about every check's changes
+        agent.report(task.directory, task.last_result)
+
+def _stop_on_signals():
+    import signal
+    import threading
+    stop = threading.Event()
+    for name in ('SIGINT', 'SIGTERM'):
+        if hasattr(signal, name):
+            signal.signal(getattr(signal, name), lambda signum, frame: stop.set())
+    return stop
+
+def _fleet_address(value):
+    from fleet import parse_address
+    try:
+        return parse_address(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"not a host:port address: {value}") from None
+
+def command_collector(args, paths):
+    import logging
+    import threading
+    from fleet_collector import CollectorServer
+    logging.basicConfig(level=logging.INFO, format='[%(asctime)s] %(levelname)s %(message)s',
+                        datefmt='%Y-%m-%d %H:%M:%S')
+    store_file = args.db or os.path.join(paths.ensure().root, "fleet.db")
+    server = CollectorServer(args.listen, store_file, args.token)
+    logging.getLogger('fim').info("Collecting on %s:%s into %s", *server.server_address[:2], store_file)
+    thread = threading.Thread(target=server.serve_forever, name="fim-collector", daemon=True)
+    thread.start()
+    stop = _stop_on_signals()
+    while not stop.wait(1):
+        pass
+    server.shutdown()
+    server.server_close()
+    return 0
+
+def command_push(args, paths):
+    from fleet import FleetClient, ProtocolError
+    baseline_file = args.baseline or paths.baseline_file(args.directory)
+    if not os.path.exists(baseline_file):
+        sys.exit(f"fim push: no baseline at {baseline_file}; create one with `fim scan`")
+    try:
+        with FleetClient(args.collector, args.host_name, args.token) as client:
+            counts = client.sync_baseline(args.directory, baseline_file)
+            print(f"Baseline of {args.directory}: {counts['folders_sent']} folders ({counts['files_sent']} files) "
+                  f"sent, {counts['folders_deleted']} deleted")
+            if args.report:
+                from baseline_store import baseline_algorithms, baseline_filter_rules
+                from scanner import iter_records
+                from diff_engine import sorted_baseline_records, diff_records
+                from path_filter import compile_filter
+                path_filter = compile_filter(args.directory, baseline_filter_rules(baseline_file))
+                result = diff_records(sorted_baseline_records(baseline_file),
+                                      iter_records(args.directory, algorithms=baseline_algorithms(baseline_file)[:1],
+                                                   path_filter=path_filter))
+                client.send_changes(args.directory, result)
+                print(f"Comparison sent: {result.changed_files} changed files")
+    except (OSError, ProtocolError) as error:
+        sys.exit(f"fim push: {error}")
+    return 0
+
+def command_fleet_query(args, paths):
+    from fleet import FleetClient, ProtocolError
+    try:
+        with FleetClient(args.collector, token=args.token) as client:
+            if args.digest:
+                for host, directory, path, size in client.hosts_with_digest(args.digest):
+                    print(f"{host}\t{path}\t{size}")
+            else:
+                for host, last_seen, directories, files in client.hosts():
+                    seen = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(last_seen))
+                    print(f"{host}\tlast seen {seen}\t{directories} directories\t{files} files")
+    except (OSError, ProtocolError) as error:
+        sys.exit(f"fim fleet-query: {error}")
+    return 0
+
+def command_events(args, paths):
+    from event_store import EventStore, format_event, parse_time
+    store_file = args.db or paths.event_store_file(args.directory)
+    if not os.path.exists(store_file):
+        sys.exit(f"fim events: no event store at {store_file}; `fim watch` records one")
+    try:
+        since = parse_time(args.since) if args.since else None
+        until = parse_time(args.until) if args.until else None
+    except ValueError as error:
+        sys.exit(f"fim events: {error}")
+    under = os.path.abspath(args.under) if args.under else None
+    with EventStore(store_file) as store:
+        if args.count:
+            print(store.count(under, args.type, since, until))
+            return 0
+        for event in store.query(under, args.type, since, until, args.limit or None, not args.oldest_first):
+            print(format_event(event))
+    return 0
+
+def command_log(args, paths):
+    import collections
+    from log_rotation import read_lines
+    log_file = paths.comparison_log_file(args.directory) if args.comparison else paths.event_log_file(args.directory)
+    lines = read_lines(log_file, include_archived=not args.current)
+    if args.grep:
+        needle = args.grep.lower()
+        lines = (line for line in lines if needle in line.lower())
+    if args.tail:
+        lines = collections.deque(lines, maxlen=args.tail)
+    for line in lines:
+        sys.stdout.write(line)
+    return 0
+
+def command_gui(args, paths):
+    # The GUI reads FIM_HOME, so a --data-dir given here reaches it too
+    os.environ['FIM_HOME'] = paths.root
+    from PySide6.QtWidgets import QApplication
+    from main import FIMWindow
+    app = QApplication(sys.argv[:1])
+    window = FIMWindow()
+    window.show()
+    return app.exec()
+
+def build_parser():
+    from hash_engine import DEFAULT_ALGORITHM
+    from quick_check import FULL_HASH_EVERY
+    from scheduler import MAX_CONCURRENT_CHECKS
+    from event_store import EVENT_TYPES, QUERY_LIMIT
+    from log_rotation import DEFAULT_POLICY
+    from spill import SPILL_THRESHOLD
+    parser = argparse.ArgumentParser(prog='fim', description="File integrity monitoring without the GUI.")
+    parser.add_argument('--data-dir', help="where baselines, logs and metrics are kept "
+                                           "(default: $FIM_HOME, else the OS's application data directory)")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    scan = commands.add_parser('scan', help="create a baseline of a directory")
+    scan.add_argument('directory', type=_directory)
+    scan.add_argument('-o', '--output', help="baseline file; .db for a store, anything else for a text report "
+                                             "(default: the directory's baseline in the data directory)")
+    scan.add_argument('--algorithm', default=DEFAULT_ALGORITHM, help="primary digest algorithm")
+    scan.add_argument('--extra-algorithm', action='append', help="additional digest to record; repeatable")
+    scan.add_argument('--follow-symlinks', action='store_true', help="hash link targets and descend into "
+                                                                     "linked folders instead of recording the links")
+    _add_scan_options(scan)
+    scan.set_defaults(handler=command_scan)
+
+    compare = commands.add_parser('compare', help="compare a directory with its baseline; exits 1 on changes")
+    compare.add_argument('directory', type=_directory)
+    compare.add_argument('-b', '--baseline', help="baseline file (default: the directory's baseline in the data directory)")
+    compare.add_argument('-o', '--output', help="write the report here instead of to standard output")
+    compare.add_argument('--follow-symlinks', action='store_true', help="the baseline was made with --follow-symlinks")
+    compare.add_argument('--spill-threshold', type=int, default=SPILL_THRESHOLD, metavar='RECORDS',
+                         help="records a diff holds in memory before sorting and collecting on disk "
+                              "(default: %(default)s)")
+    _add_scan_options(compare)
+    compare.set_defaults(handler=command_compare)
+
+    watch = commands.add_parser('watch', help="log file events and run scheduled checks until interrupted")
+    watch.add_argument('directories', nargs='+', type=_directory, metavar='directory')
+    watch.add_argument('--interval', type=int, default=1, help="regular checks per hour")
+    watch.add_argument('--random-checks', type=int, default=0, help="extra checks at random times per interval")
+    watch.add_argument('--paranoid-every', type=int, default=0, help="rehash cached files every N checks (0: never)")
+    watch.add_argument('--quick-samples', type=int, default=0, help="blocks sampled per large file (0: full hashes)")
+    watch.add_argument('--full-hash-every', type=int, default=FULL_HASH_EVERY, help="every Nth check hashes everything")
+    watch.add_argument('--max-concurrent', type=int, default=MAX_CONCURRENT_CHECKS, help="checks allowed to run at once")
+    watch.add_argument('--global-read-rate', type=int, metavar='MB_PER_S', help="read bandwidth shared by all checks")
+    watch.add_argument('--algorithm', default=DEFAULT_ALGORITHM, help="primary digest algorithm for new baselines")
+    watch.add_argument('--extra-algorithm', action='append', help="additional digest for new baselines; repeatable")
+    watch.add_argument('--rebaseline', action='store_true', help="re-create the baselines before watching")
+    watch.add_argument('--spill-threshold', type=int, default=SPILL_THRESHOLD, metavar='RECORDS',
+                       help="records a check's diff holds in memory before using disk (default: %(default)s)")
+    watch.add_argument('--no-events', action='store_true', help="scheduled checks only, without the file event log")
+    watch.add_argument('--max-watches', type=int, metavar='N',
+                       help="inotify watches all roots may use; folders beyond them are polled "
+                            "(default: half of fs.inotify.max_user_watches)")
+    watch.add_argument('--no-event-store', action='store_true', help="log events as text only, without the "
+                                                                     "queryable event store")
+    watch.add_argument('--log-max-mb', type=int, metavar='MB',
+                       help=f"rotate a log when it reaches this size (default: {DEFAULT_POLICY.max_bytes >> 20})")
+    watch.add_argument('--log-max-age-days', type=int, metavar='DAYS',
+                       help=f"rotate a log after this many days (default: {DEFAULT_POLICY.max_age // 86400})")
+    watch.add_argument('--log-keep', type=int, metavar='N',
+                       help=f"compressed segments kept per log (default: {DEFAULT_POLICY.keep})")
+    watch.add_argument('--log-retention-days', type=int, metavar='DAYS',
+                       help=f"delete segments and stored events older than this (default: {DEFAULT_POLICY.retention // 86400})")
+    watch.add_argument('--collector', type=_fleet_address, metavar='HOST:PORT',
+                       help="also send baselines and check results to this fleet collector")
+    watch.add_argument('--host-name', help="name of this host in the fleet (default: its hostname)")
+    _add_fleet_token(watch)
+    _add_scan_options(watch)
+    watch.set_defaults(handler=command_watch)
+
+    events = commands.add_parser('events', help="query the file events recorded by `fim watch`")
+    events.add_argument('directory', type=os.path.abspath, help="the watched directory")
+    events.add_argument('--db', help="event store (default: the directory's store in the data directory)")
+    events.add_argument('--under', metavar='PATH', help="only events on PATH and below it")
+    events.add_argument('--type', action='append', choices=EVENT_TYPES, metavar='TYPE',
+                        help=f"only this event type, e.g. 'File Modified'; repeatable ({', '.join(EVENT_TYPES)})")
+    events.add_argument('--since', metavar='TIME', help="from TIME: 'YYYY-MM-DD[ HH:MM[:SS]]' or an age like 2h or 7d")
+    events.add_argument('--until', metavar='TIME', help="before TIME, in the same forms")
+    events.add_argument('--limit', type=int, default=QUERY_LIMIT, help="events shown at most (0: all)")
+    events.add_argument('--oldest-first', action='store_true', help="oldest events first (default: newest first)")
+    events.add_argument('--count', action='store_true', help="only count the matching events")
+    events.set_defaults(handler=command_events)
+
+    log = commands.add_parser('log', help="print a directory's event or comparison log, archived segments included")
+    log.add_argument('directory', type=os.path.abspath, help="the watched directory")
+    log.add_argument('--comparison', action='store_true', help="the comparison report log instead of the event log")
+    log.add_argument('--current', action='store_true', help="only the live segment, not the archived ones")
+    log.add_argument('--grep', metavar='TEXT', help="only lines containing TEXT (case-insensitive)")
+    log.add_argument('--tail', type=int, metavar='N', help="only the last N lines")
+    log.set_defaults(handler=command_log)
+
+    collector = commands.add_parser('collector', help="collect baselines and changes from fleet agents")
+    collector.add_argument('--listen', type=_fleet_address, default=_fleet_address('127.0.0.1'),
+                           help="address to listen on (default: 127.0.0.1:7600; use 0.0.0.0:7600 for all interfaces)")
+    collector.add_argument('--db', help="fleet store (default: fleet.db in the data directory)")
+    _add_fleet_token(collector)
+    collector.set_defaults(handler=command_collector)
+
+    push = commands.add_parser('push', help="upload a directory's baseline to a fleet collector")
+    push.add_argument('directory', type=_directory)
+    push.add_argument('--collector', type=_fleet_address, required=True, metavar='HOST:PORT')
+    push.add_argument('-b', '--baseline', help="baseline file (default: the directory's baseline in the data directory)")
+    push.add_argument('--report', action='store_true', help="also compare the directory and send the changes")
+    push.add_argument('--host-name', help="name of this host in the fleet (default: its hostname)")
+    _add_fleet_token(push)
+    push.set_defaults(handler=command_push)
+
+    fleet_query = commands.add_parser('fleet-query', help="ask a fleet collector which hosts have a digest")
+    fleet_query.add_argument('--collector', type=_fleet_address, required=True, metavar='HOST:PORT')
+    fleet_query.add_argument('--digest', help="list every file with this digest (default: list the hosts)")
+    _add_fleet_token(fleet_query)
+    fleet_query.set_defaults(handler=command_fleet_query)
+
+    gui = commands.add_parser('gui', help="open the desktop application (needs PySide6)")
+    gui.set_defaults(handler=command_gui)
+    return parser
+
+def main(argv=None):
+    from data_paths import DataPaths
+    args = build_parser().parse_args(argv)
+    return args.handler(args, DataPaths(args.data_dir))
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,251 @@
+"""Agent side of fleet mode: upload baselines and comparison deltas to a collector (fleet_collector.py)."""
+import os
+import json
+import zlib
+import time
+import socket
+import struct
+import hashlib
+import logging
+import threading
+from collections import deque
+from itertools import chain, islice
+from scanner import FolderRecord
+from baseline_store import iter_baseline_records, baseline_algorithms
+
+DEFAULT_PORT = 7600
+MAX_FRAME = 64 << 20
+MAX_MESSAGE = 256 << 20  # a frame's size once decompressed
+MAX_HELLO = 64 << 10  # frame and decompressed size of a hello, read before the peer is authenticated
+BATCH_FILES = 5000  # file records or change entries per frame
+TIMEOUT = 60
+RETRY_SECONDS = 60
+MAX_PENDING = 1000  # comparison deltas held while the collector is unreachable
+
+_LENGTH = struct.Struct('>I')
+
+log = logging.getLogger('fim.fleet')
+
+class ProtocolError(Exception):
+    """The other side sent something that isn't a valid frame, or refused the request."""
+
+def parse_address(text, default_host='127.0.0.1'):
+    """(host, port) from 'host:port', 'host' or ':port'."""
+    host, _, port = text.rpartition(':') if ':' in text else (text, '', '')
+    return host.strip('[]') or default_host, int(port) if port else DEFAULT_PORT
+
+def send_message(sock, message):
+    payload = zlib.compress(json.dumps(message, separators=(',', ':')).encode('utf-8'))
+    sock.sendall(_LENGTH.pack(len(payload)) + payload)
+
+def _receive_exactly(sock, size):
+    data = bytearray()
+    while len(data) < size:
+        chunk = sock.recv(min(size - len(data), 1 << 20))
+        if not chunk:
+            raise ConnectionError("connection closed mid-frame" if data else "connection closed")
+        data += chunk
+    return bytes(data)
+
+def receive_message(sock, max_size=MAX_MESSAGE):
+    """The next message; its frame may be at most MAX_FRAME bytes, and `max_size` once decompressed."""
+    size, = _LENGTH.unpack(_receive_exactly(sock, _LENGTH.size))
+    if size > min(MAX_FRAME, max_size):
+        raise ProtocolError(f"frame of {size} bytes exceeds the {min(MAX_FRAME, max_size)} byte limit")
+    # Capped, so a small frame can't inflate without limit
+    decompressor = zlib.decompressobj()
+    try:
+        payload = decompressor.decompress(_receive_exactly(sock, size), max_size)
+        if decompressor.unconsumed_tail:
+            raise ProtocolError(f"frame decompresses to more than {max_size} bytes")
+        if not decompressor.eof:
+            raise ProtocolError("malformed frame: truncated")
+        message = json.loads(payload)
+    except (zlib.error, ValueError) as error:
+        raise ProtocolError(f"malformed frame: {error}") from None
+    if not isinstance(message, dict):
+        raise ProtocolError("malformed frame: not an object")
+    if message.get('type') == 'error':
+        raise ProtocolError(message.get('message', "request refused"))
+    return message
+
+def fingerprint(files):
+    """Digest of one folder's [name, size, mtime_ns, digest] file rows; equal when nothing in it changed."""
+    h = hashlib.sha256()
+    for name, size, mtime_ns, digest in files:
+        h.update(f"{name}\0{size}\0{mtime_ns}\0{digest}\n".encode('utf-8', 'surrogateescape'))
+    return h.hexdigest()
+
+def iter_folders(records):
+    """(folder path, [[name, size, mtime_ns, digest], ...]) per folder of a record stream."""
+    folder = None
+    files = []
+    for record in records:
+        if isinstance(record, FolderRecord):
+            if folder is not None:
+                yield folder, files
+            folder = record.path
+            files = []
+        else:
+            files.append([record.name, record.size, record.mtime_ns, record.digest])
+    if folder is not None:
+        yield folder, files
+
+class FleetClient:
+    """One connection to a collector; every request is answered before the next is sent."""
+
+    def __init__(self, address, host_name=None, token=None, timeout=TIMEOUT):
+        self.host_name = host_name or socket.gethostname()
+        self.sock = socket.create_connection(address, timeout=timeout)
+        try:
+            send_message(self.sock, {'type': 'hello', 'host': self.host_name, 'token': token})
+            receive_message(self.sock)
+        except Exception:
+            self.sock.close()
+            raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        self.sock.close()
+
+    def request(self, message):
+        send_message(self.sock, message)
+        return receive_message(self.sock)
+
+    def sync_baseline(self, directory, baseline_file):
+        """Bring the collector's copy of a baseline (a store or a text report) up to date; returns its counts."""
+        state = self.request({'type': 'sync', 'directory': directory, 'separator': os.sep,
+                              'algorithm': baseline_algorithms(baseline_file)[0]})
+        known = state['folders']
+        batch = []
+        batch_files = 0
+        sent_folders = sent_files = 0
+        for folder, files in iter_folders(iter_baseline_records(baseline_file)):
+            digest = fingerprint(files)
+            if known.pop(folder, None) == digest:
+                continue
+            batch.append([folder, digest, files])
+            batch_files += len(files) + 1
+            if batch_files >= BATCH_FILES:
+                self.request({'type': 'folders', 'folders': batch})
+                sent_folders += len(batch)
+                sent_files += batch_files - len(batch)
+                batch = []
+                batch_files = 0
+        if batch:
+            self.request({'type': 'folders', 'folders': batch})
+            sent_folders += len(batch)
+            sent_files += batch_files - len(batch)
+        # Whatever the collector knows but the baseline no longer has was deleted
+        self.request({'type': 'end', 'deleted': list(known)})
+        return {'folders_sent': sent_folders, 'files_sent': sent_files, 'folders_deleted': len(known)}
+
+    def send_changes(self, directory, result, checked=None):
+        """Report the changed entries of a comparison (a diff_engine.DiffResult); returns how many were sent."""
+        entries = chain(([kind, path, digest] for kind, changed in result.files.items() for path, digest in changed),
+                        ([kind, folder, None] for kind, folders in result.folders.items() for folder in folders))
+        checked = checked or time.time()
+        sent = 0
+        while True:
+            batch = list(islice(entries, BATCH_FILES))
+            if batch or not sent:
+                self.request({'type': 'changes', 'directory': directory, 'time': checked, 'first': not sent,
+                              'matched': result.matched_files, 'entries': batch})
+                sent += len(batch)
+            if len(batch) < BATCH_FILES:
+                return sent
+
+    def hosts_with_digest(self, digest):
+        """[host, directory, path, size] rows of every file in the fleet with this digest."""
+        return self.request({'type': 'query', 'digest': digest.lower()})['matches']
+
+    def hosts(self):
+        """[host, last seen, directories, files] rows of every host that has connected."""
+        return self.request({'type': 'hosts'})['hosts']
+
+class FleetAgent:
+    """Background uploader for `fim watch`: syncs baselines and reports each check's changes."""
+
+    def __init__(self, address, host_name=None, token=None):
+        self.address = address
+        self.host_name = host_name
+        self.token = token
+        self._lock = threading.Lock()
+        self._baselines = {}  # directory -> baseline file awaiting a sync
+        self._changes = deque(maxlen=MAX_PENDING)
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="fim-fleet-agent", daemon=True)
+        self._thread.start()
+
+    def sync_baseline(self, directory, baseline_file):
+        with self._lock:
+            self._baselines[directory] = baseline_file
+        self._wake.set()
+
+    def report(self, directory, result):
+        with self._lock:
+            self._changes.append((directory, result, time.time()))
+        self._wake.set()
+
+    def stop(self):
+        """Try once more to deliver what is pending, then stop."""
+        self._stopping.set()
+        self._wake.set()
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            self._wake.wait()
+            self._wake.clear()
+            with self._lock:
+                pending = bool(self._baselines or self._changes)
+            if pending:
+                try:
+                    self._deliver()
+                except (OSError, ProtocolError, KeyError) as error:
+                    log.warning("Fleet collector %s:%s unavailable: %s", *self.address, error)
+                    # New work doesn't hasten the retry, so an unreachable collector costs one attempt per interval
+                    if self._stopping.wait(RETRY_SECONDS):
+                        return
+                    self._wake.set()
+            # A refusal wakes the loop again, so what was queued behind it still gets its attempt
+            if self._stopping.is_set() and not self._wake.is_set():
+                return
+
+    def _deliver(self):
+        with FleetClient(self.address, self.host_name, self.token) as client:
+            while True:
+                with self._lock:
+                    if self._baselines:
+                        directory, baseline_file = self._baselines.popitem()
+                        change = None
+                    elif self._changes:
+                        change = self._changes.popleft()
+                    else:
+                        return
+                try:
+                    if change is None:
+                        counts = client.sync_baseline(directory, baseline_file)
+                        log.info("Synced baseline of %s to the fleet collector: %s", directory, counts)
+                    else:
+                        client.send_changes(*change)
+                except ProtocolError as error:
+                    refused = f"baseline of {directory}" if change is None else f"changes to {change[0]}"
+                    log.error("Fleet collector %s:%s refused the %s, dropped: %s", *self.address, refused, error)
+                    # The collector hangs up after refusing; the rest goes on a new connection
+                    self._wake.set()
+                    return
+                except Exception:
+                    # Put it back for the next attempt, unless a newer sync of the same baseline was queued
+                    with self._lock:
+                        if change is None:
+                            self._baselines.setdefault(directory, baseline_file)
+                        else:
+                            self._changes.appendleft(change)
+                    raise
@@ -0,0 +1,189 @@
+import hmac
+import time
+import sqlite3
+import logging
+import socketserver
+from collections import namedtuple
+from fleet import send_message, receive_message, ProtocolError, MAX_HELLO
+
+log = logging.getLogger('fim.fleet')
+
+Match = namedtuple('Match', 'host directory path size')
+HostSummary = namedtuple('HostSummary', 'host last_seen directories files')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS hosts (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE, last_seen REAL);
+CREATE TABLE IF NOT EXISTS roots (id INTEGER PRIMARY KEY, host INTEGER NOT NULL, directory TEXT NOT NULL,
+                                  algorithm TEXT, separator TEXT, synced REAL, UNIQUE (host, directory));
+CREATE TABLE IF NOT EXISTS folders (id INTEGER PRIMARY KEY, root INTEGER NOT NULL, path TEXT NOT NULL,
+                                    fingerprint TEXT, UNIQUE (root, path));
+CREATE TABLE IF NOT EXISTS files (folder INTEGER NOT NULL, name TEXT NOT NULL, size INTEGER, mtime_ns INTEGER,
+                                  digest BLOB);
+CREATE INDEX IF NOT EXISTS files_folder ON files (folder);
+CREATE INDEX IF NOT EXISTS files_digest ON files (digest);
+CREATE TABLE IF NOT EXISTS changes (id INTEGER PRIMARY KEY, root INTEGER NOT NULL, time REAL NOT NULL,
+                                    kind TEXT NOT NULL, path TEXT NOT NULL, digest TEXT);
+CREATE INDEX IF NOT EXISTS changes_root ON changes (root, time);
+"""
+
+class FleetStore:
+    """The collector's SQLite store: every host's baselines, folder by folder, and their reported changes."""
+
+    def __init__(self, path):
+        self.path = path
+        # Each connection handler has its own store; they take turns writing
+        self.conn = sqlite3.connect(path, timeout=60)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        self.conn.close()
+
+    def host_id(self, name):
+        with self.conn:
+            self.conn.execute("INSERT INTO hosts (name, last_seen) VALUES (?, ?)"
+                              " ON CONFLICT (name) DO UPDATE SET last_seen = excluded.last_seen", (name, time.time()))
+        return self.conn.execute("SELECT id FROM hosts WHERE name = ?", (name,)).fetchone()[0]
+
+    def root_id(self, host_id, directory, algorithm=None, separator=None):
+        with self.conn:
+            self.conn.execute("INSERT INTO roots (host, directory, algorithm, separator) VALUES (?, ?, ?, ?)"
+                              " ON CONFLICT (host, directory) DO UPDATE SET"
+                              " algorithm = coalesce(excluded.algorithm, algorithm),"
+                              " separator = coalesce(excluded.separator, separator)",
+                              (host_id, directory, algorithm, separator))
+        return self.conn.execute("SELECT id FROM roots WHERE host = ? AND directory = ?",
+                                 (host_id, directory)).fetchone()[0]
+
+    def fingerprints(self, root_id):
+        return dict(self.conn.execute("SELECT path, fingerprint FROM folders WHERE root = ?", (root_id,)))
+
+    def replace_folders(self, root_id, folders):
+        """Store [path, fingerprint, [[name, size, mtime_ns, digest], ...]] folders in one transaction."""
+        with self.conn:
+            for path, fingerprint, files in folders:
+                self.conn.execute("INSERT INTO folders (root, path, fingerprint) VALUES (?, ?, ?)"
+                                  " ON CONFLICT (root, path) DO UPDATE SET fingerprint = excluded.fingerprint",
+                                  (root_id, path, fingerprint))
+                folder_id = self.conn.execute("SELECT id FROM folders WHERE root = ? AND path = ?",
+                                              (root_id, path)).fetchone()[0]
+                self.conn.execute("DELETE FROM files WHERE folder = ?", (folder_id,))
+                self.conn.executemany("INSERT INTO files VALUES (?, ?, ?, ?, ?)",
+                                      [(folder_id, name, size, mtime_ns, bytes.fromhex(digest))
+                                       for name, size, mtime_ns, digest in files])
+
+    def delete_folders(self, root_id, paths):
+        with self.conn:
+            for path in paths:
+                row = self.conn.execute("SELECT id FROM folders WHERE root = ? AND path = ?", (root_id, path)).fetchone()
+                if row:
+                    self.conn.execute("DELETE FROM files WHERE folder = ?", row)
+                    self.conn.execute("DELETE FROM folders WHERE id = ?", row)
+            self.conn.execute("UPDATE roots SET synced = ? WHERE id = ?", (time.time(), root_id))
+
+    def add_changes(self, root_id, checked, entries, first=True):
+        """Store a batch of a check's changes; the first batch replaces any earlier upload of the same check."""
+        with self.conn:
+            if first:
+                self.conn.execute("DELETE FROM changes WHERE root = ? AND time = ?", (root_id, checked))
+            self.conn.executemany("INSERT INTO changes (root, time, kind, path, digest) VALUES (?, ?, ?, ?, ?)",
+                                  [(root_id, checked, kind, path, digest) for kind, path, digest in entries])
+
+    def hosts_with_digest(self, digest):
+        """Every file in the fleet with this (hex) digest, as Match rows."""
+        return [Match(*row) for row in self.conn.execute(
+            # Paths are joined with the separator of the host they came from
+            "SELECT hosts.name, roots.directory, folders.path || coalesce(roots.separator, '/') || files.name,"
+            " files.size FROM files JOIN folders ON folders.id = files.folder JOIN roots ON roots.id = folders.root"
+            " JOIN hosts ON hosts.id = roots.host WHERE files.digest = ? ORDER BY hosts.name, 3",
+            (bytes.fromhex(digest),))]
+
+    def hosts(self):
+        return [HostSummary(*row) for row in self.conn.execute(
+            "SELECT hosts.name, hosts.last_seen, COUNT(DISTINCT roots.id), COUNT(files.folder) FROM hosts"
+            " LEFT JOIN roots ON roots.host = hosts.id LEFT JOIN folders ON folders.root = roots.id"
+            " LEFT JOIN files ON files.folder = folders.id GROUP BY hosts.id ORDER BY hosts.name")]
+
+class _CollectorHandler(socketserver.BaseRequestHandler):
+    """One agent connection: a hello, then requests answered in order until the agent hangs up."""
+
+    def handle(self):
+        self.request.settimeout(self.server.timeout_seconds)
+        try:
+            host = self._authenticate()
+            with FleetStore(self.server.store_path) as store:
+                self._serve(store, host)
+        except OSError:
+            # The agent hung up or went quiet past the timeout
+            pass
+        except (ProtocolError, ValueError, KeyError, TypeError) as error:
+            log.warning("Fleet agent %s sent a bad request: %s", self.client_address[0], error)
+            try:
+                send_message(self.request, {'type': 'error', 'message': str(error)})
+            except OSError:
+                pass
+
+    def _authenticate(self):
+        """Read the hello and check its token before anything else is done for the peer; returns its host name."""
+        hello = receive_message(self.request, MAX_HELLO)
+        token = self.server.token
+        if token and not hmac.compare_digest(str(hello.get('token')).encode('utf-8', 'surrogateescape'),
+                                             token.encode('utf-8', 'surrogateescape')):
+            raise ProtocolError("not authorised")
+        if hello.get('type') != 'hello':
+            raise ProtocolError("not authorised")
+        send_message(self.request, {'type': 'welcome'})
+        # Only agents (which upload) become hosts; a client that only asks questions isn't one
+        return str(hello.get('host') or '')
+
+    def _serve(self, store, host):
+        host_id = root_id = None
+        while True:
+            message = receive_message(self.request)
+            kind = message['type']
+            if kind in ('sync', 'changes') and host_id is None:
+                if not host:
+                    raise ProtocolError("uploads need a host name")
+                host_id = store.host_id(host)
+            if kind == 'sync':
+                root_id = store.root_id(host_id, message['directory'], message.get('algorithm'),
+                                        message.get('separator'))
+                reply = {'type': 'state', 'folders': store.fingerprints(root_id)}
+            elif kind == 'folders' and root_id is not None:
+                store.replace_folders(root_id, message['folders'])
+                reply = {'type': 'ok'}
+            elif kind == 'end' and root_id is not None:
+                store.delete_folders(root_id, message['deleted'])
+                reply = {'type': 'ok'}
+            elif kind == 'changes':
+                store.add_changes(store.root_id(host_id, message['directory']), message['time'], message['entries'],
+                                  message.get('first', True))
+                reply = {'type': 'ok'}
+            elif kind == 'query':
+                reply = {'type': 'matches', 'matches': store.hosts_with_digest(message['digest'])}
+            elif kind == 'hosts':
+                reply = {'type': 'hosts', 'hosts': store.hosts()}
+            else:
+                raise ProtocolError(f"unexpected {kind!r} request")
+            send_message(self.request, reply)
+
+class CollectorServer(socketserver.ThreadingTCPServer):
+    """TCP collector for fleet agents; each connection is served on its own thread."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address, store_path, token=None, timeout=300):
+        self.store_path = store_path
+        self.token = token
+        self.timeout_seconds = timeout
+        # Creates the schema before the first agent arrives
+        FleetStore(store_path).close()
+        super().__init__(address, _CollectorHandler)
@@ -0,0 +1,249 @@
+import os
+import mmap
+import time
+import hashlib
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from throttle import advise_sequential, drop_from_cache
+
+DEFAULT_ALGORITHM = 'sha256'
+DEFAULT_BLOCK_SIZE = 1 << 20  # 1 MiB: large enough that hashlib drops the GIL for nearly all the work
+MMAP_THRESHOLD = 64 << 20  # files this big are hashed straight from the page cache, with no copy
+BLOCK_DIGEST_MIN_SIZE = 16 << 20  # smaller files are cheap enough to always hash in full
+MAX_BLOCK_DIGESTS = 4096
+BLOCK_DIGEST_SIZE = 16
+
+_buffers = threading.local()
+
+def available_algorithms():
+    """hashlib algorithms usable for baselines (variable-length SHAKE digests are left out)."""
+    return sorted(name for name in hashlib.algorithms_available if not name.startswith('shake'))
+
+def _buffer(block_size):
+    # One reusable read buffer per thread instead of a new bytes object for every chunk
+    buffer = getattr(_buffers, 'buffer', None)
+    if buffer is None or len(buffer) < block_size:
+        buffer = _buffers.buffer = bytearray(block_size)
+    return buffer
+
+def _block_hasher():
+    return hashlib.blake2b(digest_size=BLOCK_DIGEST_SIZE)
+
+def sample_block_size(size):
+    """Block size of the quick-check digests for a `size`-byte file: a power of two, MAX_BLOCK_DIGESTS blocks at most."""
+    block_size = DEFAULT_BLOCK_SIZE
+    while size > block_size * MAX_BLOCK_DIGESTS:
+        block_size *= 2
+    return block_size
+
+def _read_full(f, view):
+    # readinto() may stop short (network filesystems); block digests need exact block boundaries
+    filled = 0
+    while filled < len(view):
+        count = f.readinto(view[filled:])
+        if not count:
+            break
+        filled += count
+    return filled
+
+def _chunks(f, size, block_size, throttle=None, drop_cache=False):
+    """Yield the open file as consecutive memoryviews of `block_size` bytes, paced by `throttle`."""
+    fd = f.fileno()
+    if drop_cache:
+        advise_sequential(fd)
+    if size >= MMAP_THRESHOLD and throttle is None:
+        with mmap.mmap(fd, 0, access=mmap.ACCESS_READ) as mapped, memoryview(mapped) as view:
+            for offset in range(0, size, block_size):
+                with view[offset:offset + block_size] as chunk:
+                    yield chunk
+        if drop_cache:
+            drop_from_cache(fd)
+    else:
+        offset = 0
+        with memoryview(_buffer(block_size)) as whole, whole[:block_size] as view:
+            while True:
+                start = time.perf_counter()
+                count = _read_full(f, view)
+                if throttle is not None:
+                    # Charged after the read, so a small file costs its size rather than a whole block
+                    throttle.observe(time.perf_counter() - start, count)
+                    throttle.acquire_bytes(count)
+                if not count:
+                    break
+                with view[:count] as chunk:
+                    yield chunk
+                if drop_cache:
+                    drop_from_cache(fd, offset, count)
+                offset += count
+
+def hash_file(file_path, algorithms=(DEFAULT_ALGORITHM,), block_size=None, with_blocks=False, throttle=None,
+              drop_cache=False):
+    """Hash a file with every algorithm in one read pass; returns a tuple of hex digests."""
+    hashers = [hashlib.new(algorithm) for algorithm in algorithms]
+    block_digests = None
+    with open(file_path, 'rb', buffering=0) as f:
+        size = os.fstat(f.fileno()).st_size
+        if with_blocks and size >= BLOCK_DIGEST_MIN_SIZE:
+            # Blocks can be far larger than a read, so each block digest is fed chunk by chunk
+            sample_size = sample_block_size(size)
+            block_digests = bytearray()
+            block_hasher = _block_hasher()
+            block_left = sample_size
+        for chunk in _chunks(f, size, block_size or DEFAULT_BLOCK_SIZE, throttle, drop_cache):
+            for hasher in hashers:
+                hasher.update(chunk)
+            if block_digests is None:
+                continue
+            offset = 0
+            while offset < len(chunk):
+                count = min(block_left, len(chunk) - offset)
+                with chunk[offset:offset + count] as piece:
+                    block_hasher.update(piece)
+                offset += count
+                block_left -= count
+                if not block_left:
+                    block_digests += block_hasher.digest()
+                    block_hasher = _block_hasher()
+                    block_left = sample_size
+        if block_digests is not None and block_left < sample_size:
+            block_digests += block_hasher.digest()
+    digests = tuple(hasher.hexdigest() for hasher in hashers)
+    if with_blocks:
+        digests += ((sample_size, bytes(block_digests)) if block_digests is not None else None,)
+    return digests
+
+def hash_sampled(file_path, algorithms, block_size, sample, throttle=None, drop_cache=False):
+    """Quick check: hash only the sampled blocks, falling back to a full hash on any mismatch."""
+    digest, sample_size, expected = sample
+    matched = True
+    read_size = min(sample_size, DEFAULT_BLOCK_SIZE)
+    with open(file_path, 'rb', buffering=0) as f:
+        with memoryview(_buffer(read_size)) as whole, whole[:read_size] as view:
+            for index, block_digest in expected:
+                f.seek(index * sample_size)
+                block_hasher = _block_hasher()
+                block_left = sample_size
+                while block_left:
+                    with view[:min(block_left, read_size)] as part:
+                        count = _read_full(f, part)
+                    if throttle is not None:
+                        throttle.acquire_bytes(count)
+                    if not count:
+                        break
+                    with view[:count] as chunk:
+                        block_hasher.update(chunk)
+                    block_left -= count
+                if drop_cache:
+                    drop_from_cache(f.fileno(), index * sample_size, sample_size - block_left)
+                if block_hasher.digest() != block_digest:
+                    matched = False
+                    break
+    if matched:
+        return (digest,)
+    return hash_file(file_path, algorithms, block_size, throttle=throttle, drop_cache=drop_cache)
+
+def get_file_hash(file_path, algorithm=DEFAULT_ALGORITHM):
+    """Compute the hash of a file using the specified algorithm."""
+    return hash_file(file_path, (algorithm,))[0]
+
+def hash_bytes(data, algorithms=(DEFAULT_ALGORITHM,)):
+    """Digests of an in-memory value, in the same form as hash_file's."""
+    return tuple(hashlib.new(algorithm, data).hexdigest() for algorithm in algorithms)
+
+def _timed(task, *args):
+    start = time.perf_counter()
+    value = task(*args)
+    return time.perf_counter() - start, value
+
+def default_workers():
+    """Default worker count: enough threads to keep both the CPU and the I/O queue busy."""
+    return min(32, (os.cpu_count() or 1) + 4)
+
+class HashingEngine:
+    """Hash files concurrently on a thread or process pool, returning digests in submission order."""
+
+    def __init__(self, workers=None, use_processes=False, algorithms=(DEFAULT_ALGORITHM,), block_size=None,
+                 with_blocks=False, timed=False, throttle=None):
+        self.workers = workers or default_workers()
+        self.use_processes = use_processes
+        self.algorithms = tuple(algorithms)
+        self.block_size = block_size
+        self.with_blocks = with_blocks
+        self.timed = timed
+        self.throttle = throttle
+        self._executor = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.shutdown(cancel=exc_type is not None)
+
+    def start(self):
+        if self._executor is None and self.workers > 1:
+            if self.use_processes:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="fim-hash")
+
+    def shutdown(self, cancel=False):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=cancel)
+            self._executor = None
+
+    def submit(self, file_path, sample=None):
+        """Schedule one file; returns a future (or a finished result when running single-threaded)."""
+        throttle = self.throttle
+        drop_cache = throttle is not None and throttle.drop_cache
+        if throttle is not None and self._executor is not None and self.use_processes:
+            throttle.acquire_bytes(os.path.getsize(file_path))
+            throttle = None
+        if sample is not None:
+            task, args = hash_sampled, (file_path, self.algorithms, self.block_size, sample, throttle, drop_cache)
+        else:
+            task, args = hash_file, (file_path, self.algorithms, self.block_size, self.with_blocks, throttle, drop_cache)
+        if self.timed:
+            if self._executor is None:
+                return _Done(*reversed(_timed(task, *args)))
+            return _Timed(self._executor.submit(_timed, task, *args))
+        if self._executor is None:
+            return _Done(task(*args))
+        return self._executor.submit(task, *args)
+
+    def imap(self, file_paths, window=None):
+        """Yield the digests of each path in input order while keeping at most `window` files in flight."""
+        window = window or self.workers * 4
+        pending = deque()
+        for file_path in file_paths:
+            pending.append(self.submit(file_path))
+            if len(pending) >= window:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+class _Done:
+    """Already-computed result with the same `result()` interface as a future."""
+
+    __slots__ = ('value', 'seconds')
+
+    def __init__(self, value, seconds=None):
+        self.value = value
+        self.seconds = seconds
+
+    def result(self):
+        return self.value
+
+class _Timed:
+    """Future of a timed task; `seconds` is filled in once result() has returned."""
+
+    __slots__ = ('future', 'seconds')
+
+    def __init__(self, future):
+        self.future = future
+        self.seconds = None
+
+    def result(self):
+        self.seconds, value = self.future.result()
+        return value
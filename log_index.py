@@ -0,0 +1,135 @@
+import os
+import mmap
+from array import array
+from bisect import bisect_right
+from itertools import accumulate
+
+INDEX_CHUNK = 4 << 20  # bytes indexed or searched per step, so no step copies more than this
+ENCODING = 'utf-8'
+
+class LogIndex:
+    """Random access to the lines of a memory-mapped, possibly growing text log."""
+
+    def __init__(self, path, limit=None):
+        self.path = path
+        self._file = None
+        self._map = None
+        self._identity = None
+        self.size = 0
+        self.indexed = 0
+        self._starts = array('Q', [0])
+        self._open(limit)
+
+    def _open(self, limit):
+        self._file = open(self.path, 'rb')
+        st = os.fstat(self._file.fileno())
+        self._identity = (st.st_dev, st.st_ino)
+        self.size = 0
+        self.indexed = 0
+        self._starts = array('Q', [0])
+        self._remap(st.st_size)
+        self._index(limit)
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    @property
+    def caught_up(self):
+        return self.indexed == self.size
+
+    def _remap(self, size):
+        if size <= self.size:
+            return
+        if self._map is not None:
+            self._map.close()
+        self._map = mmap.mmap(self._file.fileno(), size, access=mmap.ACCESS_READ)
+        self.size = size
+
+    def _index(self, limit=None):
+        """Index the lines in the next `limit` bytes (all of them by default) of what is mapped."""
+        position = self.indexed
+        end = self.size if limit is None else min(self.size, position + limit)
+        while position < end:
+            chunk = self._map[position:min(end, position + INDEX_CHUNK)]
+            # A line starts one past every newline; split() finds them in C
+            starts = accumulate((len(piece) + 1 for piece in chunk.split(b'\n')[:-1]), initial=position)
+            next(starts)
+            self._starts.extend(starts)
+            position += len(chunk)
+        self.indexed = position
+
+    def refresh(self, limit=None):
+        """Pick up appended lines; returns True when the file was truncated or replaced and re-indexed."""
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return False
+        if (st.st_dev, st.st_ino) != self._identity or st.st_size < self.size:
+            self.close()
+            self._open(limit)
+            return True
+        self._remap(st.st_size)
+        self._index(limit)
+        return False
+
+    def __len__(self):
+        if not self.caught_up:
+            # The last line found so far may go on past what has been indexed
+            return len(self._starts) - 1
+        # A newline at the very end starts no line until something is written after it
+        return len(self._starts) - (self._starts[-1] == self.size)
+
+    def line(self, row):
+        start = self._starts[row]
+        end = self._starts[row + 1] - 1 if row + 1 < len(self._starts) else self.size
+        return self._map[start:end].rstrip(b'\r\n').decode(ENCODING, errors='replace')
+
+    def lines(self, first, count):
+        return [self.line(row) for row in range(first, min(first + count, len(self)))]
+
+    def row_at(self, offset):
+        return bisect_right(self._starts, offset) - 1
+
+    def find(self, text, row=0, backwards=False, case_sensitive=False):
+        """The first row at or after `row` containing `text` (with `backwards`, the last one before it), or None."""
+        needle = text.encode(ENCODING)
+        rows = len(self)
+        if not needle or not rows or (row >= rows and not backwards):
+            return None
+        # Only indexed lines can be searched; past them, a match would have no row
+        limit = self._starts[rows] if rows < len(self._starts) else self.size
+        if not case_sensitive:
+            needle = needle.lower()
+        overlap = len(needle) - 1
+        if backwards:
+            end = limit if row >= rows else self._starts[row]
+            while end > 0:
+                start = max(0, end - INDEX_CHUNK)
+                window = self._map[start:end]
+                found = (window if case_sensitive else window.lower()).rfind(needle)
+                if found >= 0:
+                    return self.row_at(start + found)
+                end = start + overlap if start > 0 else 0
+            return None
+        start = self._starts[max(0, row)]
+        while start < limit:
+            end = min(limit, start + INDEX_CHUNK)
+            window = self._map[start:end]
+            found = (window if case_sensitive else window.lower()).find(needle)
+            if found >= 0:
+                return self.row_at(start + found)
+            if end == limit:
+                break
+            start = end - overlap
+        return None
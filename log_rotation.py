@@ -0,0 +1,132 @@
+import os
+import glob
+import gzip
+import time
+import shutil
+import tempfile
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+ARCHIVE_SUFFIX = '.gz'
+STAMP_FORMAT = '%Y%m%d-%H%M%S'
+STAMP_LENGTH = 15
+
+# When the live log becomes a segment (it reaches max_bytes, or has been written to for max_age seconds),
+# and how many archived segments are kept, none older than `retention` seconds
+RotationPolicy = namedtuple('RotationPolicy', 'max_bytes max_age keep retention')
+DEFAULT_POLICY = RotationPolicy(max_bytes=64 << 20, max_age=7 * 86400, keep=20, retention=90 * 86400)
+
+# One thread compresses segments for every log, so rotations never wait on gzip
+_compressor = None
+
+def _compress_in_background(path, segment, policy):
+    global _compressor
+    if _compressor is None:
+        _compressor = ThreadPoolExecutor(1, thread_name_prefix="fim-log-compress")
+    _compressor.submit(_compress, path, segment, policy)
+
+def _compress(path, segment, policy):
+    archive = segment + ARCHIVE_SUFFIX
+    try:
+        # Written under a temporary name, so readers only ever see whole archives
+        with open(segment, 'rb') as source, gzip.open(archive + '.tmp', 'wb') as target:
+            shutil.copyfileobj(source, target, 1 << 20)
+        os.replace(archive + '.tmp', archive)
+        os.remove(segment)
+    except OSError:
+        # Left uncompressed; segments() still lists it and the next rotation retries it
+        return
+    prune(path, policy)
+
+def segments(path):
+    """Archived segments of the log at `path`, oldest first, compressed or still waiting to be."""
+    found = {}
+    for name in glob.glob(glob.escape(path) + '.*'):
+        stem = name[:-len(ARCHIVE_SUFFIX)] if name.endswith(ARCHIVE_SUFFIX) else name
+        stamp = stem[len(path) + 1:]
+        if stamp.replace('-', '').isdigit():
+            # A segment caught between compression and removal is read from its archive
+            if name.endswith(ARCHIVE_SUFFIX) or stem not in found:
+                found[stem] = name
+    # Segments rotated within the same second are numbered: log.txt.20240501-020000, ...-020000-1, ...-020000-2
+    return [found[stem] for stem in sorted(found, key=lambda stem: (stem[:len(path) + 1 + STAMP_LENGTH],
+                                                                    int(stem[len(path) + 2 + STAMP_LENGTH:] or 0)))]
+
+def segment_time(path, segment):
+    """When a segment of the log at `path` was rotated out, from its name."""
+    stamp = segment[len(path) + 1:len(path) + 1 + STAMP_LENGTH]
+    return time.mktime(time.strptime(stamp, STAMP_FORMAT))
+
+def prune(path, policy=DEFAULT_POLICY):
+    """Delete the log's oldest segments past the policy's count and age limits."""
+    archived = segments(path)
+    now = time.time()
+    for index, segment in enumerate(archived):
+        if index < len(archived) - policy.keep or now - segment_time(path, segment) > policy.retention:
+            try:
+                os.remove(segment)
+            except OSError:
+                pass
+
+def open_segment(segment):
+    """A segment (or the live log) opened for reading text, decompressing transparently."""
+    if segment.endswith(ARCHIVE_SUFFIX):
+        return gzip.open(segment, 'rt', encoding='utf-8', errors='replace')
+    return open(segment, 'r', encoding='utf-8', errors='replace')
+
+def read_lines(path, include_archived=True):
+    """Every line of a rotated log, oldest first: its archived segments, then the live file."""
+    paths = segments(path) if include_archived else []
+    if os.path.exists(path):
+        paths.append(path)
+    for segment in paths:
+        try:
+            with open_segment(segment) as f:
+                yield from f
+        except FileNotFoundError:
+            # Pruned, or compressed and replaced, while we were reading the ones before it
+            continue
+
+def extract_segment(segment):
+    """(path, temporary) of a plain file with the segment's text; the caller deletes a temporary copy."""
+    if not segment.endswith(ARCHIVE_SUFFIX):
+        return segment, False
+    fd, temporary = tempfile.mkstemp(prefix='fim-log-', suffix='.txt')
+    with os.fdopen(fd, 'wb') as target, gzip.open(segment, 'rb') as source:
+        shutil.copyfileobj(source, target, 1 << 20)
+    return temporary, True
+
+class LogRotator:
+    """Decides when one log is rotated, renames it aside and hands the segment to the compressor."""
+
+    def __init__(self, path, policy=None):
+        self.path = path
+        self.policy = policy or DEFAULT_POLICY
+        self.started = time.time()
+        # A crash can leave segments that were renamed but never compressed
+        for segment in segments(path):
+            if not segment.endswith(ARCHIVE_SUFFIX):
+                _compress_in_background(path, segment, self.policy)
+
+    def due(self, size):
+        if not size:
+            self.started = time.time()
+            return False
+        return size >= self.policy.max_bytes or time.time() - self.started >= self.policy.max_age
+
+    def rotate(self):
+        """Move the log aside as a new segment; returns False when it couldn't be (e.g. open elsewhere on Windows)."""
+        stamp = time.strftime(STAMP_FORMAT)
+        segment = f"{self.path}.{stamp}"
+        count = 1
+        while os.path.exists(segment) or os.path.exists(segment + ARCHIVE_SUFFIX):
+            segment = f"{self.path}.{stamp}-{count}"
+            count += 1
+        try:
+            os.replace(self.path, segment)
+        except OSError:
+            # Gone, or held open by a reader on Windows; due() says so again after the next write
+            return False
+        self.started = time.time()
+        _compress_in_background(self.path, segment, self.policy)
+        return True
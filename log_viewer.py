@@ -0,0 +1,195 @@
+import os
+import time
+from PySide6.QtCore import Qt, QAbstractListModel, QModelIndex, QTimer
+from PySide6.QtGui import QFontDatabase
+from PySide6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLineEdit, QPushButton, QCheckBox, QLabel, QListView,
+                               QAbstractItemView, QComboBox)
+from log_index import LogIndex
+from log_rotation import segments, segment_time, extract_segment
+
+POLL_INTERVAL_MS = 1000
+INDEX_STEP = 32 << 20  # bytes indexed per event-loop turn while catching up with a large log
+
+class LogModel(QAbstractListModel):
+    """One row per log line, served from a LogIndex; the view only ever asks for the rows it shows."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.log = None
+        self._rows = 0
+
+    def set_log(self, path):
+        self.beginResetModel()
+        if self.log is not None:
+            self.log.close()
+        self.log = LogIndex(path, INDEX_STEP) if path else None
+        self._rows = len(self.log) if self.log is not None else 0
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self._rows
+
+    def data(self, index, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and index.isValid():
+            return self.log.line(index.row())
+        return None
+
+    def refresh(self):
+        """Index the next step of the log; returns True when rows were added or the log was replaced."""
+        if self.log is None:
+            return False
+        indexed = self.log.indexed
+        if self.log.refresh(INDEX_STEP):
+            self.beginResetModel()
+            self._rows = len(self.log)
+            self.endResetModel()
+            return True
+        if self.log.indexed == indexed:
+            return False
+        rows = len(self.log)
+        if self._rows:
+            # The last line may have been partly written at the previous refresh
+            last = self.index(self._rows - 1)
+            self.dataChanged.emit(last, last)
+        if rows <= self._rows:
+            return False
+        self.beginInsertRows(QModelIndex(), self._rows, rows - 1)
+        self._rows = rows
+        self.endInsertRows()
+        return True
+
+class LogViewer(QWidget):
+    """Log pane for the dashboard: a paged list view over a LogModel, with search and tail following."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.model = LogModel(self)
+        self.log_path = None
+        self._temporary = None
+        self.init_ui()
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.poll)
+        self.timer.start(POLL_INTERVAL_MS)
+
+    def init_ui(self):
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+
+        search_layout = QHBoxLayout()
+        self.search_input = QLineEdit()
+        self.search_input.setPlaceholderText("Search log")
+        self.search_input.returnPressed.connect(self.find_next)
+        self.previous_button = QPushButton("Previous")
+        self.previous_button.clicked.connect(self.find_previous)
+        self.next_button = QPushButton("Next")
+        self.next_button.clicked.connect(self.find_next)
+        self.search_status_label = QLabel()
+        self.follow_tail_checkbox = QCheckBox("Follow Tail")
+        self.follow_tail_checkbox.setChecked(True)
+        self.follow_tail_checkbox.toggled.connect(self.follow_tail_toggled)
+        search_layout.addWidget(self.search_input)
+        search_layout.addWidget(self.previous_button)
+        search_layout.addWidget(self.next_button)
+        search_layout.addWidget(self.search_status_label)
+        self.segment_combo = QComboBox()
+        self.segment_combo.activated.connect(self.show_segment)
+        search_layout.addWidget(self.segment_combo)
+        search_layout.addWidget(self.follow_tail_checkbox)
+
+        self.view = QListView()
+        self.view.setModel(self.model)
+        # Every row is one line in one font, so the view can lay out millions of them without measuring each
+        self.view.setUniformItemSizes(True)
+        self.view.setFont(QFontDatabase.systemFont(QFontDatabase.FixedFont))
+        self.view.setSelectionMode(QAbstractItemView.SingleSelection)
+
+        layout.addLayout(search_layout)
+        layout.addWidget(self.view)
+
+    def open(self, path):
+        """Show the log at `path`; showing the same log again just picks up what was appended."""
+        showing_live = self.model.log is not None and self.model.log.path == path
+        self.log_path = path
+        self.segment_combo.clear()
+        self.segment_combo.addItem("Current Log", path)
+        # Newest segment first, right after the live log it was rotated out of
+        for segment in reversed(segments(path)):
+            when = time.strftime('%Y-%m-%d %H:%M', time.localtime(segment_time(path, segment)))
+            self.segment_combo.addItem(f"Rotated {when}", segment)
+        if showing_live:
+            self.poll()
+            return
+        self._set_log(path)
+
+    def show_segment(self, index):
+        segment = self.segment_combo.itemData(index)
+        if segment == self.log_path:
+            self._set_log(segment)
+            return
+        try:
+            path, temporary = extract_segment(segment)
+        except OSError:
+            # Pruned since the list was filled
+            self.search_status_label.setText("Segment no longer exists")
+            return
+        # An old segment never grows, so there is no tail to follow
+        self.follow_tail_checkbox.setChecked(False)
+        self._set_log(path, path if temporary else None)
+
+    def _set_log(self, path, temporary=None):
+        self.model.set_log(path)
+        self._remove_temporary()
+        self._temporary = temporary
+        self.search_status_label.clear()
+        self.timer.setInterval(POLL_INTERVAL_MS if self.model.log.caught_up else 0)
+        if self.follow_tail_checkbox.isChecked():
+            self.view.scrollToBottom()
+
+    def _remove_temporary(self):
+        if self._temporary is not None:
+            try:
+                os.remove(self._temporary)
+            except OSError:
+                pass
+            self._temporary = None
+
+    def clear(self):
+        self.model.set_log(None)
+        self._remove_temporary()
+        self.log_path = None
+        self.segment_combo.clear()
+
+    def poll(self):
+        if self.model.log is None or not self.isVisible():
+            return
+        if self.model.refresh() and self.follow_tail_checkbox.isChecked():
+            self.view.scrollToBottom()
+        # A log still being indexed gets the next step on the next event-loop turn
+        self.timer.setInterval(POLL_INTERVAL_MS if self.model.log.caught_up else 0)
+
+    def follow_tail_toggled(self, checked):
+        if checked:
+            self.view.scrollToBottom()
+
+    def find_next(self):
+        current = self.view.currentIndex()
+        self._find(current.row() + 1 if current.isValid() else 0, backwards=False)
+
+    def find_previous(self):
+        current = self.view.currentIndex()
+        self._find(current.row() if current.isValid() else self.model.rowCount(), backwards=True)
+
+    def _find(self, row, backwards):
+        text = self.search_input.text()
+        if self.model.log is None or not text:
+            return
+        found = self.model.log.find(text, row, backwards)
+        if found is None or found >= self.model.rowCount():
+            self.search_status_label.setText("Not found")
+            return
+        self.search_status_label.clear()
+        # Jumping to a match means reading there, so stop following the tail away from it
+        self.follow_tail_checkbox.setChecked(False)
+        index = self.model.index(found)
+        self.view.setCurrentIndex(index)
+        self.view.scrollTo(index, QAbstractItemView.PositionAtCenter)
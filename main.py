@@ -1,5 +1,6 @@
 import sys
 import os
+import time
 from PySide6.QtCore import Qt
 from PySide6.QtWidgets import (
     QApplication, QMainWindow, QVBoxLayout, QPushButton, QListWidget, QWidget, QLabel, QStatusBar,
@@ -7,8 +8,20 @@ from PySide6.QtWidgets import (
 )
 from baseline_generator import BaselineGeneratorApp
 from compare_baselines import ComparisonWindow
-from baseline_monitoring import BaselineComparisonWorker, generate_baseline
+from baseline_monitoring import BaselineComparisonWorker
+from scanner import iter_records
+from baseline_store import save_baseline
+from scan_cache import RescanCache, shared_digest_cache
+from hash_engine import available_algorithms, DEFAULT_ALGORITHM
+from quick_check import SAMPLE_BLOCKS, FULL_HASH_EVERY
+from scan_metrics import format_metrics
+from scheduler import MonitoringScheduler
+from throttle import Throttle
 from monitoring import DirectoryMonitor as EventDirectoryMonitor
+from data_paths import DataPaths
+from log_viewer import LogViewer
+from event_store import EventStore, EVENT_TYPES, format_event
+from path_filter import FilterRules, NO_RULES, compile_filter, split_list
 
 class AddMonitoringTaskDialog(QDialog):
     def __init__(self, parent=None):
@@ -52,6 +65,103 @@ class AddMonitoringTaskDialog(QDialog):
         checks_layout.addWidget(self.random_checks_combo)
         layout.addLayout(checks_layout)
 
+        # Hashing worker count selection
+        workers_layout = QHBoxLayout()
+        self.workers_label = QLabel("Hashing Workers:")
+        self.workers_combo = QComboBox()
+        self.workers_combo.addItems(["Auto"] + [str(i) for i in (1, 2, 4, 8, 16, 32)])
+
+        workers_layout.addWidget(self.workers_label)
+        workers_layout.addWidget(self.workers_combo)
+        layout.addLayout(workers_layout)
+
+        # Paranoid full rehash selection
+        paranoid_layout = QHBoxLayout()
+        self.paranoid_label = QLabel("Full Rehash Every (checks):")
+        self.paranoid_combo = QComboBox()
+        self.paranoid_combo.addItems(["Never"] + [str(i) for i in (5, 10, 25, 50)])
+
+        paranoid_layout.addWidget(self.paranoid_label)
+        paranoid_layout.addWidget(self.paranoid_combo)
+        layout.addLayout(paranoid_layout)
+
+        # Hash algorithm selection
+        algorithm_layout = QHBoxLayout()
+        self.algorithm_label = QLabel("Hash Algorithm:")
+        self.algorithm_combo = QComboBox()
+        self.algorithm_combo.addItems(available_algorithms())
+        self.algorithm_combo.setCurrentText(DEFAULT_ALGORITHM)
+        self.extra_algorithm_label = QLabel("Additional Digest:")
+        self.extra_algorithm_combo = QComboBox()
+        self.extra_algorithm_combo.addItems(["None"] + available_algorithms())
+
+        algorithm_layout.addWidget(self.algorithm_label)
+        algorithm_layout.addWidget(self.algorithm_combo)
+        algorithm_layout.addWidget(self.extra_algorithm_label)
+        algorithm_layout.addWidget(self.extra_algorithm_combo)
+        layout.addLayout(algorithm_layout)
+
+        # Quick check selection
+        quick_check_layout = QHBoxLayout()
+        self.quick_check_label = QLabel("Quick Check (sampled blocks):")
+        self.quick_check_combo = QComboBox()
+        self.quick_check_combo.addItems(["Off"] + [str(i) for i in (4, 8, 16, 32)])
+        self.quick_check_combo.setCurrentText(str(SAMPLE_BLOCKS))
+        self.full_hash_label = QLabel("Full Hash Every (checks):")
+        self.full_hash_combo = QComboBox()
+        self.full_hash_combo.addItems([str(i) for i in (2, 4, 6, 12, 24)])
+        self.full_hash_combo.setCurrentText(str(FULL_HASH_EVERY))
+
+        quick_check_layout.addWidget(self.quick_check_label)
+        quick_check_layout.addWidget(self.quick_check_combo)
+        quick_check_layout.addWidget(self.full_hash_label)
+        quick_check_layout.addWidget(self.full_hash_combo)
+        layout.addLayout(quick_check_layout)
+
+        # I/O throttling selection
+        throttle_layout = QHBoxLayout()
+        self.read_rate_label = QLabel("Max Read Rate (MB/s):")
+        self.read_rate_combo = QComboBox()
+        self.read_rate_combo.addItems(["Unlimited"] + [str(i) for i in (5, 10, 25, 50, 100, 200)])
+        self.file_rate_label = QLabel("Max Files/s:")
+        self.file_rate_combo = QComboBox()
+        self.file_rate_combo.addItems(["Unlimited"] + [str(i) for i in (50, 100, 500, 1000, 5000)])
+
+        throttle_layout.addWidget(self.read_rate_label)
+        throttle_layout.addWidget(self.read_rate_combo)
+        throttle_layout.addWidget(self.file_rate_label)
+        throttle_layout.addWidget(self.file_rate_combo)
+        layout.addLayout(throttle_layout)
+
+        # Include/exclude filters; left out files and folders are neither scanned nor logged
+        exclude_layout = QHBoxLayout()
+        self.exclude_label = QLabel("Exclude Patterns:")
+        self.exclude_input = QLineEdit()
+        self.exclude_input.setPlaceholderText(".git, node_modules, *.tmp, cache/*")
+        self.extensions_label = QLabel("Only Extensions:")
+        self.extensions_input = QLineEdit()
+        self.extensions_input.setPlaceholderText("All")
+
+        exclude_layout.addWidget(self.exclude_label)
+        exclude_layout.addWidget(self.exclude_input)
+        exclude_layout.addWidget(self.extensions_label)
+        exclude_layout.addWidget(self.extensions_input)
+        layout.addLayout(exclude_layout)
+
+        limits_layout = QHBoxLayout()
+        self.max_size_label = QLabel("Max File Size (MB):")
+        self.max_size_combo = QComboBox()
+        self.max_size_combo.addItems(["Unlimited"] + [str(i) for i in (10, 100, 1024, 10240)])
+        self.one_filesystem_label = QLabel("Stay On One Filesystem:")
+        self.one_filesystem_combo = QComboBox()
+        self.one_filesystem_combo.addItems(["No", "Yes"])
+
+        limits_layout.addWidget(self.max_size_label)
+        limits_layout.addWidget(self.max_size_combo)
+        limits_layout.addWidget(self.one_filesystem_label)
+        limits_layout.addWidget(self.one_filesystem_combo)
+        layout.addLayout(limits_layout)
+
         # Add task button
         self.add_button = QPushButton("Add Task")
         self.add_button.clicked.connect(self.add_task)
@@ -68,29 +178,55 @@ class AddMonitoringTaskDialog(QDialog):
         directory = self.directory_input.text()
         regular_interval = int(self.regular_interval_combo.currentText())
         random_checks = int(self.random_checks_combo.currentText())
+        workers_text = self.workers_combo.currentText()
+        workers = None if workers_text == "Auto" else int(workers_text)
+        paranoid_text = self.paranoid_combo.currentText()
+        paranoid_every = 0 if paranoid_text == "Never" else int(paranoid_text)
+        algorithms = (self.algorithm_combo.currentText(),)
+        extra_algorithm = self.extra_algorithm_combo.currentText()
+        if extra_algorithm not in ("None", algorithms[0]):
+            algorithms += (extra_algorithm,)
+        quick_check_text = self.quick_check_combo.currentText()
+        quick_samples = 0 if quick_check_text == "Off" else int(quick_check_text)
+        full_hash_every = int(self.full_hash_combo.currentText())
+        read_rate_text = self.read_rate_combo.currentText()
+        file_rate_text = self.file_rate_combo.currentText()
+        # Each task's limits are charged against the window's global limit as well
+        throttle = Throttle(None if read_rate_text == "Unlimited" else int(read_rate_text),
+                            None if file_rate_text == "Unlimited" else int(file_rate_text),
+                            parent=self.parent().global_throttle)
+        max_size_text = self.max_size_combo.currentText()
+        filter_rules = FilterRules(exclude=split_list(self.exclude_input.text()),
+                                   extensions=split_list(self.extensions_input.text()),
+                                   max_size=None if max_size_text == "Unlimited" else int(max_size_text) << 20,
+                                   one_filesystem=self.one_filesystem_combo.currentText() == "Yes")
 
         if not directory:
             QMessageBox.warning(self, "Error", "Please select a directory.")
             return
+        # Typed paths may end in a separator or be relative; every record, store and task uses the normal form
+        directory = os.path.abspath(directory)
 
         # Generate and save baseline
-        baseline_file = os.path.join(BASELINE_DIR, f"{os.path.basename(directory)}_baseline.txt")
-        baseline_report = generate_baseline(directory)
-        with open(baseline_file, 'w') as f:
-            f.write(baseline_report)
+        baseline_file = PATHS.baseline_file(directory)
+        # Seed the rescan cache so the first scheduled check only rehashes what changed since now
+        cache = RescanCache(PATHS.cache_file(directory), algorithm=algorithms[0])
+        # Block digests are recorded too, so scheduled checks can quick-check large files by sampling
+        save_baseline(iter_records(directory, workers, cache=cache, algorithms=algorithms, blocks=True, throttle=throttle,
+                                   digest_cache=shared_digest_cache(PATHS.digest_cache_file()),
+                                   path_filter=compile_filter(directory, filter_rules)),
+                      baseline_file, directory, algorithms, filter_rules)
 
         # Add monitoring task to parent
-        self.parent().add_monitoring_task(directory, baseline_file, regular_interval, random_checks)
+        self.parent().add_monitoring_task(directory, baseline_file, regular_interval, random_checks, workers,
+                                          paranoid_every, algorithms, quick_samples, full_hash_every, throttle,
+                                          filter_rules)
         self.accept()
 
-EVENT_LOG_DIR = "C:\\ProgramData\\FIM\\Events Logs"
-BASELINE_LOG_DIR = "C:\\ProgramData\\FIM\\Baselines Comparison Reports"
-BASELINE_DIR = "C:\\ProgramData\\FIM\\Baselines"
+# Baselines, logs and metrics live under FIM_HOME or the OS's usual place for application data
+PATHS = DataPaths().ensure()
 
-# Ensure the log directories exist
-os.makedirs(EVENT_LOG_DIR, exist_ok=True)
-os.makedirs(BASELINE_LOG_DIR, exist_ok=True)
-os.makedirs(BASELINE_DIR, exist_ok=True)
+EVENT_TIME_RANGES = (("Last Hour", 3600), ("Last 24 Hours", 86400), ("Last 7 Days", 7 * 86400), ("All Time", None))
 
 class FIMWindow(QMainWindow):
     def __init__(self):
@@ -146,6 +282,15 @@ class FIMWindow(QMainWindow):
         self.baseline_generator_button.clicked.connect(self.open_baseline_generator)
         self.one_time_integrity_check_button = QPushButton("One Time Integrity Check")
         self.one_time_integrity_check_button.clicked.connect(self.open_comparison_window)
+        self.profile_check_button = QPushButton("Profile Next Check")
+        self.profile_check_button.clicked.connect(self.profile_next_check)
+        self.profile_check_button.setVisible(False)
+        self.pause_all_button = QPushButton("Pause All Checks")
+        self.pause_all_button.clicked.connect(self.toggle_all_checks)
+        self.global_read_rate_label = QLabel("Global Read Limit (MB/s):")
+        self.global_read_rate_combo = QComboBox()
+        self.global_read_rate_combo.addItems(["Unlimited"] + [str(i) for i in (10, 25, 50, 100, 200, 500)])
+        self.global_read_rate_combo.currentTextChanged.connect(self.set_global_read_rate)
 
         self.control_layout.addWidget(self.control_title_label)
         self.control_layout.addWidget(self.add_monitoring_task_button)
@@ -153,11 +298,20 @@ class FIMWindow(QMainWindow):
         self.control_layout.addWidget(self.refresh_button)
         self.control_layout.addWidget(self.baseline_generator_button)
         self.control_layout.addWidget(self.one_time_integrity_check_button)
+        self.control_layout.addWidget(self.profile_check_button)
+        self.control_layout.addWidget(self.pause_all_button)
+        global_read_rate_layout = QHBoxLayout()
+        global_read_rate_layout.addWidget(self.global_read_rate_label)
+        global_read_rate_layout.addWidget(self.global_read_rate_combo)
+        self.control_layout.addLayout(global_read_rate_layout)
 
         self.main_layout.addWidget(self.control_panel)
 
         self.log_display = QTextEdit()
         self.log_display.setReadOnly(True)
+        # Logs can grow to hundreds of MB, so they get a paged view instead of a text box holding all of it
+        self.log_viewer = LogViewer()
+        self.log_viewer.setVisible(False)
 
         self.log_display_title_label = QLabel("Log Display", self)
         self.log_display_title_label.setStyleSheet("font-weight: bold;")
@@ -166,23 +320,57 @@ class FIMWindow(QMainWindow):
         self.event_log_radio = QRadioButton("Event Log")
         self.event_log_radio.setChecked(True)
         self.baseline_log_radio = QRadioButton("Baseline Comparison Log")
+        self.scan_metrics_radio = QRadioButton("Scan Metrics")
+        self.event_search_radio = QRadioButton("Event Search")
         self.radio_group.addButton(self.event_log_radio)
         self.radio_group.addButton(self.baseline_log_radio)
+        self.radio_group.addButton(self.scan_metrics_radio)
+        self.radio_group.addButton(self.event_search_radio)
         self.radio_group.buttonClicked.connect(self.refresh_log)
 
+        # Filters for Event Search, answered from the indexed event store instead of the text log
+        self.event_filter_panel = QWidget()
+        event_filter_layout = QHBoxLayout(self.event_filter_panel)
+        event_filter_layout.setContentsMargins(0, 0, 0, 0)
+        self.event_path_input = QLineEdit()
+        self.event_path_input.setPlaceholderText("Under path (blank: whole directory)")
+        self.event_path_input.returnPressed.connect(self.search_events)
+        self.event_type_combo = QComboBox()
+        self.event_type_combo.addItems(["All Events"] + list(EVENT_TYPES))
+        self.event_time_combo = QComboBox()
+        for label, seconds in EVENT_TIME_RANGES:
+            self.event_time_combo.addItem(label, seconds)
+        self.event_search_button = QPushButton("Search")
+        self.event_search_button.clicked.connect(self.search_events)
+        event_filter_layout.addWidget(self.event_path_input)
+        event_filter_layout.addWidget(self.event_type_combo)
+        event_filter_layout.addWidget(self.event_time_combo)
+        event_filter_layout.addWidget(self.event_search_button)
+        self.event_filter_panel.setVisible(False)
+
         radio_layout = QHBoxLayout()
         
         self.main_layout.addWidget(self.log_display_title_label)
         radio_layout.addWidget(self.event_log_radio)
         radio_layout.addWidget(self.baseline_log_radio)
+        radio_layout.addWidget(self.scan_metrics_radio)
+        radio_layout.addWidget(self.event_search_radio)
 
         self.main_layout.addLayout(radio_layout)
+        self.main_layout.addWidget(self.event_filter_panel)
         self.main_layout.addWidget(self.log_display)
+        self.main_layout.addWidget(self.log_viewer)
 
         self.layout.addWidget(self.main_content)
 
         self.event_directory_monitors = {}  # To keep track of event-based directory monitors
         self.baseline_monitors = {}  # To keep track of baseline monitoring tasks
+        self.path_filters = {}  # Compiled include/exclude rules of each monitored directory
+        self.scan_metrics = {}  # Latest ScanMetrics snapshot per directory
+        # One scheduler runs every task's checks, so scans share the disks instead of colliding on them
+        self.scheduler = MonitoringScheduler()
+        self.scheduler.start()
+        self.global_throttle = Throttle()
         self.current_directory = None
         self.current_log_type = None  # To keep track of the type of log to display
 
@@ -193,19 +381,32 @@ class FIMWindow(QMainWindow):
         dialog = AddMonitoringTaskDialog(self)
         dialog.exec()
 
-    def add_monitoring_task(self, directory, baseline_file, regular_interval, random_checks):
+    def add_monitoring_task(self, directory, baseline_file, regular_interval, random_checks, workers=None,
+                            paranoid_every=0, algorithms=None, quick_samples=0, full_hash_every=FULL_HASH_EVERY,
+                            throttle=None, filter_rules=NO_RULES):
         # Start event monitoring
-        event_log_file = os.path.join(EVENT_LOG_DIR, f"{os.path.basename(directory)}_event_log.txt")
-        event_monitor = EventDirectoryMonitor()
-        event_monitor.start_monitoring(directory, event_log_file)
+        event_log_file = PATHS.event_log_file(directory)
+        # An event storm's collapsed subtrees are rescanned right away rather than at the next routine check
+        event_monitor = EventDirectoryMonitor(on_overflow=self.scheduler.run_now)
+        self.path_filters[directory] = compile_filter(directory, filter_rules)
+        event_monitor.start_monitoring(directory, event_log_file, PATHS.event_store_file(directory),
+                                       self.path_filters[directory])
         self.event_directory_monitors[directory] = event_monitor
 
         # Start baseline comparison monitoring
-        comparison_log_file = os.path.join(BASELINE_LOG_DIR, f"{os.path.basename(directory)}_comparison_log.txt")
-        baseline_worker = BaselineComparisonWorker(baseline_file, directory, comparison_log_file, regular_interval, random_checks)
-        baseline_worker.finished.connect(lambda: self.status_bar.showMessage(f"Finished monitoring {directory}", 5000))
-        baseline_worker.start()
+        comparison_log_file = PATHS.comparison_log_file(directory)
+        baseline_worker = BaselineComparisonWorker(baseline_file, directory, comparison_log_file, regular_interval,
+                                                   random_checks, workers, PATHS.cache_file(directory), paranoid_every,
+                                                   event_monitor.get_dirty_set(directory), algorithms=algorithms,
+                                                   quick_samples=quick_samples, full_hash_every=full_hash_every,
+                                                   metrics_file=PATHS.metrics_file(directory), throttle=throttle,
+                                                   digest_cache=shared_digest_cache(PATHS.digest_cache_file()),
+                                                   filter_rules=filter_rules)
+        baseline_worker.metrics_updated.connect(self.update_scan_metrics)
+        baseline_worker.check_finished.connect(
+            lambda: self.status_bar.showMessage(f"Finished integrity check of {directory}", 5000))
         self.baseline_monitors[directory] = baseline_worker
+        self.scheduler.add_task(baseline_worker.task)
 
         self.directory_list.addItem(directory)
         self.status_bar.showMessage(f"Started monitoring task for {directory}", 5000)
@@ -223,15 +424,18 @@ class FIMWindow(QMainWindow):
         if self.current_directory in self.event_directory_monitors:
             self.event_directory_monitors[self.current_directory].stop_monitoring(self.current_directory)
         if self.current_directory in self.baseline_monitors:
-            self.baseline_monitors[self.current_directory].terminate()
+            # A check in progress stops cooperatively at its next folder
+            self.scheduler.pause(self.current_directory)
         self.status_bar.showMessage(f"Stopped monitoring task for {self.current_directory}", 5000)
 
     def resume_monitoring(self):
         if self.current_directory in self.event_directory_monitors:
-            event_log_file = os.path.join(EVENT_LOG_DIR, f"{os.path.basename(self.current_directory)}_event_log.txt")
-            self.event_directory_monitors[self.current_directory].start_monitoring(self.current_directory, event_log_file)
+            event_log_file = PATHS.event_log_file(self.current_directory)
+            self.event_directory_monitors[self.current_directory].start_monitoring(
+                self.current_directory, event_log_file, PATHS.event_store_file(self.current_directory),
+                self.path_filters.get(self.current_directory))
         if self.current_directory in self.baseline_monitors:
-            self.baseline_monitors[self.current_directory].start()
+            self.scheduler.resume(self.current_directory)
         self.status_bar.showMessage(f"Resumed monitoring task for {self.current_directory}", 5000)
 
     def show_directory_info(self, item):
@@ -239,21 +443,103 @@ class FIMWindow(QMainWindow):
         self.refresh_log()
         self.stop_monitoring_button.setVisible(True)
         self.stop_monitoring_button.setText("Stop Monitoring")
+        self.profile_check_button.setVisible(True)
+
+    def toggle_all_checks(self):
+        if self.scheduler.paused:
+            self.scheduler.resume_all()
+            self.pause_all_button.setText("Pause All Checks")
+            self.status_bar.showMessage("Resumed scheduled integrity checks", 5000)
+        else:
+            self.scheduler.pause_all()
+            self.pause_all_button.setText("Resume All Checks")
+            self.status_bar.showMessage("Paused scheduled integrity checks", 5000)
+
+    def set_global_read_rate(self, text):
+        self.global_throttle.set_limits(None if text == "Unlimited" else int(text))
+
+    def closeEvent(self, event):
+        self.log_viewer.clear()
+        self.scheduler.shutdown()
+        super().closeEvent(event)
+
+    def update_scan_metrics(self, directory, snapshot):
+        self.scan_metrics[directory] = snapshot
+        if directory == self.current_directory and self.scan_metrics_radio.isChecked():
+            self.refresh_log()
+
+    def profile_next_check(self):
+        if self.current_directory in self.baseline_monitors:
+            output_path = PATHS.profile_path(self.current_directory)
+            self.baseline_monitors[self.current_directory].profile_next_check(output_path, memory=True)
+            self.status_bar.showMessage(f"The next check will be profiled to {output_path}.prof", 5000)
 
     def refresh_log(self):
+        self.event_filter_panel.setVisible(self.event_search_radio.isChecked())
         if self.current_directory:
+            if self.event_search_radio.isChecked():
+                self.search_events()
+                return
+            if self.scan_metrics_radio.isChecked():
+                self.show_scan_metrics()
+                return
             if self.event_log_radio.isChecked():
-                log_file = os.path.join(EVENT_LOG_DIR, f"{os.path.basename(self.current_directory)}_event_log.txt")
+                log_file = PATHS.event_log_file(self.current_directory)
             elif self.baseline_log_radio.isChecked():
-                log_file = os.path.join(BASELINE_LOG_DIR, f"{os.path.basename(self.current_directory)}_comparison_log.txt")
+                log_file = PATHS.comparison_log_file(self.current_directory)
             
             if os.path.exists(log_file):
-                with open(log_file, 'r') as file:
-                    self.log_display.setText(file.read())
+                self.log_viewer.open(log_file)
+                self.log_display.setVisible(False)
+                self.log_viewer.setVisible(True)
             else:
-                self.log_display.setText("No logs available for this directory.")
+                self.show_text("No logs available for this directory.")
             self.status_bar.showMessage(f"Refreshed log for {self.current_directory}", 5000)
 
+    def show_scan_metrics(self):
+        snapshot = self.scan_metrics.get(self.current_directory)
+        text = format_metrics(snapshot) if snapshot else "No checks have completed for this directory yet."
+        event_monitor = self.event_directory_monitors.get(self.current_directory)
+        pipeline_stats = event_monitor.pipeline_stats(self.current_directory) if event_monitor else None
+        if pipeline_stats:
+            text += "\n\nEvent queue:\n" + "\n".join(f"  {name}: {value}" for name, value in pipeline_stats.items())
+        watch_stats = event_monitor.watch_stats(self.current_directory) if event_monitor else None
+        if watch_stats:
+            text += "\n\nFile watches:\n" + "\n".join(f"  {name}: {value}" for name, value in watch_stats.items())
+        baseline_worker = self.baseline_monitors.get(self.current_directory)
+        if baseline_worker is not None and baseline_worker.throttle is not None:
+            text += "\n\nI/O throttle:\n" + "\n".join(
+                f"  {name}: {value}" for name, value in baseline_worker.throttle.stats().items())
+        self.show_text(text)
+
+    def search_events(self):
+        if not self.current_directory:
+            return
+        store_file = PATHS.event_store_file(self.current_directory)
+        if not os.path.exists(store_file):
+            self.show_text("No events recorded for this directory yet.")
+            return
+        under = self.event_path_input.text().strip() or None
+        if under and not os.path.isabs(under):
+            under = os.path.join(self.current_directory, under)
+        event_type = self.event_type_combo.currentText()
+        event_types = None if event_type == "All Events" else [event_type]
+        seconds = self.event_time_combo.currentData()
+        since = time.time() - seconds if seconds else None
+        with EventStore(store_file) as store:
+            events = store.query(under, event_types, since)
+            total = store.count(under, event_types, since)
+        if not events:
+            self.show_text("No matching events.")
+            return
+        header = f"{total} matching events" + (f", newest {len(events)} shown" if total > len(events) else "")
+        self.show_text(header + "\n\n" + "\n".join(format_event(event) for event in events))
+
+    def show_text(self, text):
+        self.log_viewer.setVisible(False)
+        self.log_display.setVisible(True)
+        self.log_display.setText(text)
+
     def open_baseline_generator(self):
         if not self.baseline_generator_app:
             self.baseline_generator_app = BaselineGeneratorApp()
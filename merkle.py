@@ -0,0 +1,80 @@
+import os
+import hashlib
+from collections import namedtuple
+from scanner import FolderRecord
+
+# A finished directory: its Merkle digest plus how many folders/files the subtree holds (itself included)
+FolderDigest = namedtuple('FolderDigest', 'path digest tree_files tree_folders tag')
+
+def _file_entry(record):
+    # Timestamps at whole seconds, matching what diff_engine treats as a metadata change
+    return (record.name, b'F', f"{record.size}:{record.mtime_ns // 1_000_000_000}:{record.ctime_ns // 1_000_000_000}:"
+            f"{record.digest}".encode())
+
+def _digest_entries(entries):
+    hasher = hashlib.sha256()
+    for name, kind, payload in sorted(entries):
+        hasher.update(kind + name.encode('utf-8', 'surrogateescape') + b'\0' + payload + b'\0')
+    return hasher.digest()
+
+def compute_folder_digest(file_records, child_digests):
+    """Digest of one folder from its FileRecords and (name, digest) pairs of its subfolders."""
+    entries = [_file_entry(record) for record in file_records]
+    entries.extend((name, b'D', digest) for name, digest in child_digests)
+    return _digest_entries(entries)
+
+class _OpenFolder:
+    __slots__ = ('path', 'key', 'tag', 'entries', 'tree_files', 'tree_folders')
+
+    def __init__(self, path, tag):
+        self.path = path
+        # A root given as '/srv/data/' still has '/srv/data' as its subfolders' dirname
+        self.key = os.path.normpath(path)
+        self.tag = tag
+        self.entries = []
+        self.tree_files = 0
+        self.tree_folders = 1
+
+class MerkleBuilder:
+    """Fold a record stream into per-directory Merkle digests, bottom-up, as folders complete."""
+
+    def __init__(self):
+        self._stack = []
+
+    def add(self, record, tag=None):
+        """Feed one record; returns the FolderDigests of any folders this record closes."""
+        if not isinstance(record, FolderRecord):
+            top = self._stack[-1]
+            top.entries.append(_file_entry(record))
+            top.tree_files += 1
+            return []
+        parent = os.path.normpath(os.path.dirname(record.path))
+        completed = []
+        while self._stack and self._stack[-1].key != parent:
+            completed.append(self._close())
+        self._stack.append(_OpenFolder(record.path, tag))
+        return completed
+
+    def finish(self):
+        """Close every folder still open at the end of the stream, root last."""
+        completed = []
+        while self._stack:
+            completed.append(self._close())
+        return completed
+
+    def _close(self):
+        folder = self._stack.pop()
+        digest = _digest_entries(folder.entries)
+        if self._stack:
+            parent = self._stack[-1]
+            parent.entries.append((os.path.basename(folder.path), b'D', digest))
+            parent.tree_files += folder.tree_files
+            parent.tree_folders += folder.tree_folders
+        return FolderDigest(folder.path, digest, folder.tree_files, folder.tree_folders, folder.tag)
+
+def folder_digests(records):
+    """Yield a FolderDigest for every folder of a record stream, children before parents."""
+    builder = MerkleBuilder()
+    for record in records:
+        yield from builder.add(record)
+    yield from builder.finish()
@@ -1,82 +1,300 @@
 import os
 import logging
+import threading
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
+from event_pipeline import (EventPipeline, BufferedFileHandler, current_user, collapse_paths, DEBOUNCE_SECONDS,
+                            MAX_QUEUE, MAX_MARKERS)
+from log_rotation import LogRotator, DEFAULT_POLICY
+from watch_budget import WatchBudget
+from polling import SnapshotPoller
 
-LOG_DIR = "C:\\ProgramData\\FIM\\Events Logs"
+log = logging.getLogger('fim.monitoring')
 
-# Ensure the log directory exists
-os.makedirs(LOG_DIR, exist_ok=True)
+MAX_DIRTY_PATHS = 100000  # dirty paths held per root before they are collapsed into subtrees
 
-def configure_logging(log_file):
+# One observer, one watch budget and one poller serve every monitored root in the process
+_shared_lock = threading.Lock()
+_observer = None
+_budget = None
+_poller = None
+_watch_users = {}  # ObservedWatch -> handlers on it; nested roots can share a watched subtree
+
+def shared_observer():
+    """The process's watchdog observer, started on first use."""
+    global _observer, _poller
+    with _shared_lock:
+        if _observer is None:
+            _observer = Observer()
+            # Started before anything is scheduled, so running out of inotify watches surfaces in schedule()
+            _observer.start()
+            _poller = SnapshotPoller()
+        return _observer, _poller
+
+def _schedule(handler, path):
+    observer, _ = shared_observer()
+    watch = observer.schedule(handler, path, recursive=True)
+    with _shared_lock:
+        _watch_users[watch] = _watch_users.get(watch, 0) + 1
+    return watch
+
+def _unschedule(handler, watch):
+    observer, _ = shared_observer()
+    with _shared_lock:
+        _watch_users[watch] -= 1
+        last = not _watch_users[watch]
+        if last:
+            del _watch_users[watch]
+    if last:
+        observer.unschedule(watch)
+    else:
+        observer.remove_handler_for_watch(handler, watch)
+
+def shared_watch_budget(max_watches=None):
+    """The process's watch_budget.WatchBudget; `max_watches` overrides its share of the inotify limit."""
+    global _budget
+    with _shared_lock:
+        if _budget is None:
+            _budget = WatchBudget(max_watches)
+        elif max_watches is not None and _budget.limit is not None:
+            _budget.budget = max_watches
+        return _budget
+
+def configure_logging(log_file, rotation=None):
     logger = logging.getLogger(log_file)
-    handler = logging.FileHandler(log_file)
+    # Restarting a task reuses the same named logger; drop the old handler instead of duplicating lines
+    for old_handler in list(logger.handlers):
+        logger.removeHandler(old_handler)
+        old_handler.close()
+    os.makedirs(os.path.dirname(log_file) or '.', exist_ok=True)
+    # Rotated by size and age (log_rotation.DEFAULT_POLICY unless `rotation` says otherwise)
+    handler = BufferedFileHandler(log_file, LogRotator(log_file, rotation))
     formatter = logging.Formatter('[%(asctime)s] - %(user)s - %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
     handler.setFormatter(formatter)
     logger.addHandler(handler)
     logger.setLevel(logging.INFO)
+    # Events belong in the task's log file only, not in whatever the root logger prints (the daemon's console)
+    logger.propagate = False
     return logger
 
+class DirtySet:
+    """Thread-safe set of paths touched since the last scheduled check of one monitored root."""
+
+    def __init__(self, root=None, max_paths=MAX_DIRTY_PATHS):
+        self.root = root
+        self.max_paths = max_paths
+        self._lock = threading.Lock()
+        self._paths = set()
+        self._subtrees = set()
+        self._full = True  # nothing has been observed yet
+
+    def _covered(self, path):
+        while path not in self._subtrees:
+            parent = os.path.dirname(path)
+            if parent == path:
+                return False
+            path = parent
+        return True
+
+    def add(self, *paths):
+        with self._lock:
+            if self._full:
+                return
+            self._paths.update(path for path in paths if not self._subtrees or not self._covered(path))
+            if len(self._paths) > self.max_paths:
+                folders, self._paths = {os.path.dirname(path) for path in self._paths}, set()
+                self._add_subtrees(folders)
+
+    def add_subtrees(self, subtrees):
+        with self._lock:
+            if not self._full:
+                self._add_subtrees(subtrees)
+
+    def _add_subtrees(self, subtrees):
+        subtrees = collapse_paths(self._subtrees | set(subtrees), self.root, MAX_MARKERS)
+        # The whole root is better served by a full sweep, which can use the digest cache and walk workers
+        if subtrees is None or self.root in subtrees:
+            self._full = True
+            self._paths.clear()
+            self._subtrees.clear()
+        else:
+            self._subtrees = subtrees
+
+    def mark_all(self):
+        with self._lock:
+            self._full = True
+            self._paths.clear()
+            self._subtrees.clear()
+
+    def drain(self):
+        """Return (paths, subtrees, full) and reset; `full` means the paths alone cannot be trusted."""
+        with self._lock:
+            paths, subtrees, full = self._paths, self._subtrees, self._full
+            self._paths = set()
+            self._subtrees = set()
+            self._full = False
+        return paths, subtrees, full
+
 class DirectoryEventHandler(FileSystemEventHandler):
-    def __init__(self, logger):
+    def __init__(self, logger, dirty_set=None, pipeline=None, path_filter=None):
         super().__init__()
         self.logger = logger
+        self.dirty_set = dirty_set
+        self.pipeline = pipeline
+        # Paths the scans exclude are dropped here, before they are logged or marked dirty
+        self.path_filter = path_filter
+        self.user = current_user()
+
+    def _ignores(self, path, is_directory):
+        return self.path_filter is not None and self.path_filter.ignores(path, is_directory)
 
     def log_event(self, event_type, src_path, dest_path=None):
-        user = os.getlogin()
+        if self.pipeline is not None:
+            # A collapsed event is marked dirty with its subtree when the storm passes (see _overflowed)
+            if self.pipeline.submit(event_type, src_path, dest_path) and self.dirty_set is not None:
+                self.dirty_set.add(*(path for path in (src_path, dest_path) if path))
+            return
+        if self.dirty_set is not None:
+            self.dirty_set.add(*(path for path in (src_path, dest_path) if path))
         if dest_path:
             message = f"{event_type} - {src_path} -> {dest_path}"
         else:
             message = f"{event_type} - {src_path}"
-        self.logger.info(message, extra={'user': user})
+        self.logger.info(message, extra={'user': self.user})
+        for handler in self.logger.handlers:
+            handler.flush()
 
     def on_created(self, event):
+        if self._ignores(event.src_path, event.is_directory):
+            return
         if event.is_directory:
             self.log_event("Directory Created", event.src_path)
         else:
             self.log_event("File Created", event.src_path)
 
     def on_deleted(self, event):
+        if self._ignores(event.src_path, event.is_directory):
+            return
         if event.is_directory:
             self.log_event("Directory Deleted", event.src_path)
         else:
             self.log_event("File Deleted", event.src_path)
 
     def on_modified(self, event):
+        if self._ignores(event.src_path, event.is_directory):
+            return
         if event.is_directory:
             self.log_event("Directory Modified", event.src_path)
         else:
             self.log_event("File Modified", event.src_path)
 
     def on_moved(self, event):
+        kind = "Directory" if event.is_directory else "File"
+        # A move across the filter's edge is, as far as the scans can tell, a creation or a deletion
+        if self._ignores(event.src_path, event.is_directory):
+            if not self._ignores(event.dest_path, event.is_directory):
+                self.log_event(f"{kind} Created", event.dest_path)
+            return
+        if self._ignores(event.dest_path, event.is_directory):
+            self.log_event(f"{kind} Deleted", event.src_path)
+            return
         if event.is_directory:
             self.log_event("Directory Moved", event.src_path, event.dest_path)
         else:
             self.log_event("File Moved", event.src_path, event.dest_path)
 
 class DirectoryMonitor:
-    def __init__(self):
-        self.observers = {}
+    """File event monitoring of any number of roots, on the shared observer and within the watch budget."""
+
+    def __init__(self, debounce=DEBOUNCE_SECONDS, max_queue=MAX_QUEUE, rotation=None, max_watches=None,
+                 on_overflow=None):
+        self.handlers = {}
+        self.watches = {}
+        self.pipelines = {}
+        self.dirty_sets = {}
+        self.debounce = debounce
+        self.max_queue = max_queue
+        self.rotation = rotation
+        self.budget = shared_watch_budget(max_watches)
+        self.on_overflow = on_overflow
 
-    def start_monitoring(self, directory_path, log_file):
-        if directory_path in self.observers:
+    def get_dirty_set(self, directory_path):
+        """The dirty set for a root; it outlives stop/start so a paused root forces a full sweep."""
+        if directory_path not in self.dirty_sets:
+            self.dirty_sets[directory_path] = DirtySet(directory_path)
+        return self.dirty_sets[directory_path]
+
+    def _overflowed(self, directory_path, subtrees):
+        # Called on the pipeline's writer thread once the storm has passed
+        self.get_dirty_set(directory_path).add_subtrees(subtrees)
+        log.warning("Event storm under %s: events collapsed into %d dirty subtrees to rescan",
+                    directory_path, len(subtrees))
+        if self.on_overflow is not None:
+            self.on_overflow(directory_path)
+
+    def start_monitoring(self, directory_path, log_file, event_store=None, path_filter=None):
+        if directory_path in self.handlers:
             self.stop_monitoring(directory_path)
 
-        logger = configure_logging(log_file)
-        event_handler = DirectoryEventHandler(logger)
-        observer = Observer()
-        observer.schedule(event_handler, path=directory_path, recursive=True)
-        observer.start()
-        self.observers[directory_path] = observer
+        logger = configure_logging(log_file, self.rotation)
+        pipeline = EventPipeline(logger, max_queue=self.max_queue, debounce=self.debounce, store_path=event_store,
+                                 retention=(self.rotation or DEFAULT_POLICY).retention, root=directory_path,
+                                 on_overflow=lambda subtrees: self._overflowed(directory_path, subtrees))
+        pipeline.start()
+        event_handler = DirectoryEventHandler(logger, self.get_dirty_set(directory_path), pipeline, path_filter)
+        _, poller = shared_observer()
+        plan = self.budget.plan(directory_path, path_filter)
+        watches = []
+        for subtree in plan.watched:
+            try:
+                watches.append(_schedule(event_handler, subtree))
+            except OSError as error:
+                # Other programs took the watches the plan counted on
+                log.warning("Polling %s: it can't be watched (%s)", subtree, error)
+                poller.add(event_handler, subtree, recursive=True)
+        for subtree in plan.polled:
+            poller.add(event_handler, subtree, recursive=True)
+        for folder in plan.shallow:
+            poller.add(event_handler, folder, recursive=False)
+        if plan.polled or plan.shallow:
+            log.info("%s exceeds the inotify watch budget: %d subtrees watched with %d watches, "
+                     "%d subtrees and %d folders polled", directory_path, len(plan.watched), plan.watches,
+                     len(plan.polled), len(plan.shallow))
+        self.handlers[directory_path] = event_handler
+        self.watches[directory_path] = watches
+        self.pipelines[directory_path] = pipeline
+
+    def pipeline_stats(self, directory_path):
+        """Counters (submitted, written, coalesced, dropped, queued, overflows, collapsed) of a root's pipeline."""
+        pipeline = self.pipelines.get(directory_path)
+        return pipeline.stats() if pipeline else None
+
+    def watch_stats(self, directory_path):
+        """How a root is covered: its share of the watch budget and what polling its overflow costs."""
+        handler = self.handlers.get(directory_path)
+        if handler is None:
+            return None
+        usage = self.budget.usage()
+        stats = {'watch_limit': usage['limit'], 'watch_budget': usage['budget'],
+                 'watches_reserved': usage['reserved'], 'watches_in_use': usage['in_use']}
+        stats.update(usage['roots'].get(directory_path, {}))
+        _, poller = shared_observer()
+        stats.update(poller.stats(handler))
+        return stats
 
     def stop_monitoring(self, directory_path):
-        if directory_path in self.observers:
-            self.observers[directory_path].stop()
-            self.observers[directory_path].join()
-            del self.observers[directory_path]
+        handler = self.handlers.pop(directory_path, None)
+        if handler is None:
+            return
+        _, poller = shared_observer()
+        for watch in self.watches.pop(directory_path):
+            _unschedule(handler, watch)
+        poller.remove(handler)
+        self.budget.release(directory_path)
+        self.pipelines.pop(directory_path).stop()
+        # Events are no longer being seen, so the dirty set can't be trusted until a full sweep
+        self.get_dirty_set(directory_path).mark_all()
 
     def stop_all(self):
-        for observer in list(self.observers.values()):
-            observer.stop()
-            observer.join()
-        self.observers.clear()
+        for directory_path in list(self.handlers):
+            self.stop_monitoring(directory_path)
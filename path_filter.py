@@ -0,0 +1,117 @@
+import os
+import re
+import sys
+import json
+import fnmatch
+from collections import namedtuple
+
+# The include/exclude rules of one monitored directory, as given: glob and regex patterns, extensions
+# (without the dot), a size limit in bytes and whether to stay on the directory's own filesystem
+FilterRules = namedtuple('FilterRules', 'exclude include exclude_regex include_regex extensions exclude_extensions '
+                                        'max_size one_filesystem', defaults=((), (), (), (), (), (), None, False))
+
+NO_RULES = FilterRules()
+
+def split_list(text):
+    """The items of a comma-separated option such as "py, txt" as a tuple; empty or None gives ()."""
+    return tuple(part.strip() for part in text.split(',') if part.strip()) if text else ()
+
+_FLAGS = re.IGNORECASE if sys.platform == 'win32' else 0
+_DEVICE_CACHE_SIZE = 10000
+
+def rules_to_json(rules):
+    return json.dumps(rules._asdict())
+
+def rules_from_json(text):
+    return FilterRules(**{key: tuple(value) if isinstance(value, list) else value
+                          for key, value in json.loads(text).items()}) if text else NO_RULES
+
+def _compile(globs, regexes=()):
+    """One regex for (patterns on the name, patterns on the relative path), or None for each side with none."""
+    names = [fnmatch.translate(glob) for glob in globs if '/' not in glob.strip('/')]
+    paths = [fnmatch.translate(glob.strip('/')) for glob in globs if '/' in glob.strip('/')]
+    paths += [f"(?:.*?(?:{regex}))" for regex in regexes]
+    name_regex = re.compile('|'.join(names), _FLAGS) if names else None
+    path_regex = re.compile('|'.join(paths), _FLAGS) if paths else None
+    return name_regex, path_regex
+
+def _matches(compiled, name, relative):
+    name_regex, path_regex = compiled
+    return bool(name_regex is not None and name_regex.match(name)
+                or path_regex is not None and path_regex.match(relative))
+
+class PathFilter:
+    """FilterRules compiled once into a few regexes and sets, for deciding path by path what is monitored."""
+
+    def __init__(self, root, rules):
+        self.root = root.rstrip(os.sep) or os.sep
+        self.rules = rules
+        self._exclude = _compile(rules.exclude, rules.exclude_regex)
+        self._include = _compile(rules.include, rules.include_regex)
+        self._has_includes = bool(rules.include or rules.include_regex or rules.extensions)
+        self._extensions = frozenset(extension.lower().lstrip('.') for extension in rules.extensions)
+        self._exclude_extensions = frozenset(extension.lower().lstrip('.') for extension in rules.exclude_extensions)
+        self.max_size = rules.max_size
+        self.device = os.stat(root).st_dev if rules.one_filesystem else None
+        self._devices = {}
+
+    def relative(self, path):
+        """`path` relative to the root, '' for the root itself, or None for a path outside it."""
+        if path == self.root:
+            return ''
+        prefix = self.root if self.root.endswith(os.sep) else self.root + os.sep
+        if not path.startswith(prefix):
+            return None
+        relative = path[len(prefix):].lstrip(os.sep)
+        return relative.replace(os.sep, '/') if os.sep != '/' else relative
+
+    def excludes_dir(self, relative, name):
+        return _matches(self._exclude, name, relative)
+
+    def excludes_file(self, relative, name):
+        """Whether a file is left out by name or path; its size is judged separately (excludes_size)."""
+        if _matches(self._exclude, name, relative):
+            return True
+        extension = name.rpartition('.')[2].lower() if '.' in name else ''
+        if extension in self._exclude_extensions:
+            return True
+        if not self._has_includes:
+            return False
+        return not (extension in self._extensions or _matches(self._include, name, relative))
+
+    def excludes_size(self, size):
+        return self.max_size is not None and size > self.max_size
+
+    def crosses_device(self, st):
+        return self.device is not None and st.st_dev != self.device
+
+    def ignores(self, path, is_directory):
+        """Whether an event on `path` concerns something the scans leave out."""
+        relative = self.relative(path)
+        if not relative:
+            return False
+        parts = relative.split('/')
+        for depth in range(len(parts) - (0 if is_directory else 1)):
+            if self.excludes_dir('/'.join(parts[:depth + 1]), parts[depth]):
+                return True
+        if not is_directory and self.excludes_file(relative, parts[-1]):
+            return True
+        return self.device is not None and self._parent_device(os.path.dirname(path)) not in (None, self.device)
+
+    def _parent_device(self, folder):
+        device = self._devices.get(folder)
+        if device is None:
+            try:
+                device = os.stat(folder).st_dev
+            except OSError:
+                return None
+            if len(self._devices) >= _DEVICE_CACHE_SIZE:
+                self._devices.clear()
+            self._devices[folder] = device
+        return device
+
+def compile_filter(root, rules):
+    """A PathFilter for `root`, or None when the rules leave everything in (so callers skip filtering)."""
+    if rules is None or rules == NO_RULES:
+        return None
+    return PathFilter(root, rules)
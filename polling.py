@@ -0,0 +1,156 @@
+"""Stat-snapshot polling for the folders file events don't cover (see watch_budget.py)."""
+import os
+import time
+import threading
+from watchdog.events import (FileCreatedEvent, FileDeletedEvent, FileModifiedEvent, FileMovedEvent,
+                             DirCreatedEvent, DirDeletedEvent)
+from walker import walk
+
+MIN_POLL_SECONDS = 5
+MAX_POLL_SECONDS = 300
+FIRST_POLL_SECONDS = 30
+# Intervals are at least this many times what a poll takes, so polling never uses more than 5% of the time
+POLL_COST_FACTOR = 20
+
+def snapshot(path, recursive=True, path_filter=None):
+    """{path: (is folder, inode, size, mtime_ns)} of everything below `path` (or only in it)."""
+    entries = {}
+    for folder, subdirs, files in walk(path, path_filter=path_filter):
+        for name in subdirs:
+            entries[os.path.join(folder, name)] = (True, None, None, None)
+        for st in files:
+            entries[os.path.join(folder, st.name)] = (False, st.st_ino, st.st_size, st.st_mtime_ns)
+        if not recursive:
+            subdirs.clear()
+    return entries
+
+def snapshot_events(old, new):
+    """The watchdog events that turn snapshot `old` into `new`; a file keeping its inode at a new path moved."""
+    created = [path for path in new if path not in old]
+    deleted = [path for path in old if path not in new]
+    # Without inode numbers (Windows) a move is a deletion and a creation; each hard link is claimed once
+    moved_from = {}
+    for path in deleted:
+        if not old[path][0] and old[path][1]:
+            moved_from.setdefault(old[path][1], []).append(path)
+    claimed = set()
+    events = []
+    for path in created:
+        is_folder, inode = new[path][:2]
+        sources = None if is_folder else moved_from.get(inode)
+        if sources:
+            source = sources.pop(0)
+            claimed.add(source)
+            events.append(FileMovedEvent(source, path))
+        else:
+            events.append(DirCreatedEvent(path) if is_folder else FileCreatedEvent(path))
+    # Every deleted file no move claimed was deleted
+    for path in deleted:
+        if old[path][0]:
+            events.append(DirDeletedEvent(path))
+        elif path not in claimed:
+            events.append(FileDeletedEvent(path))
+    for path, entry in new.items():
+        previous = old.get(path)
+        if previous is not None and not entry[0] and previous != entry:
+            events.append(FileModifiedEvent(path))
+    return events
+
+class _Polled:
+    def __init__(self, handler, path, recursive):
+        self.handler = handler
+        self.path = path
+        self.recursive = recursive
+        self.entries = None
+        self.interval = FIRST_POLL_SECONDS
+        self.due = 0
+        self.polls = 0
+        self.changes = 0
+        self.seconds = 0.0
+
+class SnapshotPoller:
+    """Polls folders on one background thread, each at an interval adapted to its churn."""
+
+    def __init__(self):
+        self._polled = []
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def add(self, handler, path, recursive=True):
+        with self._lock:
+            self._polled.append(_Polled(handler, path, recursive))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="fim-poller", daemon=True)
+                self._thread.start()
+        self._wake.set()
+
+    def remove(self, handler):
+        """Stop polling everything polled for `handler`."""
+        with self._lock:
+            self._polled = [polled for polled in self._polled if polled.handler is not handler]
+
+    def stats(self, handler):
+        """Folders polled for `handler`, with their current intervals and how much polling found and cost."""
+        with self._lock:
+            polled = [polled for polled in self._polled if polled.handler is handler]
+        return {
+            'polled': len(polled),
+            'shortest_interval': min((p.interval for p in polled), default=None),
+            'longest_interval': max((p.interval for p in polled), default=None),
+            'polls': sum(p.polls for p in polled),
+            'changes': sum(p.changes for p in polled),
+            'poll_seconds': round(sum(p.seconds for p in polled), 3),
+        }
+
+    def _run(self):
+        while True:
+            with self._lock:
+                due = min(self._polled, key=lambda polled: polled.due, default=None)
+            wait = MAX_POLL_SECONDS if due is None else due.due - time.monotonic()
+            if wait > 0:
+                # Woken early when folders are added, so their first snapshots aren't kept waiting
+                self._wake.wait(wait)
+                self._wake.clear()
+                continue
+            self._poll(due)
+
+    def _poll(self, polled):
+        start = time.monotonic()
+        entries = snapshot(polled.path, polled.recursive, polled.handler.path_filter)
+        events = [] if polled.entries is None else snapshot_events(polled.entries, entries)
+        polled.entries = entries
+        with self._lock:
+            if polled not in self._polled:
+                # Removed while being polled
+                return
+        for event in events:
+            polled.handler.dispatch(event)
+        if not polled.recursive:
+            self._follow_subfolders(polled, events)
+        elapsed = time.monotonic() - start
+        polled.polls += 1
+        polled.changes += len(events)
+        polled.seconds += elapsed
+        if events:
+            polled.interval = max(MIN_POLL_SECONDS, polled.interval / 2)
+        elif polled.polls > 1:
+            polled.interval = min(MAX_POLL_SECONDS, polled.interval * 1.5)
+        polled.interval = max(polled.interval, elapsed * POLL_COST_FACTOR)
+        polled.due = time.monotonic() + polled.interval
+
+    def _follow_subfolders(self, polled, events):
+        """Poll new subfolders of a shallowly polled folder in full, and stop polling deleted ones."""
+        with self._lock:
+            for event in events:
+                if os.path.dirname(event.src_path) != polled.path:
+                    continue
+                if isinstance(event, DirCreatedEvent):
+                    added = _Polled(polled.handler, event.src_path, True)
+                    # Its first poll reports what was put in it since it was created
+                    added.entries = {}
+                    self._polled.append(added)
+                elif isinstance(event, DirDeletedEvent):
+                    prefix = event.src_path + os.sep
+                    self._polled = [other for other in self._polled if other.handler is not polled.handler
+                                    or (other.path != event.src_path and not other.path.startswith(prefix))]
@@ -0,0 +1,36 @@
+import random
+import secrets
+from hash_engine import BLOCK_DIGEST_SIZE
+
+SAMPLE_BLOCKS = 8
+FULL_HASH_EVERY = 6
+
+class QuickCheck:
+    """Tier 0/1 verification plan for one check of a directory against its baseline store."""
+
+    def __init__(self, store, samples=SAMPLE_BLOCKS):
+        self.store = store
+        self.samples = samples
+        self.rng = random.Random(secrets.randbits(128))
+        self.sampled = 0
+        self.hashed = 0
+
+    def sample(self, folder_path, name, st):
+        """The hash_engine.hash_sampled plan for one file, or None when it needs a full hash."""
+        entry = self.store.file_entry(folder_path, name)
+        if (entry is None or entry.blocks is None
+                or (entry.size, entry.mtime_ns, entry.ctime_ns) != (st.st_size, st.st_mtime_ns, st.st_ctime_ns)):
+            self.hashed += 1
+            return None
+        block_size, block_digests = entry.blocks
+        count = len(block_digests) // BLOCK_DIGEST_SIZE
+        indices = {0, count - 1}
+        middle = range(1, count - 1)
+        indices.update(self.rng.sample(middle, min(self.samples, len(middle))))
+        self.sampled += 1
+        return entry.digest, block_size, [
+            (index, block_digests[index * BLOCK_DIGEST_SIZE:(index + 1) * BLOCK_DIGEST_SIZE])
+            for index in sorted(indices)]
+
+    def summary(self):
+        return f"Quick check: {self.sampled} files sampled, {self.hashed} hashed in full"
@@ -0,0 +1,70 @@
+import os
+from scanner import iter_records
+from hash_engine import DEFAULT_ALGORITHM
+
+def _is_within(path, directory):
+    return path == directory or path.startswith(directory.rstrip(os.sep) + os.sep)
+
+def _depth(path):
+    return path.count(os.sep)
+
+def _resolve_folder(store, directory, path):
+    """Climb from `path` to the nearest folder that is both still on disk and already in the store."""
+    while _is_within(path, directory) and path != directory:
+        if os.path.isdir(path) and store.folder_row(path) is not None:
+            return path
+        path = os.path.dirname(path)
+    return directory
+
+def refresh_store(store, directory, dirty_paths, workers=None, algorithms=(DEFAULT_ALGORITHM,), metrics=None,
+                  cancel=None, throttle=None, digest_cache=None, path_filter=None, dirty_subtrees=()):
+    """Bring a BaselineStore up to date by rescanning only what `dirty_paths` and `dirty_subtrees` touched."""
+    folders = set()
+    for path in dirty_paths:
+        # The path itself may be a folder whose listing changed; its parent's listing may have changed too
+        folders.add(_resolve_folder(store, directory, path))
+        folders.add(_resolve_folder(store, directory, os.path.dirname(path)))
+    # A subtree that is gone is covered by relisting the nearest folder still there
+    subtrees = {_resolve_folder(store, directory, path) for path in dirty_subtrees}
+    folders |= subtrees
+
+    inserted = []
+    touched = set()
+    for path in sorted(folders, key=_depth):
+        if any(_is_within(path, root) for root in inserted):
+            continue
+        folder = store.folder_row(path)
+        records = list(iter_records(path, workers, recursive=False, algorithms=algorithms, metrics=metrics,
+                                    cancel=cancel, throttle=throttle, digest_cache=digest_cache,
+                                    path_filter=path_filter))
+        if folder is None or not records:
+            continue
+        old_children = store.child_folders(folder)
+        store.replace_folder(folder, records[0], records[1:])
+        for name in old_children.keys() - set(records[0].subdirs):
+            store.delete_subtree(old_children[name].path)
+        rescanned = set(records[0].subdirs) if path in subtrees else set(records[0].subdirs) - old_children.keys()
+        for name in sorted(rescanned):
+            child = os.path.join(path, name)
+            # The scanner does not descend into symlinked folders, so neither does a targeted rescan
+            if not os.path.islink(child):
+                if name in old_children:
+                    # Only subfolders are replaced; the root's row must stay first for BaselineStore.root()
+                    store.delete_subtree(child)
+                store.insert_subtree(iter_records(child, workers, algorithms=algorithms, metrics=metrics,
+                                                  cancel=cancel, throttle=throttle, digest_cache=digest_cache,
+                                                  path_filter=path_filter))
+                inserted.append(child)
+        touched.add(path)
+
+    stale = set()
+    for path in touched:
+        while _is_within(path, directory):
+            stale.add(path)
+            if path == directory:
+                break
+            path = os.path.dirname(path)
+    for path in sorted(stale, key=_depth, reverse=True):
+        store.refresh_digest(store.folder_row(path))
+    store.commit()
+    return len(touched)
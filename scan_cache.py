@@ -0,0 +1,191 @@
+import time
+import sqlite3
+import threading
+
+MAX_ENTRIES = 2_000_000
+FLUSH_EVERY = 2000  # digests held per scan before they are written out in one transaction
+TOUCH_AFTER = 3600  # a hit refreshes an entry's last use only when it is older than this, in seconds
+EVICT_CHECK_EVERY = 20000  # new entries between checks of the size bound
+
+class RescanCache:
+    """Persistent per-directory digest cache keyed by file metadata."""
+
+    def __init__(self, cache_path, paranoid_every=0, algorithm='sha256'):
+        self.cache_path = cache_path
+        self.paranoid_every = paranoid_every
+        self.algorithm = algorithm
+        self.paranoid = False
+        self.hits = 0
+        self.misses = 0
+        self._conn = None
+        self._check = 0
+
+    def begin_check(self):
+        """Open the cache for one scan; returns True when this scan is a paranoid full rehash."""
+        # The connection is opened here rather than in __init__ so it belongs to the scanning thread
+        self._conn = sqlite3.connect(self.cache_path)
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS digests (dev INTEGER, ino INTEGER, size INTEGER, mtime_ns INTEGER,"
+            " ctime_ns INTEGER, digest TEXT, seen INTEGER,"
+            " PRIMARY KEY (dev, ino, size, mtime_ns, ctime_ns)) WITHOUT ROWID;"
+            "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER);"
+        )
+        row = self._conn.execute("SELECT value FROM meta WHERE key = 'algorithm'").fetchone()
+        if row is not None and row[0] != self.algorithm:
+            # Digests from another algorithm are useless; start the cache over
+            self._conn.execute("DELETE FROM digests")
+        self._conn.execute("INSERT OR REPLACE INTO meta VALUES ('algorithm', ?)", (self.algorithm,))
+        row = self._conn.execute("SELECT value FROM meta WHERE key = 'checks'").fetchone()
+        self._check = (row[0] if row else 0) + 1
+        self.paranoid = bool(self.paranoid_every) and self._check % self.paranoid_every == 0
+        self.hits = 0
+        self.misses = 0
+        return self.paranoid
+
+    def lookup(self, st):
+        """Return the cached digest for a stat result, or None when the file must be hashed."""
+        if self.paranoid:
+            self.misses += 1
+            return None
+        key = _stat_key(st)
+        row = self._conn.execute(
+            "SELECT digest FROM digests WHERE dev = ? AND ino = ? AND size = ? AND mtime_ns = ? AND ctime_ns = ?",
+            key).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self._conn.execute(
+            "UPDATE digests SET seen = ? WHERE dev = ? AND ino = ? AND size = ? AND mtime_ns = ? AND ctime_ns = ?",
+            (self._check,) + key)
+        self.hits += 1
+        return row[0]
+
+    def store(self, st, digest):
+        self._conn.execute("INSERT OR REPLACE INTO digests VALUES (?, ?, ?, ?, ?, ?, ?)",
+                           _stat_key(st) + (digest, self._check))
+
+    def finish_check(self):
+        """Commit the scan, dropping entries for files that were not seen in it."""
+        self._conn.execute("DELETE FROM digests WHERE seen < ?", (self._check,))
+        self._conn.execute("INSERT OR REPLACE INTO meta VALUES ('checks', ?)", (self._check,))
+        self._conn.commit()
+        self._conn.close()
+        self._conn = None
+
+    def abort_check(self):
+        """Close the cache without recording the scan."""
+        self._conn.rollback()
+        self._conn.close()
+        self._conn = None
+
+def _stat_key(st):
+    return (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns, st.st_ctime_ns)
+
+class DigestCache:
+    """On-disk digest cache keyed by inode and metadata, shared by every scan in the process."""
+
+    def __init__(self, path, max_entries=MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._added = 0
+        with self._connect() as conn:
+            conn.executescript(
+                "CREATE TABLE IF NOT EXISTS digests (dev INTEGER, ino INTEGER, size INTEGER, mtime_ns INTEGER,"
+                " ctime_ns INTEGER, algorithm TEXT, digest BLOB, used REAL,"
+                " PRIMARY KEY (dev, ino, size, mtime_ns, ctime_ns, algorithm)) WITHOUT ROWID;"
+                "CREATE INDEX IF NOT EXISTS digests_used ON digests (used);")
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=60)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _state(self):
+        local = self._local
+        if not hasattr(local, 'conn'):
+            local.conn = self._connect()
+            local.pending = {}  # key + (algorithm,) -> hex digest, not yet written
+            local.touched = []  # keys + (algorithm,) whose last use is to be refreshed
+        return local
+
+    def lookup(self, st, algorithms):
+        """The cached digests of a file for every one of `algorithms`, or None unless all are cached."""
+        local = self._state()
+        key = _stat_key(st)
+        digests = []
+        now = time.time()
+        for algorithm in algorithms:
+            digest = local.pending.get(key + (algorithm,))
+            if digest is None:
+                row = local.conn.execute(
+                    "SELECT digest, used FROM digests WHERE dev = ? AND ino = ? AND size = ? AND mtime_ns = ?"
+                    " AND ctime_ns = ? AND algorithm = ?", key + (algorithm,)).fetchone()
+                if row is None:
+                    self.misses += 1
+                    return None
+                digest = row[0].hex()
+                if now - row[1] > TOUCH_AFTER:
+                    local.touched.append(key + (algorithm,))
+            digests.append(digest)
+        self.hits += 1
+        return tuple(digests)
+
+    def store(self, st, algorithms, digests):
+        local = self._state()
+        key = _stat_key(st)
+        for algorithm, digest in zip(algorithms, digests):
+            local.pending[key + (algorithm,)] = digest
+        if len(local.pending) >= FLUSH_EVERY:
+            self.flush()
+
+    def flush(self):
+        """Write out this thread's new digests and refreshed entries, then evict past the size bound."""
+        local = self._state()
+        if not local.pending and not local.touched:
+            return
+        now = time.time()
+        with local.conn:
+            local.conn.executemany("INSERT OR REPLACE INTO digests VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                                   [key + (bytes.fromhex(digest), now) for key, digest in local.pending.items()])
+            local.conn.executemany("UPDATE digests SET used = ? WHERE dev = ? AND ino = ? AND size = ?"
+                                   " AND mtime_ns = ? AND ctime_ns = ? AND algorithm = ?",
+                                   [(now,) + key for key in local.touched])
+        with self._lock:
+            self._added += len(local.pending)
+            evict = self._added >= EVICT_CHECK_EVERY
+            if evict:
+                self._added = 0
+        local.pending = {}
+        local.touched = []
+        if evict:
+            self._evict(local.conn)
+
+    def _evict(self, conn):
+        count = conn.execute("SELECT COUNT(*) FROM digests").fetchone()[0]
+        if count <= self.max_entries:
+            return
+        # Down to 90% of the bound, so eviction runs once per many flushes rather than on every one
+        excess = count - self.max_entries * 9 // 10
+        with conn:
+            # By key rather than by a cut-off time: a whole flush shares one time, and ties must not all go
+            conn.execute("DELETE FROM digests WHERE (dev, ino, size, mtime_ns, ctime_ns, algorithm) IN"
+                         " (SELECT dev, ino, size, mtime_ns, ctime_ns, algorithm FROM digests ORDER BY used LIMIT ?)",
+                         (excess,))
+
+_shared = {}
+_shared_lock = threading.Lock()
+
+def shared_digest_cache(path=None):
+    """The process's DigestCache for `path` (by default the one in the FIM data directory)."""
+    if path is None:
+        from data_paths import DataPaths
+        path = DataPaths().ensure().digest_cache_file()
+    with _shared_lock:
+        if path not in _shared:
+            _shared[path] = DigestCache(path)
+        return _shared[path]
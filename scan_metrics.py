@@ -0,0 +1,173 @@
+import os
+import time
+import heapq
+import pstats
+import cProfile
+import threading
+import tracemalloc
+from contextlib import contextmanager
+
+SLOWEST_FILES = 10
+
+# "hash" is summed over worker threads; "hash_wait" is time the scan sat blocked on a digest
+PHASES = ('walk', 'hash', 'hash_wait', 'diff', 'report', 'check')
+
+class ScanMetrics:
+    """Counters, phase timers, slowest files and queue depths for one monitored directory."""
+
+    def __init__(self, slowest=SLOWEST_FILES):
+        self.slowest = slowest
+        self._lock = threading.Lock()
+        self.counters = {'checks': 0, 'files': 0, 'folders': 0, 'files_hashed': 0, 'bytes_hashed': 0,
+                         'files_skipped': 0, 'files_sampled': 0}
+        self.timers = dict.fromkeys(PHASES, 0.0)
+        self.gauges = {}
+        self.last_check = {}
+        self._slowest = []  # min-heap of (seconds, path), so the fastest of the slow drops out first
+        self._check_start = None
+
+    def count(self, name, amount=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def add_time(self, phase, seconds):
+        with self._lock:
+            self.timers[phase] = self.timers.get(phase, 0.0) + seconds
+
+    @contextmanager
+    def timer(self, phase):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(phase, time.perf_counter() - start)
+
+    def gauge(self, name, value):
+        """Set a queue depth; the highest value seen is kept as `<name>_max`."""
+        with self._lock:
+            self.gauges[name] = value
+            if value > self.gauges.get(name + '_max', 0):
+                self.gauges[name + '_max'] = value
+
+    def file_hashed(self, path, size, seconds):
+        with self._lock:
+            self.counters['files_hashed'] += 1
+            self.counters['bytes_hashed'] += size
+            if seconds is not None:
+                self.timers['hash'] += seconds
+                if len(self._slowest) < self.slowest:
+                    heapq.heappush(self._slowest, (seconds, path))
+                elif seconds > self._slowest[0][0]:
+                    heapq.heapreplace(self._slowest, (seconds, path))
+
+    def begin_check(self):
+        """Remember where the counters stood, so finish_check() can report this check on its own."""
+        with self._lock:
+            self._check_start = (time.perf_counter(), dict(self.counters), dict(self.timers))
+            self._slowest = []
+
+    def finish_check(self):
+        with self._lock:
+            if self._check_start is None:
+                return
+            start, counters, timers = self._check_start
+            self._check_start = None
+            self.counters['checks'] += 1
+            self.timers['check'] += time.perf_counter() - start
+            self.last_check = {
+                'finished': time.time(),
+                'counters': {name: value - counters.get(name, 0) for name, value in self.counters.items()},
+                'timers': {name: value - timers.get(name, 0.0) for name, value in self.timers.items()},
+            }
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'counters': dict(self.counters),
+                'timers': dict(self.timers),
+                'gauges': dict(self.gauges),
+                'slowest_files': sorted(self._slowest, reverse=True),
+                'last_check': dict(self.last_check),
+            }
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def render_prometheus(snapshot, directory):
+    """Render a snapshot in the Prometheus text exposition format."""
+    label = f'directory="{_escape(directory)}"'
+    lines = []
+
+    def metric(name, kind, help_text, samples):
+        lines.append(f"# HELP fim_scan_{name} {help_text}")
+        lines.append(f"# TYPE fim_scan_{name} {kind}")
+        for extra, value in samples:
+            lines.append(f"fim_scan_{name}{{{label}{extra}}} {value}")
+
+    for name, value in snapshot['counters'].items():
+        metric(f"{name}_total", 'counter', f"{name.replace('_', ' ').capitalize()} counted since monitoring started.",
+               [('', value)])
+    metric('phase_seconds_total', 'counter', "Time spent in each scan phase over all checks.",
+           [(f',phase="{phase}"', f"{seconds:.6f}") for phase, seconds in snapshot['timers'].items()])
+    last_timers = snapshot['last_check'].get('timers', {})
+    metric('last_check_phase_seconds', 'gauge', "Time spent in each scan phase during the latest check.",
+           [(f',phase="{phase}"', f"{seconds:.6f}") for phase, seconds in last_timers.items()])
+    metric('queue_depth', 'gauge', "Current and peak depth of the scan's internal queues.",
+           [(f',queue="{_escape(queue)}"', value) for queue, value in snapshot['gauges'].items()])
+    metric('slowest_file_seconds', 'gauge', "Slowest files to hash in the latest check.",
+           [(f',path="{_escape(path)}"', f"{seconds:.6f}") for seconds, path in snapshot['slowest_files']])
+    if 'finished' in snapshot['last_check']:
+        metric('last_check_timestamp_seconds', 'gauge', "When the latest check finished.",
+               [('', f"{snapshot['last_check']['finished']:.3f}")])
+    return '\n'.join(lines) + '\n'
+
+def write_prometheus(snapshot, directory, path):
+    """Write the metrics file atomically, so a textfile collector never reads half of it."""
+    temp_path = path + '.tmp'
+    with open(temp_path, 'w') as f:
+        f.write(render_prometheus(snapshot, directory))
+    os.replace(temp_path, path)
+
+def format_metrics(snapshot):
+    """Human-readable summary of a snapshot, for the dashboard."""
+    last = snapshot['last_check']
+    counters = last.get('counters', snapshot['counters'])
+    timers = last.get('timers', snapshot['timers'])
+    lines = [f"Checks: {snapshot['counters']['checks']}"]
+    if 'finished' in last:
+        lines.append(f"Last check finished: {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(last['finished']))}")
+    lines.append(f"Files: {counters['files']}  Folders: {counters['folders']}  Hashed: {counters['files_hashed']}"
+                 f"  Skipped: {counters['files_skipped']}  Sampled: {counters['files_sampled']}")
+    lines.append(f"Bytes hashed: {counters['bytes_hashed']}")
+    lines.append("Phase times (last check):")
+    lines.extend(f"  {phase}: {seconds:.3f} s" for phase, seconds in timers.items())
+    if snapshot['gauges']:
+        lines.append("Queue depths:")
+        lines.extend(f"  {queue}: {value}" for queue, value in sorted(snapshot['gauges'].items()))
+    if snapshot['slowest_files']:
+        lines.append("Slowest files:")
+        lines.extend(f"  {seconds:.3f} s  {path}" for seconds, path in snapshot['slowest_files'])
+    return '\n'.join(lines)
+
+@contextmanager
+def profiled(output_path, memory=False):
+    """Profile the block with cProfile into `<output_path>.prof`, and tracemalloc with `memory`."""
+    profiler = cProfile.Profile()
+    if memory:
+        tracemalloc.start()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        profiler.dump_stats(output_path + '.prof')
+        if memory:
+            snapshot = tracemalloc.take_snapshot()
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            with open(output_path + '.mem.txt', 'w') as f:
+                f.write(f"Peak traced memory: {peak} bytes\n")
+                for stat in snapshot.statistics('lineno')[:25]:
+                    f.write(f"{stat}\n")
+        with open(output_path + '.txt', 'w') as f:
+            pstats.Stats(output_path + '.prof', stream=f).sort_stats('cumulative').print_stats(40)
@@ -0,0 +1,253 @@
+import os
+import time
+from collections import deque, namedtuple
+from hash_engine import HashingEngine, _Done, hash_bytes, DEFAULT_ALGORITHM, BLOCK_DIGEST_MIN_SIZE
+from walker import walk
+
+# A scan is a stream of records in walk order: each FolderRecord is followed by its FileRecords
+FolderRecord = namedtuple('FolderRecord', 'path subdirs file_count')
+# `digest` is the hex digest of the task's primary algorithm; `extra_digests` maps any further algorithms to theirs;
+# `blocks` is (block size, concatenated block digests) for large files of baselines that support quick checks
+FileRecord = namedtuple('FileRecord', 'path name size digest ctime_ns mtime_ns extra_digests blocks',
+                        defaults=(None, None))
+
+class ScanCancelled(Exception):
+    """Raised by iter_records when its `cancel` event is set; the scan can simply be run again later."""
+
+def format_size(size):
+    """Format the file size in a human-readable format."""
+    original_size = size
+    for unit in ['B', 'KB', 'MB', 'GB', 'TB']:
+        if size < 1024:
+            return f"{size:.2f} {unit} ({original_size} B)"
+        size /= 1024
+
+def format_timestamp(timestamp_ns):
+    return time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(timestamp_ns // 1_000_000_000))
+
+def get_file_dates(file_path):
+    """Get the creation and modification dates of a file."""
+    file_stats = os.stat(file_path)
+    return format_timestamp(file_stats.st_ctime_ns), format_timestamp(file_stats.st_mtime_ns)
+
+def _file_record(file_path, st, pending_hash, source, cache, digest_cache, algorithms, with_blocks, metrics):
+    # Metadata is from the listing, before the read, so a file modified mid-read is rehashed next time
+    if metrics is None:
+        digests = pending_hash.result()
+    else:
+        with metrics.timer('hash_wait'):
+            digests = pending_hash.result()
+        metrics.count('files')
+        if source == 'hash':
+            metrics.file_hashed(file_path, st.st_size, pending_hash.seconds)
+        elif source == 'sample':
+            # Reads only a few blocks unless they differ, so it isn't counted as bytes hashed
+            metrics.count('files_sampled')
+            metrics.add_time('hash', pending_hash.seconds)
+    blocks = None
+    if with_blocks:
+        digests, blocks = digests[:-1], digests[-1]
+    # A digest found in the shared cache is new to the directory's own cache
+    if cache is not None and source in ('hash', 'shared'):
+        cache.store(st, digests[0])
+    if digest_cache is not None and source == 'hash':
+        digest_cache.store(st, algorithms, digests)
+    extra_digests = dict(zip(algorithms[1:], digests[1:])) or None
+    return FileRecord(file_path, st.name, st.st_size, digests[0], st.st_ctime_ns, st.st_mtime_ns, extra_digests, blocks)
+
+def _submit(engine, root, st, cache, digest_cache, quick_check, metrics):
+    file_path = os.path.join(root, st.name)
+    if st.link is not None:
+        # A symlink that isn't followed is verified by where it points, so retargeting it shows up as a change
+        digests = hash_bytes(os.fsencode(st.link), engine.algorithms)
+        return file_path, st, _Done(digests + (None,) if engine.with_blocks else digests), 'link'
+    if engine.throttle is not None:
+        engine.throttle.acquire_file()
+    if quick_check is not None:
+        sample = quick_check.sample(root, st.name, st)
+        return file_path, st, engine.submit(file_path, sample), 'hash' if sample is None else 'sample'
+    # Cached digests carry no block digests, so files that need them are always read
+    if engine.with_blocks and st.st_size >= BLOCK_DIGEST_MIN_SIZE:
+        return file_path, st, engine.submit(file_path), 'hash'
+    digests = None
+    source = 'cache'
+    if cache is not None:
+        digest = cache.lookup(st)
+        digests = (digest,) if digest is not None else None
+    # A paranoid check rehashes everything, so the shared cache mustn't answer for the directory's own
+    if digests is None and digest_cache is not None and not (cache is not None and cache.paranoid):
+        digests = digest_cache.lookup(st, engine.algorithms)
+        source = 'shared'
+    if digests is None:
+        return file_path, st, engine.submit(file_path), 'hash'
+    if metrics is not None:
+        metrics.count('files_skipped')
+    return file_path, st, _Done(digests + (None,) if engine.with_blocks else digests), source
+
+def iter_records(directory, workers=None, use_processes=False, cache=None, recursive=True,
+                 algorithms=(DEFAULT_ALGORITHM,), block_size=None, blocks=False, quick_check=None, metrics=None,
+                 cancel=None, throttle=None, follow_symlinks=False, walk_workers=None, digest_cache=None,
+                 path_filter=None):
+    """Walk `directory` and yield Folder/File records in sorted-walk order, hashing files concurrently."""
+    # A trailing separator would make the root's path differ from its subfolders' parent
+    directory = os.path.normpath(directory)
+    if len(algorithms) > 1 or quick_check is not None:
+        # The rescan cache holds primary digests only, and would skip the sampling quick checks do
+        cache = None
+    if quick_check is not None:
+        digest_cache = None
+    if cache is not None:
+        cache.begin_check()
+    try:
+        with HashingEngine(workers, use_processes, algorithms, block_size, blocks, metrics is not None,
+                           throttle) as engine:
+            window = engine.workers * 4
+            pending = deque()
+            in_flight = 0
+            walker = walk(directory, follow_symlinks, walk_workers, identity=cache is not None or digest_cache is not None,
+                          path_filter=path_filter)
+            if metrics is not None:
+                walker = _timed_walk(walker, metrics)
+            for root, dirs, files in walker:
+                if cancel is not None and cancel.is_set():
+                    raise ScanCancelled(directory)
+                # The walker lists each folder sorted, so records come out in sorted-walk order
+                subdirs = list(dirs)
+                if not recursive:
+                    dirs.clear()
+                # Folder records need no hashing; release them as soon as nothing is queued ahead
+                while pending and isinstance(pending[0], FolderRecord):
+                    yield pending.popleft()
+                pending.append(FolderRecord(root, subdirs, len(files)))
+                if metrics is not None:
+                    metrics.count('folders')
+                for st in files:
+                    pending.append(_submit(engine, root, st, cache, digest_cache, quick_check, metrics))
+                    in_flight += 1
+                    if metrics is not None:
+                        metrics.gauge('hash_window', in_flight)
+                    while in_flight >= window:
+                        item = pending.popleft()
+                        if isinstance(item, FolderRecord):
+                            yield item
+                        else:
+                            in_flight -= 1
+                            yield _file_record(*item, cache, digest_cache, engine.algorithms, blocks, metrics)
+            while pending:
+                item = pending.popleft()
+                if isinstance(item, FolderRecord):
+                    yield item
+                else:
+                    yield _file_record(*item, cache, digest_cache, engine.algorithms, blocks, metrics)
+    except BaseException:
+        if cache is not None:
+            cache.abort_check()
+        raise
+    finally:
+        if digest_cache is not None:
+            # Digests computed before a cancel or error are still right
+            digest_cache.flush()
+    if cache is not None:
+        cache.finish_check()
+
+def _timed_walk(walker, metrics):
+    """Pass walker results through, charging only the time spent listing directories to "walk"."""
+    while True:
+        start = time.perf_counter()
+        item = next(walker, None)
+        metrics.add_time('walk', time.perf_counter() - start)
+        if item is None:
+            return
+        yield item
+
+def _render_subdirectories(folder):
+    if folder.subdirs:
+        yield "Subdirectories:\n"
+        for subdir in folder.subdirs:
+            subdir_path = os.path.join(folder.path, subdir)
+            yield f"  Name: {subdir}\n  Path: {subdir_path}\n"
+    yield "\n"
+
+def render_text(records):
+    """Yield the human-readable baseline report for a record stream, chunk by chunk."""
+    folder = None
+    for record in records:
+        if isinstance(record, FolderRecord):
+            if folder is not None:
+                yield from _render_subdirectories(folder)
+            folder = record
+            yield (f"Folder: {record.path}\nNumber of subdirectories: {len(record.subdirs)}\n"
+                   f"Number of files: {record.file_count}\n")
+            yield "Files:\n"
+        else:
+            extra = ''.join(f"  Hash ({algorithm}): {digest}\n" for algorithm, digest in (record.extra_digests or {}).items())
+            yield (f"  Name: {record.name}\n  Path: {record.path}\n  Size: {format_size(record.size)}\n"
+                   f"  Hash: {record.digest}\n{extra}  Date Created: {format_timestamp(record.ctime_ns)}\n"
+                   f"  Date Modified: {format_timestamp(record.mtime_ns)}\n")
+    if folder is not None:
+        yield from _render_subdirectories(folder)
+
+def _parse_timestamp(text):
+    return int(time.mktime(time.strptime(text, '%Y-%m-%d %H:%M:%S'))) * 1_000_000_000
+
+def parse_text(lines):
+    """Yield records from the lines of a text baseline report, the inverse of render_text."""
+    folder = None
+    subdirs = []
+    files = []
+    section = None
+    name = path = size = digest = created = extra_digests = None
+    for line in lines:
+        line = line.rstrip('\r\n')
+        if line.startswith("Folder: "):
+            if folder is not None:
+                yield FolderRecord(folder, subdirs, len(files))
+                yield from files
+            folder = line[8:]
+            subdirs = []
+            files = []
+            section = None
+        elif line == "Files:":
+            section = 'files'
+        elif line == "Subdirectories:":
+            section = 'subdirs'
+        elif line.startswith("  Name: "):
+            if section == 'subdirs':
+                subdirs.append(line[8:])
+            else:
+                name = line[8:]
+                path = None
+                extra_digests = None
+        elif section != 'files':
+            continue
+        elif line.startswith("  Path: "):
+            path = line[8:]
+        elif line.startswith("  Size: "):
+            size = int(line[line.rindex('(') + 1:-3])
+        elif line.startswith("  Hash: "):
+            digest = line[8:]
+        elif line.startswith("  Hash ("):
+            algorithm, _, extra_digest = line[8:].partition("): ")
+            extra_digests = extra_digests or {}
+            extra_digests[algorithm] = extra_digest
+        elif line.startswith("  Date Created: "):
+            created = _parse_timestamp(line[16:])
+        elif line.startswith("  Date Modified: "):
+            files.append(FileRecord(path or os.path.join(folder, name), name, size, digest,
+                                    created, _parse_timestamp(line[17:]), extra_digests))
+    if folder is not None:
+        yield FolderRecord(folder, subdirs, len(files))
+        yield from files
+
+def generate_baseline(directory, workers=None, use_processes=False, cache=None):
+    """Walk `directory` and build the text baseline report."""
+    return ''.join(render_text(iter_records(directory, workers, use_processes, cache)))
+
+def save_report(report, output_path):
+    with open(output_path, 'w') as f:
+        f.write(report)
+
+def write_report(chunks, output_path):
+    """Stream report chunks (e.g. from render_text) to a file without joining them in memory."""
+    with open(output_path, 'w') as f:
+        f.writelines(chunks)
@@ -0,0 +1,222 @@
+import os
+import time
+import heapq
+import random
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from scanner import ScanCancelled
+
+MAX_CONCURRENT_CHECKS = 2
+MIN_RANDOM_SPACING = 60
+
+logger = logging.getLogger(__name__)
+
+class RecurringSchedule:
+    """Check times for one task: `regular_interval` checks per hour plus `random_checks` random ones."""
+
+    def __init__(self, regular_interval, random_checks, start=None):
+        self.interval = 3600 / regular_interval
+        self.random_checks = random_checks
+        self._rng = random.SystemRandom()
+        self._next_regular = time.time() if start is None else start
+        self._pending = []
+
+    def _extend(self):
+        start = self._next_regular
+        # Random checks stay at least a minute apart when the interval leaves room for that
+        spacing = min(MIN_RANDOM_SPACING, self.interval / (self.random_checks + 1))
+        selected = []
+        attempts = 0
+        while len(selected) < self.random_checks and attempts < 1000:
+            attempts += 1
+            candidate = start + self._rng.uniform(spacing, self.interval - spacing)
+            if all(abs(candidate - other) >= spacing for other in selected):
+                selected.append(candidate)
+        self._pending.extend([start] + sorted(selected))
+        self._next_regular = start + self.interval
+
+    def next_after(self, now):
+        """The first scheduled time not before `now`, consuming every time before it."""
+        while True:
+            while self._pending and self._pending[0] < now:
+                self._pending.pop(0)
+            if self._pending:
+                return self._pending[0]
+            self._extend()
+
+    def consume(self, due):
+        if self._pending and self._pending[0] == due:
+            self._pending.pop(0)
+
+def device_of(path):
+    """Device ID of the filesystem holding `path`; checks on the same device never overlap."""
+    return os.stat(path).st_dev
+
+class _Entry:
+    __slots__ = ('task', 'paused', 'running', 'cancelled', 'due', 'priority')
+
+    def __init__(self, task):
+        self.task = task
+        self.paused = False
+        self.running = False
+        self.cancelled = threading.Event()
+        self.due = None
+        self.priority = 0
+
+class MonitoringScheduler:
+    """One scheduler for the integrity checks of every monitored directory."""
+
+    def __init__(self, max_concurrent=MAX_CONCURRENT_CHECKS):
+        self.max_concurrent = max_concurrent
+        self.paused = False
+        self._entries = {}
+        self._queue = []  # heap of (due, sequence, directory); stale items are skipped on pop
+        self._sequence = 0
+        self._busy_devices = set()
+        self._running = 0
+        self._condition = threading.Condition()
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrent, thread_name_prefix="fim-check")
+        self._thread = None
+        self._stopping = False
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._dispatch, name="fim-scheduler", daemon=True)
+            self._thread.start()
+
+    def shutdown(self):
+        """Cancel running checks, wait for them to wind down and stop dispatching."""
+        with self._condition:
+            self._stopping = True
+            for entry in self._entries.values():
+                entry.cancelled.set()
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self._executor.shutdown(wait=True)
+
+    def add_task(self, task, priority=0):
+        with self._condition:
+            entry = self._entries[task.directory] = _Entry(task)
+            entry.priority = priority
+            self._enqueue(entry, task.schedule.next_after(time.time()))
+
+    def remove_task(self, directory):
+        with self._condition:
+            entry = self._entries.pop(directory, None)
+            if entry is not None:
+                entry.cancelled.set()
+
+    def run_now(self, directory, priority=-1):
+        """Queue an immediate extra check of one task, ahead of routine ones when `priority` is lower."""
+        with self._condition:
+            entry = self._entries.get(directory)
+            if entry is not None and not entry.paused:
+                entry.priority = min(entry.priority, priority)
+                self._enqueue(entry, time.time())
+
+    def pause(self, directory):
+        """Stop scheduling a task; a check in progress stops at its next safe point."""
+        with self._condition:
+            entry = self._entries.get(directory)
+            if entry is not None:
+                entry.paused = True
+                entry.due = None
+                entry.cancelled.set()
+
+    def resume(self, directory):
+        with self._condition:
+            entry = self._entries.get(directory)
+            if entry is not None and entry.paused:
+                entry.paused = False
+                if not entry.running:
+                    self._enqueue(entry, entry.task.schedule.next_after(time.time()))
+
+    def pause_all(self):
+        """Stop starting checks anywhere and ask running ones to stop; each is redone on resume_all()."""
+        with self._condition:
+            self.paused = True
+            for entry in self._entries.values():
+                if entry.running:
+                    entry.cancelled.set()
+
+    def resume_all(self):
+        with self._condition:
+            self.paused = False
+            self._condition.notify_all()
+
+    def status(self):
+        """(directory, next due time or None, running, paused) for every task."""
+        with self._condition:
+            return [(directory, entry.due, entry.running, entry.paused) for directory, entry in self._entries.items()]
+
+    def _enqueue(self, entry, due):
+        if entry.due is not None and entry.due <= due:
+            return
+        entry.due = due
+        self._sequence += 1
+        heapq.heappush(self._queue, (due, self._sequence, entry.task.directory))
+        self._condition.notify_all()
+
+    def _ready(self, now):
+        """Due, startable entries, best first."""
+        ready = []
+        for due, _, directory in self._queue:
+            entry = self._entries.get(directory)
+            if (due <= now and entry is not None and entry.due == due and not entry.running
+                    and entry.task.device not in self._busy_devices):
+                ready.append(entry)
+        ready.sort(key=lambda entry: (entry.priority, entry.due))
+        return ready
+
+    def _dispatch(self):
+        with self._condition:
+            while not self._stopping:
+                # Drop heap items that were superseded, removed or paused
+                while self._queue:
+                    due, _, directory = self._queue[0]
+                    entry = self._entries.get(directory)
+                    if entry is not None and entry.due == due:
+                        break
+                    heapq.heappop(self._queue)
+                now = time.time()
+                if not self.paused:
+                    for entry in self._ready(now):
+                        if self._running >= self.max_concurrent:
+                            break
+                        if entry.task.device in self._busy_devices:
+                            continue
+                        self._start(entry)
+                # Blocked checks are woken by the check that frees their device or slot
+                upcoming = [due for due, _, _ in self._queue if due > now]
+                self._condition.wait(min(upcoming) - now if upcoming and not self.paused else None)
+
+    def _start(self, entry):
+        entry.task.schedule.consume(entry.due)
+        entry.due = None
+        entry.running = True
+        entry.cancelled.clear()
+        self._busy_devices.add(entry.task.device)
+        self._running += 1
+        self._executor.submit(self._run, entry)
+
+    def _run(self, entry):
+        cancelled = False
+        try:
+            entry.task.run_check(entry.cancelled)
+        except ScanCancelled:
+            cancelled = True
+        except Exception:
+            logger.exception("Integrity check of %s failed", entry.task.directory)
+        with self._condition:
+            entry.running = False
+            self._busy_devices.discard(entry.task.device)
+            self._running -= 1
+            entry.priority = 0
+            if self._entries.get(entry.task.directory) is entry and not entry.paused and not self._stopping:
+                # A check cut short by pause_all() is redone as soon as checks resume
+                due = time.time() if cancelled else entry.task.schedule.next_after(time.time())
+                self._enqueue(entry, due)
+            self._condition.notify_all()
@@ -0,0 +1,89 @@
+"""Lists and sorts that move what exceeds `limit` items to temporary files."""
+import heapq
+import pickle
+import tempfile
+from operator import itemgetter
+
+SPILL_THRESHOLD = 1_000_000  # items held in memory before spilling to disk
+CHUNK_ITEMS = 1000  # items per pickle in a spilled file; a merge holds one chunk per run
+
+def _write_chunks(f, items):
+    for start in range(0, len(items), CHUNK_ITEMS):
+        pickle.dump(items[start:start + CHUNK_ITEMS], f, pickle.HIGHEST_PROTOCOL)
+
+def _read_chunks(f):
+    while True:
+        try:
+            yield from pickle.load(f)
+        except EOFError:
+            return
+
+class SpillList:
+    """An append-only list that moves its items to a temporary file once it holds more than `limit`."""
+
+    def __init__(self, limit=SPILL_THRESHOLD):
+        self.limit = limit
+        self.items = []
+        self.file = None
+        self.spilled = 0
+
+    def append(self, item):
+        self.items.append(item)
+        if len(self.items) > self.limit:
+            self._spill()
+
+    def extend(self, items):
+        for item in items:
+            self.append(item)
+
+    def _spill(self):
+        if self.file is None:
+            self.file = tempfile.TemporaryFile(prefix='fim-spill-')
+        self.file.seek(0, 2)
+        _write_chunks(self.file, self.items)
+        self.spilled += len(self.items)
+        self.items = []
+
+    def __len__(self):
+        return self.spilled + len(self.items)
+
+    def __bool__(self):
+        return len(self) > 0
+
+    def __iter__(self):
+        if self.file is not None:
+            self.file.seek(0)
+            yield from _read_chunks(self.file)
+        yield from self.items
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+def external_sort(items, key, limit=SPILL_THRESHOLD):
+    """Yield `items` stably sorted by `key`, holding at most `limit` of them in memory."""
+    runs = []
+    batch = []
+    try:
+        for item in items:
+            batch.append((key(item), len(runs), len(batch), item))
+            if len(batch) >= limit:
+                batch.sort(key=itemgetter(0, 1, 2))
+                run = tempfile.TemporaryFile(prefix='fim-sort-')
+                _write_chunks(run, batch)
+                run.seek(0)
+                runs.append(run)
+                batch = []
+        batch.sort(key=itemgetter(0, 1, 2))
+        if not runs:
+            for entry in batch:
+                yield entry[3]
+            return
+        # (key, run, position) ties break in input order, so the merge is stable too
+        streams = [_read_chunks(run) for run in runs] + [iter(batch)]
+        for entry in heapq.merge(*streams, key=itemgetter(0, 1, 2)):
+            yield entry[3]
+    finally:
+        for run in runs:
+            run.close()
@@ -0,0 +1,54 @@
+import os
+import pytest
+from scanner import iter_records, FileRecord
+from baseline_store import save_baseline, BaselineStore
+
+def _tree(root):
+    for folder in ('a', 'b'):
+        os.makedirs(os.path.join(root, folder))
+        for i in range(3):
+            with open(os.path.join(root, folder, f'f{i}.txt'), 'w') as f:
+                f.write(f'{folder} {i}')
+
+def _files(store_path):
+    with BaselineStore(store_path) as store:
+        return sorted(record.path for record in store.iter_records() if isinstance(record, FileRecord))
+
+def test_store_keeps_its_old_contents_until_a_write_completes(tmp_path):
+    root = str(tmp_path / 'tree')
+    _tree(root)
+    store_path = str(tmp_path / 'baseline.db')
+    save_baseline(iter_records(root, 1), store_path, root)
+    before = _files(store_path)
+    seen = []
+
+    def records():
+        for record in iter_records(root, 1):
+            # Halfway through, another reader still finds the whole previous baseline
+            seen.append(_files(store_path))
+            yield record
+
+    with BaselineStore(store_path) as store:
+        store.write(records(), root)
+        assert store.root().path == root
+    assert all(files == before for files in seen) and _files(store_path) == before
+    assert not os.path.exists(store_path + '.tmp')
+
+def test_failed_write_leaves_the_store_as_it_was(tmp_path):
+    root = str(tmp_path / 'tree')
+    _tree(root)
+    store_path = str(tmp_path / 'baseline.db')
+    save_baseline(iter_records(root, 1), store_path, root)
+    before = _files(store_path)
+
+    def failing():
+        yield from list(iter_records(root, 1))[:3]
+        raise OSError("disk went away")
+
+    with BaselineStore(store_path) as store:
+        with pytest.raises(OSError):
+            store.write(failing(), root)
+        # The store stays usable after the failure
+        assert store.root().path == root
+    assert _files(store_path) == before
+    assert not os.path.exists(store_path + '.tmp')
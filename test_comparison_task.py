@@ -0,0 +1,35 @@
+import os
+import pytest
+import comparison_task
+from comparison_task import ComparisonTask
+from scanner import iter_records
+from baseline_store import save_baseline
+from diff_engine import MODIFIED
+
+def _task(tmp_path):
+    tree = tmp_path / 'tree'
+    (tree / 'sub').mkdir(parents=True)
+    (tree / 'sub' / 'f.txt').write_text('original')
+    baseline_file = str(tmp_path / 'baseline.db')
+    save_baseline(iter_records(str(tree), 1), baseline_file, str(tree))
+    task = ComparisonTask(baseline_file, str(tree), str(tmp_path / 'report.log'), 3600, 0, workers=1)
+    task.prepare()
+    return task, tree, str(tmp_path / 'baseline_latest.db')
+
+def test_check_reports_a_modified_file(tmp_path):
+    task, tree, latest_file = _task(tmp_path)
+    assert task.check().unchanged
+    (tree / 'sub' / 'f.txt').write_text('tampered')
+    assert [path for path, _ in task.check().files[MODIFIED]] == [str(tree / 'sub' / 'f.txt')]
+    assert os.path.exists(latest_file)
+
+def test_failed_check_drops_the_latest_store(tmp_path, monkeypatch):
+    task, tree, latest_file = _task(tmp_path)
+
+    def fail(*args):
+        raise OSError("disk full")
+    monkeypatch.setattr(comparison_task, 'diff_stores', fail)
+    with pytest.raises(OSError):
+        task.check()
+    # A store left half-written would be diffed next time as if everything had been deleted
+    assert not os.path.exists(latest_file)
@@ -0,0 +1,106 @@
+import os
+import random
+import pytest
+from scanner import iter_records, FolderRecord
+from baseline_store import save_baseline, BaselineStore
+from diff_engine import (diff_records, diff_stores, sort_records, render_diff_report,
+                         ADDED, DELETED, MODIFIED, METADATA_CHANGED, MOVED)
+
+def _write(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        f.write(content)
+
+def _tree(root):
+    for name in ('kept', 'modified', 'touched', 'renamed', 'deleted'):
+        _write(os.path.join(root, 'docs', f'{name}.txt'), f'{name} content')
+    _write(os.path.join(root, 'old_dir', 'inside.txt'), 'inside content')
+    _write(os.path.join(root, 'deep', 'er', 'leaf.txt'), 'leaf content')
+
+def _change(root):
+    _write(os.path.join(root, 'docs', 'modified.txt'), 'new content')
+    stat = os.stat(os.path.join(root, 'docs', 'touched.txt'))
+    os.utime(os.path.join(root, 'docs', 'touched.txt'), ns=(stat.st_atime_ns, stat.st_mtime_ns - 10 ** 10))
+    os.rename(os.path.join(root, 'docs', 'renamed.txt'), os.path.join(root, 'deep', 'moved.txt'))
+    os.remove(os.path.join(root, 'docs', 'deleted.txt'))
+    os.remove(os.path.join(root, 'old_dir', 'inside.txt'))
+    os.rmdir(os.path.join(root, 'old_dir'))
+    _write(os.path.join(root, 'new_dir', 'added.txt'), 'added content')
+
+def _summary(result):
+    summary = {kind: sorted(path for path, _ in entries) for kind, entries in result.files.items()}
+    summary.update((f'{kind} folders', sorted(folders)) for kind, folders in result.folders.items())
+    return summary
+
+def _expected(root):
+    path = lambda *parts: os.path.join(root, *parts)
+    return {
+        ADDED: [path('new_dir', 'added.txt')],
+        DELETED: [path('docs', 'deleted.txt'), path('old_dir', 'inside.txt')],
+        MODIFIED: [path('docs', 'modified.txt')],
+        METADATA_CHANGED: [path('docs', 'touched.txt')],
+        MOVED: [f"{path('docs', 'renamed.txt')} -> {path('deep', 'moved.txt')}"],
+        f'{ADDED} folders': [path('new_dir')],
+        f'{DELETED} folders': [path('old_dir')],
+    }
+
+@pytest.fixture
+def scans(tmp_path):
+    root = str(tmp_path / 'tree')
+    _tree(root)
+    original = list(iter_records(root, 2))
+    _change(root)
+    return root, original, list(iter_records(root, 2))
+
+def test_diff_records_classifies_every_change(scans):
+    root, original, current = scans
+    result = diff_records(original, current)
+    assert _summary(result) == _expected(root)
+    assert result.matched_files == 2 and not result.unchanged
+
+def test_identical_scans_are_unchanged(scans):
+    _, original, _ = scans
+    result = diff_records(original, original)
+    assert result.unchanged
+    assert result.matched_files == 7 and result.matched_folders == 5
+
+@pytest.mark.parametrize('spill_threshold', [1, 2, 1000])
+def test_spilled_diff_matches_the_in_memory_one(scans, spill_threshold):
+    root, original, current = scans
+    in_memory = diff_records(original, current)
+    spilled = diff_records(original, current, spill_threshold)
+    assert _summary(spilled) == _summary(in_memory) == _expected(root)
+    assert render_diff_report(spilled).split('\n', 1)[1] == render_diff_report(in_memory).split('\n', 1)[1]
+
+def test_same_digest_moved_twice_pairs_each_move(tmp_path):
+    root = str(tmp_path / 'tree')
+    _write(os.path.join(root, 'a', 'one.txt'), 'same')
+    _write(os.path.join(root, 'a', 'two.txt'), 'same')
+    original = list(iter_records(root, 1))
+    os.rename(os.path.join(root, 'a'), os.path.join(root, 'b'))
+    for spill_threshold in (1, 1000):
+        result = diff_records(original, list(iter_records(root, 1)), spill_threshold)
+        assert len(result.files[MOVED]) == 2 and not result.files[ADDED] and not result.files[DELETED]
+
+def test_unsorted_folders_are_sorted_first(scans):
+    root, original, current = scans
+    # Each folder keeps its files behind it, but the folders come in any order after the root
+    groups = []
+    for record in current:
+        if isinstance(record, FolderRecord):
+            groups.append([])
+        groups[-1].append(record)
+    rest = groups[1:]
+    random.Random(1).shuffle(rest)
+    shuffled = [record for group in [groups[0]] + rest for record in group]
+    assert shuffled != current
+    assert list(sort_records(shuffled, 3)) == current
+
+def test_diff_stores_matches_diff_records(scans, tmp_path):
+    root, original, current = scans
+    save_baseline(original, str(tmp_path / 'original.db'), root)
+    save_baseline(current, str(tmp_path / 'current.db'), root)
+    for spill_threshold in (1, 1000):
+        with BaselineStore(str(tmp_path / 'original.db')) as old, BaselineStore(str(tmp_path / 'current.db')) as new:
+            result = diff_stores(old, new, spill_threshold)
+        assert _summary(result) == _expected(root)
@@ -0,0 +1,93 @@
+import os
+import logging
+from event_pipeline import EventPipeline, collapse_paths, SUBTREE_DIRTY
+
+ROOT = os.path.join(os.sep, 'r')
+
+def _path(*parts):
+    return os.path.join(ROOT, *parts)
+
+class _Collect(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+def _logger(name):
+    logger = logging.getLogger(f'test_event_pipeline.{name}')
+    logger.handlers = [_Collect()]
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    return logger, logger.handlers[0].messages
+
+def test_collapse_paths_truncates_to_the_deepest_level_that_fits():
+    paths = {_path('a', 'b', 'c'), _path('a', 'b', 'd'), _path('a', 'e'), _path('f', 'g')}
+    assert collapse_paths(paths, ROOT, 4) == paths
+    assert collapse_paths(paths, ROOT, 3) == {_path('a', 'b'), _path('a', 'e'), _path('f', 'g')}
+    assert collapse_paths(paths, ROOT, 2) == {_path('a'), _path('f')}
+    # Only the root would do, which is a full sweep rather than a subtree
+    assert collapse_paths(paths, ROOT, 1) is None
+    assert collapse_paths(paths | {ROOT}, ROOT, 4) is None
+    assert collapse_paths(paths, None, 2) is None
+
+def test_events_are_written_in_order_and_modifies_coalesced():
+    logger, messages = _logger('coalesce')
+    pipeline = EventPipeline(logger, debounce=60)
+    pipeline.start()
+    for _ in range(5):
+        pipeline.submit("File Modified", _path('log.txt'))
+    pipeline.submit("File Created", _path('new.txt'))
+    pipeline.submit("File Moved", _path('a.txt'), _path('b.txt'))
+    pipeline.stop()
+    assert messages == [f"File Created - {_path('new.txt')}", f"File Moved - {_path('a.txt')} -> {_path('b.txt')}",
+                        f"File Modified - {_path('log.txt')}"]
+    stats = pipeline.stats()
+    assert (stats['submitted'], stats['written'], stats['coalesced'], stats['dropped']) == (7, 3, 4, 0)
+
+def test_storm_collapses_into_dirty_subtrees_once_it_has_passed():
+    logger, messages = _logger('storm')
+    released = []
+    pipeline = EventPipeline(logger, max_queue=10, debounce=0, root=ROOT, on_overflow=released.append)
+    # The writer isn't running yet, so the queue fills to its high watermark of 8
+    queued = [pipeline.submit("File Created", _path('storm', 'x', f'f{i}')) for i in range(20)]
+    pipeline.submit("Directory Deleted", _path('other', 'gone'))
+    assert queued == [True] * 8 + [False] * 12
+    assert pipeline.overflowing and pipeline.collapsed == 13
+    pipeline.start()
+    pipeline.stop()
+    assert released == [[_path('other', 'gone'), _path('storm', 'x')]]
+    assert messages[-2:] == [f"{SUBTREE_DIRTY} - {_path('other', 'gone')}", f"{SUBTREE_DIRTY} - {_path('storm', 'x')}"]
+    assert len(messages) == 10
+    stats = pipeline.stats()
+    assert not stats['overflowing'] and stats['overflows'] == 1 and stats['dropped'] == 0
+
+def test_markers_stay_bounded_during_a_storm(monkeypatch):
+    import event_pipeline
+    monkeypatch.setattr(event_pipeline, 'MAX_MARKERS', 16)
+    logger, _ = _logger('bounded')
+    pipeline = EventPipeline(logger, max_queue=1, root=ROOT)
+    for top in range(4):
+        for i in range(50):
+            pipeline.submit("File Modified", _path(f't{top}', f'd{i}', 'f'))
+    assert len(pipeline._markers) <= 16
+    # Every event is still covered by a marker at or above its folder
+    for top in range(4):
+        for i in range(50):
+            folder = _path(f't{top}', f'd{i}')
+            assert folder in pipeline._markers or os.path.dirname(folder) in pipeline._markers
+    pipeline.submit("File Modified", _path('f'))
+    # A file straight in the root can only be covered by the root itself
+    assert ROOT in pipeline._markers
+
+def test_event_racing_for_the_last_queue_slot_is_collapsed_not_dropped():
+    logger, _ = _logger('race')
+    pipeline = EventPipeline(logger, max_queue=2, root=ROOT)
+    # As if other threads filled the queue between the watermark check and the put
+    pipeline.high_watermark = 10
+    queued = [pipeline.submit("File Created", _path('d', f'f{i}')) for i in range(3)]
+    assert queued == [True, True, False]
+    stats = pipeline.stats()
+    assert (stats['submitted'], stats['collapsed'], stats['dropped']) == (2, 1, 0)
+    assert pipeline._markers == {_path('d')}
@@ -0,0 +1,96 @@
+import os
+import json
+import zlib
+import socket
+import struct
+import threading
+import pytest
+import fleet
+from scanner import iter_records, FileRecord
+from baseline_store import save_baseline
+from diff_engine import DiffResult, MODIFIED, ADDED
+from fleet import FleetClient, FleetAgent, ProtocolError, receive_message
+from fleet_collector import CollectorServer, FleetStore
+
+TOKEN = 'secret'
+
+@pytest.fixture
+def collector(tmp_path):
+    server = CollectorServer(('127.0.0.1', 0), str(tmp_path / 'fleet.db'), token=TOKEN, timeout=5)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+def _client(server, token=TOKEN):
+    return FleetClient(server.server_address, 'agent', token)
+
+def _changes(server):
+    with FleetStore(server.store_path) as store:
+        return store.conn.execute("SELECT kind, path, digest FROM changes ORDER BY id").fetchall()
+
+def _result(count, kind=MODIFIED):
+    result = DiffResult()
+    for i in range(count):
+        result.files[kind].append((f'/data/{i:05}/{os.urandom(8).hex()}.txt', os.urandom(32).hex()))
+    return result
+
+def test_oversized_frame_is_refused_before_it_is_read():
+    left, right = socket.socketpair()
+    with left, right:
+        left.sendall(struct.pack('>I', fleet.MAX_FRAME + 1))
+        with pytest.raises(ProtocolError):
+            receive_message(right)
+        # A small frame that inflates past the limit is refused too
+        payload = zlib.compress(json.dumps({'type': 'x', 'padding': ' ' * 10000}).encode())
+        left.sendall(struct.pack('>I', len(payload)) + payload)
+        with pytest.raises(ProtocolError):
+            receive_message(right, max_size=1000)
+
+def test_wrong_token_is_refused(collector):
+    with pytest.raises(ProtocolError):
+        _client(collector, 'wrong')
+
+def test_baseline_sync_sends_only_changed_folders(collector, tmp_path):
+    root = tmp_path / 'tree'
+    for folder in ('a', 'b'):
+        (root / folder).mkdir(parents=True)
+        (root / folder / 'f.txt').write_text(folder)
+    baseline = str(tmp_path / 'baseline.db')
+    save_baseline(iter_records(str(root), 1), baseline, str(root))
+    with _client(collector) as client:
+        assert client.sync_baseline(str(root), baseline) == {'folders_sent': 3, 'files_sent': 2, 'folders_deleted': 0}
+        digest = next(record.digest for record in iter_records(str(root / 'a'), 1) if isinstance(record, FileRecord))
+        assert client.hosts_with_digest(digest) == [['agent', str(root), str(root / 'a' / 'f.txt'), 1]]
+    os.remove(baseline)
+    (root / 'a' / 'f.txt').write_text('changed')
+    (root / 'b' / 'f.txt').unlink()
+    (root / 'b').rmdir()
+    save_baseline(iter_records(str(root), 1), baseline, str(root))
+    with _client(collector) as client:
+        # The root holds no files, so only a is sent again
+        assert client.sync_baseline(str(root), baseline) == {'folders_sent': 1, 'files_sent': 1, 'folders_deleted': 1}
+        assert [host[0] for host in client.hosts()] == ['agent']
+
+def test_changes_larger_than_a_frame_go_in_batches(collector, monkeypatch):
+    monkeypatch.setattr(fleet, 'MAX_FRAME', 16 << 10)
+    monkeypatch.setattr(fleet, 'BATCH_FILES', 100)
+    result = _result(1000)
+    with _client(collector) as client:
+        assert client.send_changes('/data', result, checked=1.0) == 1000
+        # Sending the same check again, as a retry after a dropped connection does, adds nothing twice
+        assert client.send_changes('/data', result, checked=1.0) == 1000
+        assert client.send_changes('/data', DiffResult(), checked=2.0) == 0
+    expected = [[MODIFIED, path, digest] for path, digest in result.files[MODIFIED]]
+    assert [list(row) for row in _changes(collector)] == expected
+
+def test_agent_drops_what_the_collector_refuses(collector, monkeypatch):
+    monkeypatch.setattr(fleet, 'MAX_FRAME', 16 << 10)
+    refused = DiffResult()
+    refused.files[ADDED].append(('/data/' + os.urandom(32 << 10).hex(), None))
+    agent = FleetAgent(collector.server_address, 'agent', TOKEN)
+    agent.report('/data', refused)
+    agent.report('/data', _result(3))
+    agent.stop()
+    assert len(_changes(collector)) == 3
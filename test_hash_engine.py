@@ -0,0 +1,62 @@
+import hashlib
+import hash_engine
+from hash_engine import HashingEngine, hash_file, hash_sampled, BLOCK_DIGEST_MIN_SIZE, BLOCK_DIGEST_SIZE
+
+def _files(tmp_path, count):
+    paths = []
+    for i in range(count):
+        path = tmp_path / f'file{i:03}.bin'
+        path.write_bytes(f'content {i}\n'.encode() * (i * 37 + 1))
+        paths.append(str(path))
+    return paths
+
+def _expected(path, algorithm='sha256'):
+    with open(path, 'rb') as f:
+        return hashlib.new(algorithm, f.read()).hexdigest()
+
+def test_parallel_results_come_back_in_submission_order(tmp_path):
+    paths = _files(tmp_path, 50)
+    with HashingEngine(workers=8) as engine:
+        digests = list(engine.imap(paths, window=4))
+    assert digests == [(_expected(path),) for path in paths]
+
+def test_single_worker_matches_the_pool(tmp_path):
+    paths = _files(tmp_path, 10)
+    with HashingEngine(workers=1) as single, HashingEngine(workers=4) as pool:
+        assert list(single.imap(paths)) == list(pool.imap(paths))
+
+def test_every_algorithm_in_one_pass(tmp_path):
+    path, = _files(tmp_path, 1)
+    assert hash_file(path, ('sha256', 'md5', 'sha1')) == (_expected(path), _expected(path, 'md5'),
+                                                          _expected(path, 'sha1'))
+
+def test_small_files_get_no_block_digests(tmp_path):
+    path, = _files(tmp_path, 1)
+    assert hash_file(path, with_blocks=True) == (_expected(path), None)
+
+def test_block_digests_cover_blocks_larger_than_reads(tmp_path, monkeypatch):
+    # Four blocks at most, so a file just over 16 MiB gets 8 MiB blocks, read in 1 MiB chunks
+    monkeypatch.setattr(hash_engine, 'MAX_BLOCK_DIGESTS', 4)
+    data = bytes(range(256)) * ((BLOCK_DIGEST_MIN_SIZE + 12345) // 256)
+    path = tmp_path / 'large.bin'
+    path.write_bytes(data)
+    digest, (block_size, block_digests) = hash_file(str(path), with_blocks=True)
+    assert digest == hashlib.sha256(data).hexdigest()
+    assert block_size == 8 << 20
+    expected = [hashlib.blake2b(data[start:start + block_size], digest_size=BLOCK_DIGEST_SIZE).digest()
+                for start in range(0, len(data), block_size)]
+    assert block_digests == b''.join(expected)
+
+def test_quick_check_samples_blocks_and_falls_back_to_a_full_hash(tmp_path, monkeypatch):
+    monkeypatch.setattr(hash_engine, 'MAX_BLOCK_DIGESTS', 4)
+    path = tmp_path / 'large.bin'
+    path.write_bytes(b'\1' * (BLOCK_DIGEST_MIN_SIZE + 1))
+    digest, (block_size, block_digests) = hash_file(str(path), with_blocks=True)
+    blocks = [(index, block_digests[index * BLOCK_DIGEST_SIZE:(index + 1) * BLOCK_DIGEST_SIZE])
+              for index in range(len(block_digests) // BLOCK_DIGEST_SIZE)]
+    # Matching samples confirm the baseline digest without reading the rest
+    assert hash_sampled(str(path), ('sha256',), None, ('baseline digest', block_size, blocks[1:2])) == \
+        ('baseline digest',)
+    # A stale block digest makes the quick check hash the file in full
+    stale = [(1, b'\0' * BLOCK_DIGEST_SIZE)]
+    assert hash_sampled(str(path), ('sha256',), None, ('baseline digest', block_size, stale)) == (digest,)
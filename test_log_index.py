@@ -0,0 +1,52 @@
+import os
+import log_index
+from log_index import LogIndex
+
+def _write(path, text, mode='w'):
+    with open(path, mode, newline='') as f:
+        f.write(text)
+
+def test_lines_are_read_by_row(tmp_path):
+    path = str(tmp_path / 'log.txt')
+    _write(path, 'first\r\nsecond\n\nlast\n')
+    with LogIndex(path) as index:
+        # A newline at the very end starts no line
+        assert len(index) == 4
+        assert index.lines(0, 10) == ['first', 'second', '', 'last']
+        assert index.lines(2, 1) == ['']
+
+def test_refresh_picks_up_appends_and_starts_over_after_rotation(tmp_path):
+    path = str(tmp_path / 'log.txt')
+    _write(path, 'one\ntwo\n')
+    with LogIndex(path) as index:
+        _write(path, 'three\nfou', 'a')
+        assert not index.refresh()
+        assert index.lines(0, 10) == ['one', 'two', 'three', 'fou']
+        _write(path, 'r\n', 'a')
+        index.refresh()
+        assert index.lines(3, 1) == ['four']
+        os.replace(path, path + '.1')
+        _write(path, 'rotated\n')
+        assert index.refresh()
+        assert index.lines(0, 10) == ['rotated']
+
+def test_a_limited_index_catches_up_a_step_at_a_time(tmp_path):
+    path = str(tmp_path / 'log.txt')
+    _write(path, ''.join(f'line {i}\n' for i in range(100)))
+    with LogIndex(path, limit=64) as index:
+        assert not index.caught_up and 0 < len(index) < 100
+        while not index.caught_up:
+            index.refresh(limit=64)
+        assert len(index) == 100 and index.line(99) == 'line 99'
+
+def test_find_searches_across_chunks_both_ways(tmp_path, monkeypatch):
+    monkeypatch.setattr(log_index, 'INDEX_CHUNK', 16)
+    path = str(tmp_path / 'log.txt')
+    _write(path, ''.join(f'entry {i}: {"Needle" if i in (3, 40) else "hay"}\n' for i in range(50)))
+    with LogIndex(path) as index:
+        assert index.find('needle') == 3
+        assert index.find('needle', row=4) == 40
+        assert index.find('needle', case_sensitive=True) is None
+        assert index.find('Needle', row=40, backwards=True, case_sensitive=True) == 3
+        assert index.find('needle', row=len(index), backwards=True) == 40
+        assert index.find('missing') is None
@@ -0,0 +1,59 @@
+import os
+import gzip
+import time
+import log_rotation
+from log_rotation import LogRotator, RotationPolicy, segments, read_lines, prune, extract_segment
+
+def _write(path, text):
+    with open(path, 'a') as f:
+        f.write(text)
+
+def _rotator(path, monkeypatch, **policy):
+    # Compress in the calling thread so each rotation is finished when rotate() returns
+    monkeypatch.setattr(log_rotation, '_compress_in_background', log_rotation._compress)
+    limits = dict(max_bytes=10, max_age=3600, keep=5, retention=3600)
+    limits.update(policy)
+    return LogRotator(path, RotationPolicy(**limits))
+
+def test_rotation_is_due_by_size_and_age(tmp_path, monkeypatch):
+    rotator = _rotator(str(tmp_path / 'log.txt'), monkeypatch)
+    assert not rotator.due(0) and not rotator.due(9) and rotator.due(10)
+    rotator.started -= 3600
+    assert rotator.due(1)
+
+def test_rotated_segments_are_compressed_and_read_back_in_order(tmp_path, monkeypatch):
+    path = str(tmp_path / 'log.txt')
+    rotator = _rotator(path, monkeypatch)
+    for i in range(3):
+        _write(path, f'line {i}\n')
+        assert rotator.rotate()
+    _write(path, 'live\n')
+    archived = segments(path)
+    # All three fell in the same second, so the later ones are numbered
+    assert len(archived) == 3 and all(segment.endswith('.gz') for segment in archived)
+    assert list(read_lines(path)) == ['line 0\n', 'line 1\n', 'line 2\n', 'live\n']
+    assert list(read_lines(path, include_archived=False)) == ['live\n']
+    copy, temporary = extract_segment(archived[0])
+    with open(copy) as f:
+        assert temporary and f.read() == 'line 0\n'
+    os.remove(copy)
+
+def test_rotating_a_missing_log_does_nothing(tmp_path, monkeypatch):
+    assert not _rotator(str(tmp_path / 'log.txt'), monkeypatch).rotate()
+
+def test_prune_keeps_the_newest_segments_within_retention(tmp_path):
+    path = str(tmp_path / 'log.txt')
+    now = time.time()
+    for age in (0, 60, 120, 7200):
+        stamp = time.strftime(log_rotation.STAMP_FORMAT, time.localtime(now - age))
+        with gzip.open(f'{path}.{stamp}.gz', 'wt') as f:
+            f.write(f'{age}\n')
+    prune(path, RotationPolicy(max_bytes=10, max_age=3600, keep=2, retention=3600))
+    assert list(read_lines(path)) == ['60\n', '0\n']
+
+def test_segments_left_uncompressed_by_a_crash_are_compressed_on_start(tmp_path, monkeypatch):
+    path = str(tmp_path / 'log.txt')
+    _write(f'{path}.20240501-020000', 'left behind\n')
+    _rotator(path, monkeypatch, retention=float('inf'))
+    assert segments(path) == [f'{path}.20240501-020000.gz']
+    assert list(read_lines(path)) == ['left behind\n']
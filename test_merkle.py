@@ -0,0 +1,89 @@
+import os
+from scanner import iter_records, FolderRecord
+from baseline_store import save_baseline, BaselineStore
+from diff_engine import diff_stores, MODIFIED
+from merkle import folder_digests, compute_folder_digest
+
+def _write(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        f.write(content)
+
+def _baseline(directory, output_path):
+    save_baseline(iter_records(directory, 1), output_path, directory)
+
+def test_root_with_trailing_separator_covers_subfolders(tmp_path):
+    tree = tmp_path / 'tree'
+    _write(str(tree / 'a' / 'b' / 'f.txt'), 'original')
+    _write(str(tree / 'g.txt'), 'top')
+    root = str(tree) + os.sep
+    _baseline(root, str(tmp_path / 'original.db'))
+    _write(str(tree / 'a' / 'b' / 'f.txt'), 'tampered')
+    _baseline(root, str(tmp_path / 'current.db'))
+
+    with BaselineStore(str(tmp_path / 'original.db')) as original, \
+            BaselineStore(str(tmp_path / 'current.db')) as current:
+        result = diff_stores(original, current)
+    assert not result.unchanged
+    assert [path for path, _ in result.files[MODIFIED]] == [str(tree / 'a' / 'b' / 'f.txt')]
+
+def test_builder_nests_subfolders_under_root_with_trailing_separator():
+    root = os.sep + 'data' + os.sep
+    records = [FolderRecord(root, ['a'], 0), FolderRecord(os.path.join(root, 'a'), [], 0)]
+    digests = list(folder_digests(records))
+    # The subfolder closes first, then the root, which counts it
+    assert [digest.path for digest in digests] == [os.path.join(root, 'a'), root]
+    assert digests[-1].tree_folders == 2
+
+def _tree(root):
+    for folder in ('a', 'b'):
+        for i in range(3):
+            _write(os.path.join(root, folder, 'deep', f'f{i}.txt'), f'{folder} {i}')
+
+def test_a_change_alters_only_the_digests_above_it(tmp_path):
+    root = str(tmp_path / 'tree')
+    _tree(root)
+    _baseline(root, str(tmp_path / 'original.db'))
+    _write(os.path.join(root, 'a', 'deep', 'f1.txt'), 'tampered')
+    _baseline(root, str(tmp_path / 'current.db'))
+
+    with BaselineStore(str(tmp_path / 'original.db')) as original, \
+            BaselineStore(str(tmp_path / 'current.db')) as current:
+        for folder in ('', 'a', os.path.join('a', 'deep')):
+            path = os.path.join(root, folder) if folder else root
+            assert original.folder_row(path).digest != current.folder_row(path).digest
+        for folder in ('b', os.path.join('b', 'deep')):
+            path = os.path.join(root, folder)
+            assert original.folder_row(path).digest == current.folder_row(path).digest
+
+def test_diff_reads_only_folders_whose_digest_changed(tmp_path, monkeypatch):
+    root = str(tmp_path / 'tree')
+    _tree(root)
+    _baseline(root, str(tmp_path / 'original.db'))
+    _baseline(root, str(tmp_path / 'same.db'))
+    _write(os.path.join(root, 'a', 'deep', 'f1.txt'), 'tampered')
+    _baseline(root, str(tmp_path / 'current.db'))
+    read = []
+    folder_files = BaselineStore.folder_files
+    monkeypatch.setattr(BaselineStore, 'folder_files',
+                        lambda store, folder_id, path: read.append(path) or folder_files(store, folder_id, path))
+
+    with BaselineStore(str(tmp_path / 'original.db')) as original, BaselineStore(str(tmp_path / 'same.db')) as same:
+        result = diff_stores(original, same)
+    assert result.unchanged and result.matched_files == 6 and not read
+
+    with BaselineStore(str(tmp_path / 'original.db')) as original, \
+            BaselineStore(str(tmp_path / 'current.db')) as current:
+        result = diff_stores(original, current)
+    assert [path for path, _ in result.files[MODIFIED]] == [os.path.join(root, 'a', 'deep', 'f1.txt')]
+    assert result.matched_files == 5
+    # Both sides of the root, a and a/deep; never b
+    assert sorted(set(read)) == sorted([root, os.path.join(root, 'a'), os.path.join(root, 'a', 'deep')])
+
+def test_folder_digest_does_not_depend_on_entry_order(tmp_path):
+    root = str(tmp_path / 'tree')
+    _tree(root)
+    files = [record for record in iter_records(os.path.join(root, 'a', 'deep'), 1) if not isinstance(record, FolderRecord)]
+    children = [('x', b'1' * 32), ('y', b'2' * 32)]
+    assert compute_folder_digest(files, children) == compute_folder_digest(files[::-1], children[::-1])
+    assert compute_folder_digest(files, children) != compute_folder_digest(files[1:], children)
@@ -0,0 +1,52 @@
+import os
+import logging
+import pytest
+
+# File event monitoring is optional and needs watchdog
+pytest.importorskip('watchdog')
+from event_pipeline import EventPipeline
+from monitoring import DirectoryEventHandler, DirtySet
+
+ROOT = os.path.join(os.sep, 'r')
+
+def _path(*parts):
+    return os.path.join(ROOT, *parts)
+
+def test_dirty_set_starts_full_then_holds_paths():
+    dirty_set = DirtySet(ROOT)
+    assert dirty_set.drain() == (set(), set(), True)
+    dirty_set.add(_path('a', 'x'), _path('b', 'y'))
+    assert dirty_set.drain() == ({_path('a', 'x'), _path('b', 'y')}, set(), False)
+    dirty_set.mark_all()
+    dirty_set.add(_path('a', 'x'))
+    assert dirty_set.drain() == (set(), set(), True)
+
+def test_dirty_set_skips_paths_inside_dirty_subtrees():
+    dirty_set = DirtySet(ROOT)
+    dirty_set.drain()
+    dirty_set.add_subtrees([_path('a')])
+    dirty_set.add(_path('a', 'b', 'x'), _path('c', 'y'))
+    assert dirty_set.drain() == ({_path('c', 'y')}, {_path('a')}, False)
+
+def test_dirty_set_collapses_past_its_limit():
+    dirty_set = DirtySet(ROOT, max_paths=3)
+    dirty_set.drain()
+    dirty_set.add(_path('a', '1'), _path('b', '2'), _path('c', '3'), _path('c', '4'))
+    assert dirty_set.drain() == (set(), {_path('a'), _path('b'), _path('c')}, False)
+    # Files straight in the root can only be covered by a full sweep
+    dirty_set.add(_path('1'), _path('2'), _path('3'), _path('4'))
+    assert dirty_set.drain() == (set(), set(), True)
+
+def test_handler_marks_dirty_only_what_the_pipeline_queued():
+    logger = logging.getLogger('test_monitoring')
+    # Not started, so nothing drains the queue: the first 8 events reach the high watermark
+    pipeline = EventPipeline(logger, max_queue=10, root=ROOT)
+    dirty_set = DirtySet(ROOT)
+    dirty_set.drain()
+    handler = DirectoryEventHandler(logger, dirty_set, pipeline)
+    for i in range(20):
+        handler.log_event("File Created", _path('storm', f'f{i}'))
+    paths, subtrees, full = dirty_set.drain()
+    assert paths == {_path('storm', f'f{i}') for i in range(8)}
+    assert not subtrees and not full
+    assert pipeline.overflowing and pipeline.collapsed == 12
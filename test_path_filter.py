@@ -0,0 +1,46 @@
+import os
+from path_filter import PathFilter, FilterRules, compile_filter, split_list, NO_RULES
+from walker import walk
+
+ROOT = os.path.join(os.sep, 'data')
+
+def test_relative_paths_are_only_given_inside_the_root():
+    path_filter = PathFilter(ROOT + os.sep, FilterRules(exclude=['*.tmp']))
+    assert path_filter.relative(ROOT) == ''
+    assert path_filter.relative(os.path.join(ROOT, 'a', 'b.txt')) == 'a/b.txt'
+    # A sibling sharing the root's name as a prefix is outside it
+    assert path_filter.relative(ROOT + '2') is None
+    assert path_filter.relative(os.path.join(ROOT + '2', 'x.tmp')) is None
+    assert PathFilter(os.sep, NO_RULES).relative(os.path.join(os.sep, 'etc', 'passwd')) == 'etc/passwd'
+
+def test_events_outside_the_root_are_not_ignored():
+    path_filter = PathFilter(ROOT, FilterRules(exclude=['*.tmp', 'cache']))
+    assert path_filter.ignores(os.path.join(ROOT, 'cache', 'x.txt'), False)
+    assert path_filter.ignores(os.path.join(ROOT, 'a', 'x.tmp'), False)
+    assert not path_filter.ignores(os.path.join(ROOT, 'a', 'x.txt'), False)
+    assert not path_filter.ignores(os.path.join(ROOT + '2', 'x.tmp'), False)
+    assert not path_filter.ignores(ROOT, True)
+
+def test_split_list():
+    assert split_list(' py, .txt ,,') == ('py', '.txt')
+    assert split_list('') == split_list(None) == ()
+
+def test_no_rules_compile_to_no_filter():
+    assert compile_filter(ROOT, NO_RULES) is None and compile_filter(ROOT, None) is None
+
+def test_walk_prunes_excluded_folders_without_checking_devices(tmp_path, monkeypatch):
+    for folder in ('keep', 'skip', os.path.join('keep', 'skip')):
+        os.makedirs(str(tmp_path / folder))
+        (tmp_path / folder / 'f.txt').write_text('x')
+        (tmp_path / folder / 'f.log').write_text('x')
+    checked = []
+    monkeypatch.setattr(PathFilter, 'crosses_device', lambda self, st: checked.append(st) or False)
+    path_filter = compile_filter(str(tmp_path), FilterRules(exclude=['skip'], extensions=['txt']))
+    walked = [(folder, list(subdirs), [st.name for st in files]) for folder, subdirs, files in
+              walk(str(tmp_path), path_filter=path_filter)]
+    assert walked == [(str(tmp_path), ['keep'], []), (str(tmp_path / 'keep'), [], ['f.txt'])]
+    # Folders are only stat'ed for their device when one_filesystem asks for it
+    assert not checked
+    path_filter = compile_filter(str(tmp_path), FilterRules(one_filesystem=True))
+    # Then every subfolder is, once
+    assert len(list(walk(str(tmp_path), path_filter=path_filter))) == 4 and len(checked) == 3
@@ -0,0 +1,91 @@
+import os
+import shutil
+import pytest
+
+# File event monitoring, polling included, is optional and needs watchdog
+pytest.importorskip('watchdog')
+from watchdog.events import (FileCreatedEvent, FileDeletedEvent, FileModifiedEvent, FileMovedEvent,
+                             DirCreatedEvent, DirDeletedEvent)
+from polling import snapshot, snapshot_events, SnapshotPoller, _Polled
+
+def _file(inode, size=1, mtime_ns=1):
+    return (False, inode, size, mtime_ns)
+
+FOLDER = (True, None, None, None)
+
+class _Handler:
+    path_filter = None
+
+    def __init__(self):
+        self.events = []
+
+    def dispatch(self, event):
+        self.events.append((type(event).__name__, event.src_path))
+
+def _events(old, new):
+    return sorted((type(event).__name__, event.src_path, getattr(event, 'dest_path', ''))
+                  for event in snapshot_events(old, new))
+
+def test_created_deleted_and_modified():
+    old = {'/r/kept': _file(1), '/r/changed': _file(2), '/r/gone': _file(3), '/r/old_dir': FOLDER}
+    new = {'/r/kept': _file(1), '/r/changed': _file(2, size=5), '/r/new': _file(4), '/r/new_dir': FOLDER}
+    assert _events(old, new) == sorted([
+        (FileModifiedEvent.__name__, '/r/changed', ''),
+        (FileCreatedEvent.__name__, '/r/new', ''),
+        (FileDeletedEvent.__name__, '/r/gone', ''),
+        (DirCreatedEvent.__name__, '/r/new_dir', ''),
+        (DirDeletedEvent.__name__, '/r/old_dir', ''),
+    ])
+
+def test_file_keeping_its_inode_moved():
+    assert _events({'/r/a': _file(7)}, {'/r/b': _file(7)}) == [(FileMovedEvent.__name__, '/r/a', '/r/b')]
+
+def test_files_without_inode_numbers_are_deleted():
+    # Windows listings have no inode numbers, so a move there is a deletion and a creation
+    assert _events({'/r/a': _file(0), '/r/b': _file(None)}, {'/r/c': _file(0)}) == sorted([
+        (FileCreatedEvent.__name__, '/r/c', ''),
+        (FileDeletedEvent.__name__, '/r/a', ''),
+        (FileDeletedEvent.__name__, '/r/b', ''),
+    ])
+
+def test_every_deleted_hard_link_is_reported():
+    old = {'/r/link1': _file(5), '/r/link2': _file(5), '/r/link3': _file(5)}
+    events = _events(old, {'/r/renamed': _file(5)})
+    assert [event for event in events if event[0] == FileMovedEvent.__name__] == \
+        [(FileMovedEvent.__name__, '/r/link1', '/r/renamed')]
+    assert sorted(event[1] for event in events if event[0] == FileDeletedEvent.__name__) == ['/r/link2', '/r/link3']
+
+def test_snapshot_of_a_folder(tmp_path):
+    (tmp_path / 'sub').mkdir()
+    (tmp_path / 'sub' / 'deep.txt').write_text('x')
+    (tmp_path / 'top.txt').write_text('y')
+    assert set(snapshot(str(tmp_path))) == {str(tmp_path / 'sub'), str(tmp_path / 'sub' / 'deep.txt'),
+                                            str(tmp_path / 'top.txt')}
+    assert set(snapshot(str(tmp_path), recursive=False)) == {str(tmp_path / 'sub'), str(tmp_path / 'top.txt')}
+    entries = snapshot(str(tmp_path))
+    assert entries[str(tmp_path / 'top.txt')][2] == 1
+    assert entries[str(tmp_path / 'sub')][0]
+    assert os.stat(str(tmp_path / 'top.txt')).st_ino == entries[str(tmp_path / 'top.txt')][1]
+
+def test_new_subfolder_of_a_shallow_folder_is_polled_in_full(tmp_path):
+    handler = _Handler()
+    poller = SnapshotPoller()
+    shallow = _Polled(handler, str(tmp_path), False)
+    poller._polled.append(shallow)
+    poller._poll(shallow)
+    new = tmp_path / 'new'
+    (new / 'deeper').mkdir(parents=True)
+    (new / 'a.txt').write_text('a')
+    poller._poll(shallow)
+    assert handler.events == [(DirCreatedEvent.__name__, str(new))]
+    added = poller._polled[-1]
+    assert (added.path, added.recursive) == (str(new), True)
+    poller._poll(added)
+    assert sorted(handler.events[1:]) == [(DirCreatedEvent.__name__, str(new / 'deeper')),
+                                          (FileCreatedEvent.__name__, str(new / 'a.txt'))]
+    (new / 'deeper' / 'b.txt').write_text('b')
+    poller._poll(added)
+    assert handler.events[-1] == (FileCreatedEvent.__name__, str(new / 'deeper' / 'b.txt'))
+    shutil.rmtree(str(new))
+    poller._poll(shallow)
+    assert handler.events[-1] == (DirDeletedEvent.__name__, str(new)) and poller._polled == [shallow]
@@ -0,0 +1,70 @@
+import os
+import shutil
+from scanner import iter_records
+from baseline_store import save_baseline, BaselineStore
+from rescan import refresh_store
+
+def _write(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        f.write(content)
+
+def _tree(root):
+    for folder in ('a', os.path.join('a', 'b'), os.path.join('a', 'b', 'c'), 'd'):
+        for i in range(2):
+            _write(os.path.join(root, folder, f'f{i}.txt'), f'{folder} {i}')
+
+def _state(store):
+    # Re-inserted subtrees get new rows, so records are compared by path rather than in row order
+    return store.root().path, store.root().digest, sorted(store.iter_records(), key=lambda record: record.path)
+
+def _fresh_state(root, tmp_path):
+    fresh = str(tmp_path / 'fresh.db')
+    if os.path.exists(fresh):
+        os.remove(fresh)
+    save_baseline(iter_records(root, 1), fresh, root)
+    with BaselineStore(fresh) as store:
+        return _state(store)
+
+def _refreshed(root, tmp_path, dirty_paths, dirty_subtrees=()):
+    with BaselineStore(str(tmp_path / 'latest.db')) as store:
+        refresh_store(store, root, dirty_paths, 1, dirty_subtrees=dirty_subtrees)
+    with BaselineStore(str(tmp_path / 'latest.db')) as store:
+        return _state(store)
+
+def _setup(tmp_path):
+    root = str(tmp_path / 'tree')
+    _tree(root)
+    save_baseline(iter_records(root, 1), str(tmp_path / 'latest.db'), root)
+    return root
+
+def test_dirty_paths_bring_the_store_up_to_date(tmp_path):
+    root = _setup(tmp_path)
+    changed = os.path.join(root, 'a', 'b', 'f0.txt')
+    added = os.path.join(root, 'd', 'new', 'g.txt')
+    _write(changed, 'tampered')
+    _write(added, 'new')
+    os.remove(os.path.join(root, 'a', 'f1.txt'))
+    dirty = [changed, os.path.dirname(added), os.path.join(root, 'a', 'f1.txt')]
+    assert _refreshed(root, tmp_path, dirty) == _fresh_state(root, tmp_path)
+
+def test_dirty_subtree_covers_changes_no_event_reported(tmp_path):
+    root = _setup(tmp_path)
+    _write(os.path.join(root, 'a', 'b', 'c', 'f1.txt'), 'tampered')
+    _write(os.path.join(root, 'a', 'b', 'c', 'extra.txt'), 'new')
+    shutil.rmtree(os.path.join(root, 'a', 'b', 'c'))
+    _write(os.path.join(root, 'a', 'b', 'c', 'f0.txt'), 'recreated')
+    # Without the subtree, relisting a/b alone misses what changed inside a/b/c
+    assert _refreshed(root, tmp_path, [], [os.path.join(root, 'a')]) == _fresh_state(root, tmp_path)
+
+def test_vanished_dirty_subtree_is_rescanned_from_its_parent(tmp_path):
+    root = _setup(tmp_path)
+    shutil.rmtree(os.path.join(root, 'a', 'b'))
+    assert _refreshed(root, tmp_path, [], [os.path.join(root, 'a', 'b', 'c')]) == _fresh_state(root, tmp_path)
+
+def test_root_keeps_its_place_when_rescanned_as_a_subtree(tmp_path):
+    root = _setup(tmp_path)
+    _write(os.path.join(root, 'd', 'f0.txt'), 'tampered')
+    state = _refreshed(root, tmp_path, [], [root])
+    assert state == _fresh_state(root, tmp_path)
+    assert state[0] == root
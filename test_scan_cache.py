@@ -0,0 +1,60 @@
+import os
+from scanner import iter_records, FileRecord
+from scan_cache import RescanCache
+
+def _scan(directory, cache):
+    return {record.path: record.digest for record in iter_records(directory, 4, cache=cache)
+            if isinstance(record, FileRecord)}
+
+def _tree(root, count=10):
+    for i in range(count):
+        with open(os.path.join(root, f'f{i}.txt'), 'w') as f:
+            f.write(f'file {i}')
+
+def test_unchanged_files_are_not_hashed_again(tmp_path):
+    tree = tmp_path / 'tree'
+    tree.mkdir()
+    _tree(str(tree))
+    cache = RescanCache(str(tmp_path / 'cache.db'))
+    first = _scan(str(tree), cache)
+    assert (cache.hits, cache.misses) == (0, 10)
+    assert _scan(str(tree), cache) == first
+    assert (cache.hits, cache.misses) == (10, 0)
+
+def test_changed_file_is_hashed_again(tmp_path):
+    tree = tmp_path / 'tree'
+    tree.mkdir()
+    _tree(str(tree))
+    cache = RescanCache(str(tmp_path / 'cache.db'))
+    first = _scan(str(tree), cache)
+    changed = str(tree / 'f3.txt')
+    with open(changed, 'w') as f:
+        f.write('changed, and longer than before')
+    second = _scan(str(tree), cache)
+    assert (cache.hits, cache.misses) == (9, 1)
+    assert second[changed] != first[changed]
+    assert {path: digest for path, digest in second.items() if path != changed} == \
+        {path: digest for path, digest in first.items() if path != changed}
+
+def test_paranoid_check_rehashes_everything(tmp_path):
+    tree = tmp_path / 'tree'
+    tree.mkdir()
+    _tree(str(tree))
+    cache = RescanCache(str(tmp_path / 'cache.db'), paranoid_every=2)
+    first = _scan(str(tree), cache)
+    assert _scan(str(tree), cache) == first
+    assert cache.paranoid and (cache.hits, cache.misses) == (0, 10)
+    _scan(str(tree), cache)
+    assert not cache.paranoid and cache.hits == 10
+
+def test_deleted_files_leave_the_cache(tmp_path):
+    tree = tmp_path / 'tree'
+    tree.mkdir()
+    _tree(str(tree))
+    cache = RescanCache(str(tmp_path / 'cache.db'))
+    _scan(str(tree), cache)
+    os.remove(str(tree / 'f0.txt'))
+    _scan(str(tree), cache)
+    cache.begin_check()
+    assert cache._conn.execute("SELECT COUNT(*) FROM digests").fetchone() == (9,)
+    cache.abort_check()
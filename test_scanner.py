@@ -0,0 +1,40 @@
+import os
+import threading
+import pytest
+from scanner import iter_records, FolderRecord, ScanCancelled
+
+def _tree(root):
+    for folder in ('a', os.path.join('a', 'b'), 'c', 'empty'):
+        os.makedirs(os.path.join(root, folder), exist_ok=True)
+    for i, folder in enumerate(('', 'a', os.path.join('a', 'b'), 'c') * 5):
+        with open(os.path.join(root, folder, f'f{i:02}.txt'), 'w') as f:
+            f.write(f'file {i}\n' * (i + 1))
+
+def test_parallel_scan_matches_a_single_threaded_one(tmp_path):
+    _tree(str(tmp_path))
+    single = list(iter_records(str(tmp_path), 1))
+    assert list(iter_records(str(tmp_path), 8)) == single
+    assert list(iter_records(str(tmp_path), 8, walk_workers=4)) == single
+
+def test_records_come_in_sorted_walk_order(tmp_path):
+    _tree(str(tmp_path))
+    records = list(iter_records(str(tmp_path), 4))
+    folders = [record.path for record in records if isinstance(record, FolderRecord)]
+    assert folders == [str(tmp_path)] + [os.path.join(str(tmp_path), name) for name in
+                                         ('a', os.path.join('a', 'b'), 'c', 'empty')]
+    # Each folder's files follow it, by name
+    root_files = [record.name for record in records[1:6]]
+    assert root_files == sorted(root_files) and len(root_files) == 5
+
+def test_scan_of_one_folder_only(tmp_path):
+    _tree(str(tmp_path))
+    records = list(iter_records(str(tmp_path), 4, recursive=False))
+    assert records[0] == FolderRecord(str(tmp_path), ['a', 'c', 'empty'], 5)
+    assert len(records) == 6
+
+def test_cancelled_scan_raises(tmp_path):
+    _tree(str(tmp_path))
+    cancel = threading.Event()
+    cancel.set()
+    with pytest.raises(ScanCancelled):
+        list(iter_records(str(tmp_path), 4, cancel=cancel))
@@ -0,0 +1,77 @@
+import time
+import threading
+from scanner import ScanCancelled
+from scheduler import RecurringSchedule, MonitoringScheduler
+
+class _Task:
+    def __init__(self, directory, device, log, release=None):
+        self.directory = directory
+        self.device = device
+        self.schedule = RecurringSchedule(1, 0, start=time.time() + 3600)
+        self.log = log
+        self.release = release or threading.Event()
+        self.runs = 0
+
+    def run_check(self, cancelled):
+        self.runs += 1
+        self.log.append(('start', self.directory))
+        while not self.release.wait(0.01):
+            if cancelled.is_set():
+                self.log.append(('cancelled', self.directory))
+                raise ScanCancelled()
+        self.log.append(('end', self.directory))
+
+def _wait_for(condition, timeout=5):
+    deadline = time.time() + timeout
+    while not condition():
+        assert time.time() < deadline
+        time.sleep(0.01)
+
+def test_schedule_spaces_random_checks_and_skips_missed_times():
+    schedule = RecurringSchedule(1, 2, start=1000)
+    assert schedule.next_after(1000) == 1000
+    schedule.consume(1000)
+    first = schedule.next_after(1000)
+    schedule.consume(first)
+    second = schedule.next_after(first)
+    assert 1000 < first < second < 4600 and second - first >= 60
+    schedule.consume(second)
+    assert schedule.next_after(second) == 4600
+    # Checks that fell due while nothing was running are skipped, not run late
+    assert 10000 <= schedule.next_after(10000) < 10000 + 3600
+
+def test_checks_on_one_device_take_turns():
+    log = []
+    release = threading.Event()
+    tasks = [_Task('a', 1, log, release), _Task('b', 1, log, release), _Task('c', 2, log, release)]
+    scheduler = MonitoringScheduler(max_concurrent=3)
+    for task in tasks:
+        scheduler.add_task(task)
+    scheduler.start()
+    for task in tasks:
+        scheduler.run_now(task.directory)
+    _wait_for(lambda: len(log) == 2)
+    assert sorted(directory for _, directory in log) in (['a', 'c'], ['b', 'c'])
+    release.set()
+    _wait_for(lambda: all(task.runs == 1 for task in tasks) and len(log) == 6)
+    scheduler.shutdown()
+    # The second check on device 1 only started once the first had ended
+    assert [event for event, directory in log if directory != 'c'] == ['start', 'end', 'start', 'end']
+
+def test_pause_all_cuts_checks_short_and_resume_all_redoes_them():
+    log = []
+    task = _Task('a', 1, log)
+    scheduler = MonitoringScheduler()
+    scheduler.add_task(task)
+    scheduler.start()
+    scheduler.run_now('a')
+    _wait_for(lambda: log == [('start', 'a')])
+    scheduler.pause_all()
+    _wait_for(lambda: log == [('start', 'a'), ('cancelled', 'a')])
+    time.sleep(0.05)
+    assert task.runs == 1
+    task.release.set()
+    scheduler.resume_all()
+    _wait_for(lambda: log[-1] == ('end', 'a'))
+    scheduler.shutdown()
+    assert task.runs == 2
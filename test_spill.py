@@ -0,0 +1,29 @@
+import random
+from spill import SpillList, external_sort
+
+def test_spill_list_keeps_insertion_order_across_the_spill():
+    items = SpillList(limit=3)
+    assert not items and len(items) == 0
+    items.extend(range(10))
+    items.append(10)
+    assert items.file is not None and len(items.items) <= 3
+    assert len(items) == 11 and items
+    assert list(items) == list(range(11))
+    # Iterating again reads the spilled part from the start
+    assert list(items) == list(range(11))
+    items.close()
+
+def test_spill_list_under_its_limit_stays_in_memory():
+    items = SpillList(limit=100)
+    items.extend('abc')
+    assert items.file is None and list(items) == ['a', 'b', 'c']
+
+def test_external_sort_matches_sorted_and_is_stable():
+    rng = random.Random(7)
+    items = [(rng.randrange(20), i) for i in range(500)]
+    key = lambda item: item[0]
+    for limit in (1, 7, 64, 1000):
+        assert list(external_sort(items, key, limit)) == sorted(items, key=key)
+
+def test_external_sort_of_nothing():
+    assert list(external_sort([], lambda item: item, 2)) == []
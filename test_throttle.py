@@ -0,0 +1,67 @@
+import time
+import hash_engine
+from throttle import TokenBucket, Throttle, MB
+
+def _clock(monkeypatch):
+    now = [1000.0]
+    slept = []
+    monkeypatch.setattr(time, 'monotonic', lambda: now[0])
+    monkeypatch.setattr(time, 'sleep', slept.append)
+    return now, slept
+
+def test_bucket_sleeps_off_overdrafts(monkeypatch):
+    now, slept = _clock(monkeypatch)
+    bucket = TokenBucket(rate=10, burst=10)
+    bucket.acquire(10)
+    assert slept == []
+    # Larger than the burst still goes through, at the average rate
+    bucket.acquire(20)
+    assert slept == [2.0]
+    now[0] += 2.5
+    bucket.acquire(10)
+    assert slept == [2.0, 0.5]
+
+def test_unlimited_bucket_never_sleeps(monkeypatch):
+    _, slept = _clock(monkeypatch)
+    bucket = TokenBucket()
+    bucket.acquire(10 ** 12)
+    assert slept == [] and bucket.rate is None
+
+def test_task_throttle_charges_its_parent(monkeypatch):
+    _, slept = _clock(monkeypatch)
+    parent = Throttle(mb_per_s=1, adaptive=False)
+    task = Throttle(files_per_s=100, parent=parent, adaptive=False)
+    task.acquire_bytes(3 * MB)
+    task.acquire_file()
+    assert slept == [2.0]
+    assert parent.files.rate is None and task.bytes.rate is None
+
+def test_latency_spikes_halve_the_rate_and_calm_restores_it(monkeypatch):
+    now, _ = _clock(monkeypatch)
+    limited = Throttle(mb_per_s=100)
+    for _ in range(5):
+        now[0] += 1
+        limited.observe(0.01, MB)
+    now[0] += 1
+    limited.observe(1.0, MB)
+    assert limited.effective == 50 * MB
+    # The slowdown lingers in the recent latency for a while, then the rate climbs back to the limit
+    for _ in range(100):
+        now[0] += 1
+        limited.observe(0.01, MB)
+    assert limited.effective == 100 * MB
+    # Small reads time syscall overhead, not the disk, and are ignored
+    limited.observe(10.0, 1024)
+    assert limited.effective == 100 * MB
+
+def test_page_cache_is_left_alone_unless_asked(tmp_path, monkeypatch):
+    dropped = []
+    monkeypatch.setattr(hash_engine, 'drop_from_cache', lambda fd, offset=0, length=0: dropped.append(fd))
+    path = tmp_path / 'file.bin'
+    path.write_bytes(b'x' * 1000)
+    with hash_engine.HashingEngine(workers=1, throttle=Throttle()) as engine:
+        list(engine.imap([str(path)]))
+    assert not Throttle().drop_cache and dropped == []
+    with hash_engine.HashingEngine(workers=1, throttle=Throttle(drop_cache=True)) as engine:
+        list(engine.imap([str(path)]))
+    assert dropped
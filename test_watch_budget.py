@@ -0,0 +1,52 @@
+import os
+import watch_budget
+from watch_budget import WatchBudget, count_folders
+from path_filter import compile_filter, FilterRules
+
+def _tree(root):
+    # small: 2 folders; big: 1 + 3 children of 3 folders each = 10 folders
+    os.makedirs(os.path.join(root, 'small', 'leaf'))
+    for child in ('x', 'y', 'z'):
+        os.makedirs(os.path.join(root, 'big', child, 'one'))
+        os.makedirs(os.path.join(root, 'big', child, 'two'))
+
+def test_count_folders_stops_past_its_limit(tmp_path):
+    _tree(str(tmp_path))
+    assert count_folders(str(tmp_path), 100) == 13
+    assert count_folders(str(tmp_path), 3) == 4
+
+def test_everything_is_watched_without_inotify(tmp_path, monkeypatch):
+    monkeypatch.setattr(watch_budget, 'inotify_watch_limit', lambda: None)
+    budget = WatchBudget()
+    assert budget.budget is None
+    assert budget.plan(str(tmp_path)) == ([str(tmp_path)], [], [], 0)
+
+def test_subtrees_that_fit_are_watched_and_the_rest_polled(tmp_path):
+    root = str(tmp_path)
+    _tree(root)
+    budget = WatchBudget(budget=6)
+    plan = budget.plan(root)
+    assert plan.shallow == [root, os.path.join(root, 'big')]
+    assert plan.watched == [os.path.join(root, 'big', 'x'), os.path.join(root, 'big', 'y')]
+    assert plan.polled == [os.path.join(root, 'big', 'z'), os.path.join(root, 'small')] and plan.watches == 6
+    assert budget.usage()['reserved'] == 6
+    # Another root only gets what the first left over
+    other = str(tmp_path / 'small')
+    assert budget.plan(other).polled == [other]
+    budget.release(root)
+    assert budget.plan(other).watched == [other]
+
+def test_deep_trees_are_polled_whole_past_the_plan_depth(tmp_path, monkeypatch):
+    monkeypatch.setattr(watch_budget, 'PLAN_DEPTH', 1)
+    root = str(tmp_path)
+    _tree(root)
+    plan = WatchBudget(budget=2).plan(root)
+    assert plan.shallow == [root] and plan.polled == [os.path.join(root, 'big')]
+    assert plan.watched == [os.path.join(root, 'small')]
+
+def test_excluded_folders_are_left_out(tmp_path):
+    root = str(tmp_path)
+    _tree(root)
+    path_filter = compile_filter(root, FilterRules(exclude=['big']))
+    plan = WatchBudget(budget=1).plan(root, path_filter)
+    assert plan == ([os.path.join(root, 'small', 'leaf')], [], [root, os.path.join(root, 'small')], 1)
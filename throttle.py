@@ -0,0 +1,126 @@
+import os
+import time
+import threading
+
+MB = 1 << 20
+LATENCY_FLOOR = 0.005  # seconds per MiB read; anything faster is the page cache or an idle disk
+BACKOFF_RATIO = 2.0
+RECOVER_RATIO = 1.2
+MIN_FACTOR = 0.1
+ADJUST_INTERVAL = 0.5
+MIN_OBSERVED_READ = 256 << 10  # shorter reads mostly time syscall overhead, not the disk
+
+class TokenBucket:
+    """Thread-safe token bucket; a rate of 0 or None means unlimited."""
+
+    def __init__(self, rate=None, burst=None):
+        self._lock = threading.Lock()
+        self.rate = None
+        self.burst = None
+        self._tokens = None
+        self._stamp = time.monotonic()
+        self.set_rate(rate, burst)
+
+    def set_rate(self, rate, burst=None):
+        with self._lock:
+            self.rate = rate or None
+            self.burst = burst or self.rate
+            if self.rate is not None:
+                self._tokens = self.burst if self._tokens is None else min(self._tokens, self.burst)
+
+    def acquire(self, amount=1):
+        with self._lock:
+            if self.rate is None:
+                return
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._stamp) * self.rate)
+            self._stamp = now
+            self._tokens -= amount
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0
+        if wait:
+            time.sleep(wait)
+
+class Throttle:
+    """Read bandwidth (MB/s) and file rate (files/s) limits for scans, adapting to read latency."""
+
+    def __init__(self, mb_per_s=None, files_per_s=None, parent=None, adaptive=True, drop_cache=False):
+        self.parent = parent
+        self.adaptive = adaptive
+        self.drop_cache = drop_cache
+        self.files = TokenBucket(files_per_s)
+        self.bytes = TokenBucket()
+        self._lock = threading.Lock()
+        self._typical = None
+        self._recent = None
+        self._throughput = None
+        self._adjusted = 0.0
+        self.set_limits(mb_per_s, files_per_s)
+
+    def set_limits(self, mb_per_s=None, files_per_s=None):
+        with self._lock:
+            self.limit = mb_per_s * MB if mb_per_s else None
+            self.effective = self.limit
+            self.bytes.set_rate(self.effective)
+        self.files.set_rate(files_per_s)
+
+    def acquire_file(self):
+        self.files.acquire()
+        if self.parent is not None:
+            self.parent.acquire_file()
+
+    def acquire_bytes(self, amount):
+        self.bytes.acquire(amount)
+        if self.parent is not None:
+            self.parent.acquire_bytes(amount)
+
+    def observe(self, seconds, amount):
+        """Record one read of `amount` bytes that took `seconds`, adapting the byte rate to latency."""
+        if self.parent is not None:
+            self.parent.observe(seconds, amount)
+        if not self.adaptive or amount < MIN_OBSERVED_READ:
+            return
+        latency = seconds * MB / amount
+        with self._lock:
+            if self._typical is None:
+                self._typical = self._recent = latency
+                self._throughput = amount / max(seconds, 1e-9)
+                return
+            # Spikes stay out of the slow average, or sustained contention would soon look normal
+            if latency < BACKOFF_RATIO * self._typical:
+                self._typical += 0.01 * (latency - self._typical)
+            self._recent += 0.3 * (latency - self._recent)
+            self._throughput += 0.05 * (amount / max(seconds, 1e-9) - self._throughput)
+            now = time.monotonic()
+            if now - self._adjusted < ADJUST_INTERVAL:
+                return
+            if self._recent > LATENCY_FLOOR and self._recent > BACKOFF_RATIO * self._typical:
+                current = self.effective or self._throughput
+                floor = (self.limit or self._throughput) * MIN_FACTOR
+                self.effective = max(floor, current * 0.5)
+            elif self.effective is not None and self._recent < RECOVER_RATIO * self._typical:
+                self.effective *= 1.25
+                ceiling = self.limit or 4 * self._throughput
+                if self.effective >= ceiling:
+                    self.effective = self.limit
+            else:
+                return
+            self._adjusted = now
+            self.bytes.set_rate(self.effective)
+
+    def stats(self):
+        return {
+            'limit_mb_per_s': self.limit / MB if self.limit else None,
+            'effective_mb_per_s': self.effective / MB if self.effective else None,
+            'files_per_s': self.files.rate,
+            'typical_latency_ms_per_mb': self._typical * 1000 if self._typical is not None else None,
+            'recent_latency_ms_per_mb': self._recent * 1000 if self._recent is not None else None,
+        }
+
+def advise_sequential(fd):
+    if hasattr(os, 'posix_fadvise'):
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_SEQUENTIAL)
+
+def drop_from_cache(fd, offset=0, length=0):
+    """Evict the given range of `fd` from the page cache, whoever else has it cached."""
+    if hasattr(os, 'posix_fadvise'):
+        os.posix_fadvise(fd, offset, length, os.POSIX_FADV_DONTNEED)
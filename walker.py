@@ -0,0 +1,90 @@
+import os
+import sys
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+# What a scan needs to know about a file, taken from the directory listing itself. The field names
+# match os.stat_result, so a FileStat can stand in for one (scan_cache, quick_check). `link` is the
+# target of a symlink that is recorded as a link rather than followed, else None.
+FileStat = namedtuple('FileStat', 'name st_size st_mtime_ns st_ctime_ns st_dev st_ino link')
+
+# On Windows DirEntry.stat() leaves st_dev and st_ino zero, and the rescan cache keys on them
+_LISTING_LACKS_IDENTITY = sys.platform == 'win32'
+
+PREFETCH_PER_WORKER = 2
+
+def _file_stat(name, st, link=None):
+    return FileStat(name, st.st_size, st.st_mtime_ns, st.st_ctime_ns, st.st_dev, st.st_ino, link)
+
+def _list_dir(path, follow_symlinks, identity, path_filter=None):
+    """Sorted ([(subdir name, descend)], [FileStat]) for one folder, or None when it can't be listed."""
+    try:
+        with os.scandir(path) as it:
+            entries = list(it)
+        folder_id = None
+        if follow_symlinks:
+            st = os.stat(path)
+            folder_id = (st.st_dev, st.st_ino)
+    except OSError:
+        # Like os.walk: a folder that can't be read, or vanished, is skipped
+        return None
+    dirs = []
+    files = []
+    prefix = path_filter.relative(path) + '/' if path_filter is not None else None
+    for entry in entries:
+        try:
+            if entry.is_dir():
+                if path_filter is not None and (path_filter.excludes_dir((prefix + entry.name).lstrip('/'), entry.name)
+                                                or path_filter.device is not None
+                                                and path_filter.crosses_device(entry.stat())):
+                    continue
+                dirs.append((entry.name, follow_symlinks or not entry.is_symlink()))
+            elif path_filter is not None and path_filter.excludes_file((prefix + entry.name).lstrip('/'), entry.name):
+                continue
+            elif entry.is_symlink() and not (follow_symlinks and entry.is_file()):
+                files.append(_file_stat(entry.name, entry.stat(follow_symlinks=False), os.readlink(entry.path)))
+            elif entry.is_file():
+                st = os.stat(entry.path) if identity and _LISTING_LACKS_IDENTITY else entry.stat()
+                if path_filter is not None and path_filter.excludes_size(st.st_size):
+                    continue
+                files.append(_file_stat(entry.name, st))
+        except OSError:
+            # Removed between the listing and its stat
+            continue
+    dirs.sort()
+    files.sort()
+    return folder_id, dirs, files
+
+def walk(top, follow_symlinks=False, workers=None, identity=False, path_filter=None):
+    """Walk `top` like os.walk, yielding (folder path, subfolder names, [FileStat]) in sorted-walk order."""
+    executor = None
+    prefetch = 0
+    if workers and workers > 1:
+        executor = ThreadPoolExecutor(workers, thread_name_prefix="fim-walk")
+        prefetch = workers * PREFETCH_PER_WORKER
+    # The top of the stack is walked next: [path, pending listing or None, identities of its ancestors]
+    stack = [[top, None, frozenset()]]
+    try:
+        while stack:
+            if executor is not None:
+                for item in stack[-prefetch:]:
+                    if item[1] is None:
+                        item[1] = executor.submit(_list_dir, item[0], follow_symlinks, identity, path_filter)
+            path, pending, ancestors = stack.pop()
+            listing = pending.result() if pending is not None else _list_dir(path, follow_symlinks, identity, path_filter)
+            if listing is None:
+                continue
+            folder_id, dirs, files = listing
+            if folder_id is not None:
+                if folder_id in ancestors:
+                    continue
+                ancestors = ancestors | {folder_id}
+            subdirs = [name for name, _ in dirs]
+            yield path, subdirs, files
+            descend = {name for name, follow in dirs if follow}
+            for name in reversed(subdirs):
+                if name in descend:
+                    stack.append([os.path.join(path, name), None, ancestors])
+    finally:
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
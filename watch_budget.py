@@ -0,0 +1,123 @@
+"""Share the inotify watch limit between monitored roots; what doesn't fit is polled (polling.py)."""
+import os
+import threading
+from collections import namedtuple
+
+WATCH_LIMIT_FILE = '/proc/sys/fs/inotify/max_user_watches'
+BUDGET_SHARE = 0.5  # of the user's inotify watches; the rest is left to other programs
+# Each watched subtree is an inotify instance and an emitter thread, and users get 128 instances by default
+MAX_WATCHED_SUBTREES = 64
+PLAN_DEPTH = 3  # levels below a root searched for subtrees that still fit; deeper ones are polled whole
+
+# `watched`: subtrees watched recursively; `polled`: subtrees polled in full; `shallow`: folders whose own
+# entries are polled, their subfolders being planned on their own; `watches`: the inotify watches reserved
+WatchPlan = namedtuple('WatchPlan', 'watched polled shallow watches')
+
+def inotify_watch_limit():
+    """fs.inotify.max_user_watches, or None where there is no inotify."""
+    try:
+        with open(WATCH_LIMIT_FILE) as f:
+            return int(f.read())
+    except (OSError, ValueError):
+        return None
+
+def watches_in_use():
+    """inotify watches this process holds right now, from /proc/self/fdinfo; None where that can't be read."""
+    try:
+        fds = os.listdir('/proc/self/fdinfo')
+    except OSError:
+        return None
+    count = 0
+    for fd in fds:
+        try:
+            with open(f'/proc/self/fdinfo/{fd}') as f:
+                count += sum(1 for line in f if line.startswith('inotify wd:'))
+        except OSError:
+            # Closed since the listing
+            continue
+    return count
+
+def _subfolders(path):
+    try:
+        with os.scandir(path) as it:
+            return sorted(entry.name for entry in it if entry.is_dir(follow_symlinks=False))
+    except OSError:
+        return []
+
+def count_folders(path, limit):
+    """Folders in the subtree at `path`, itself included, counting no further than `limit` + 1."""
+    count = 0
+    stack = [path]
+    while stack and count <= limit:
+        folder = stack.pop()
+        count += 1
+        stack.extend(os.path.join(folder, name) for name in _subfolders(folder))
+    return count
+
+class WatchBudget:
+    """The inotify watches all monitored roots may use between them; one is shared by the whole process."""
+
+    def __init__(self, budget=None):
+        self.limit = inotify_watch_limit()
+        if budget is None and self.limit is not None:
+            budget = int(self.limit * BUDGET_SHARE)
+        self.budget = budget
+        self.plans = {}
+        self._lock = threading.Lock()
+
+    def plan(self, root, path_filter=None):
+        """Decide, and reserve watches for, how `root` is covered: a WatchPlan."""
+        with self._lock:
+            self.plans.pop(root, None)
+            if self.budget is None:
+                plan = WatchPlan([root], [], [], 0)
+            else:
+                used = sum(plan.watches for plan in self.plans.values())
+                subtrees = sum(len(plan.watched) for plan in self.plans.values())
+                plan = self._plan(root, path_filter, self.budget - used, MAX_WATCHED_SUBTREES - subtrees)
+            self.plans[root] = plan
+            return plan
+
+    def _plan(self, root, path_filter, remaining, subtrees):
+        watched, polled, shallow = [], [], []
+        reserved = 0
+        stack = [(root, 0)]
+        while stack:
+            folder, depth = stack.pop()
+            if remaining > 0 and subtrees > 0:
+                count = count_folders(folder, remaining)
+                if count <= remaining:
+                    watched.append(folder)
+                    remaining -= count
+                    reserved += count
+                    subtrees -= 1
+                    continue
+            if depth >= PLAN_DEPTH or remaining <= 0 or subtrees <= 0:
+                polled.append(folder)
+                continue
+            shallow.append(folder)
+            children = []
+            for name in _subfolders(folder):
+                child = os.path.join(folder, name)
+                if path_filter is None or not path_filter.ignores(child, True):
+                    children.append((child, depth + 1))
+            stack.extend(reversed(children))
+        return WatchPlan(watched, polled, shallow, reserved)
+
+    def release(self, root):
+        with self._lock:
+            self.plans.pop(root, None)
+
+    def usage(self):
+        """Watch limit, budget, reserved and in-use counts, and per root how much is watched and polled."""
+        with self._lock:
+            plans = dict(self.plans)
+        return {
+            'limit': self.limit,
+            'budget': self.budget,
+            'reserved': sum(plan.watches for plan in plans.values()),
+            'in_use': watches_in_use(),
+            'roots': {root: {'watched_subtrees': len(plan.watched), 'polled_subtrees': len(plan.polled),
+                             'polled_folders': len(plan.shallow), 'watches': plan.watches}
+                      for root, plan in plans.items()},
+        }